@@ -0,0 +1 @@
+# Benchmark suite for Python Code Executor 
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""
+Run the benchmark suite: python -m benchmarks [--output results.json] [--baseline baseline.json]
+"""
+
+import sys
+
+from .runner import main
+
+sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Benchmark Runner - Times registered benchmarks and compares them against a baseline
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+# name -> setup function returning the callable to time (or raising SkipBenchmark)
+BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {}
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark setup when it cannot run in this environment"""
+
+def benchmark(name: str):
+    """
+    Register a benchmark
+    
+    The decorated function does the setup and returns a zero-argument
+    callable; only that callable is timed.
+    
+    Args:
+        name: Dotted benchmark name, e.g. 'executor.execute.warm_small'
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+def run_benchmark(setup: Callable, repeat: int, warmup: int) -> dict:
+    """
+    Time one benchmark
+    
+    Args:
+        setup: Registered setup function
+        repeat: Number of timed runs
+        warmup: Number of untimed runs before timing
+    
+    Returns:
+        Dictionary with timing statistics in seconds
+    """
+    func = setup()
+    for _ in range(warmup):
+        func()
+    
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'runs': len(samples),
+    }
+
+def run_all(repeat: int = 10, warmup: int = 1, name_filter: Optional[str] = None) -> dict:
+    """
+    Run every registered benchmark
+    
+    Args:
+        repeat: Number of timed runs per benchmark
+        warmup: Number of untimed runs per benchmark
+        name_filter: Only run benchmarks whose name contains this text
+    
+    Returns:
+        Report dictionary ready to be written as JSON
+    """
+    results = {}
+    skipped = {}
+    
+    for name in sorted(BENCHMARKS):
+        if name_filter and name_filter not in name:
+            continue
+        try:
+            results[name] = run_benchmark(BENCHMARKS[name], repeat, warmup)
+        except SkipBenchmark as e:
+            skipped[name] = str(e)
+    
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+        'skipped': skipped,
+    }
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[dict]:
+    """
+    Compare median times against a baseline report
+    
+    Args:
+        report: Report from run_all
+        baseline: Previously saved report
+        threshold: Allowed slowdown as a fraction (0.2 = 20% slower)
+    
+    Returns:
+        One row per benchmark present in both reports
+    """
+    rows = []
+    for name, result in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous['median']:
+            continue
+        ratio = result['median'] / previous['median']
+        rows.append({
+            'name': name,
+            'baseline': previous['median'],
+            'current': result['median'],
+            'ratio': ratio,
+            'regression': ratio > 1.0 + threshold,
+        })
+    return rows
+
+def format_report(report: dict, comparison: Optional[List[dict]] = None) -> str:
+    """Render a report (and optional comparison) as a text table"""
+    ratios = {row['name']: row for row in comparison or []}
+    lines = [f"{'benchmark':<45} {'median ms':>10} {'min ms':>10} {'vs base':>9}"]
+    
+    for name, result in report['results'].items():
+        row = ratios.get(name)
+        change = ''
+        if row:
+            change = f"{row['ratio']:.2f}x" + (' !' if row['regression'] else '')
+        lines.append(f"{name:<45} {result['median'] * 1000:>10.3f} {result['min'] * 1000:>10.3f} {change:>9}")
+    
+    for name, reason in report['skipped'].items():
+        lines.append(f"{name:<45} skipped: {reason}")
+    
+    return '\n'.join(lines)
+
+def main(argv=None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Run the Python Code Executor benchmarks')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per benchmark')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed runs per benchmark')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown against the baseline (default 0.2 = 20%%)')
+    args = parser.parse_args(argv)
+    
+    # Registers the benchmarks
+    from . import suites  # noqa: F401
+    
+    report = run_all(args.repeat, args.warmup, args.filter)
+    
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            comparison = compare(report, json.load(f), args.threshold)
+        report['comparison'] = comparison
+    
+    print(format_report(report, comparison))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    
+    if comparison and any(row['regression'] for row in comparison):
+        return 1
+    return 0
@@ -0,0 +1,196 @@
+"""
+Benchmark Suites - Executor, file manager and widget benchmarks
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from .runner import benchmark, SkipBenchmark
+
+# Make the app packages importable when run from a checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Let Kivy widgets be created without a display or command line parsing
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_FILELOG', '1')
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+
+SMALL_CODE = 'x = sum(range(100))\nprint(x)'
+LARGE_OUTPUT_CODE = 'for i in range(50000):\n    print("line", i)'
+
+def _big_source(functions: int = 2000) -> str:
+    """Generate a large script without input functions"""
+    parts = []
+    for i in range(functions):
+        parts.append(
+            f"def function_{i}(value):\n"
+            f"    result = [value * n for n in range({i % 50})]\n"
+            f"    return sum(result) + len(str(value))\n"
+        )
+    parts.append("print(function_1(2))\n")
+    return '\n'.join(parts)
+
+def _temp_dir() -> str:
+    path = tempfile.mkdtemp(prefix='pce_bench_')
+    atexit.register(shutil.rmtree, path, True)
+    return path
+
+def _create_kivy_widget(module_name: str, class_name: str):
+    """Import and instantiate a widget, skipping when Kivy cannot run here"""
+    try:
+        module = __import__(module_name, fromlist=[class_name])
+        return getattr(module, class_name)()
+    except Exception as e:
+        raise SkipBenchmark(f"Kivy unavailable ({type(e).__name__})")
+
+# CodeExecutor
+
+@benchmark('executor.execute.cold_small')
+def bench_execute_cold_small():
+    from src.utils.code_executor import CodeExecutor
+    
+    def run():
+        CodeExecutor().execute(SMALL_CODE)
+    return run
+
+@benchmark('executor.execute.warm_small')
+def bench_execute_warm_small():
+    from src.utils.code_executor import CodeExecutor
+    executor = CodeExecutor()
+    
+    def run():
+        executor.execute(SMALL_CODE)
+    return run
+
+@benchmark('executor.execute.cold_large_output')
+def bench_execute_cold_large_output():
+    from src.utils.code_executor import CodeExecutor
+    
+    def run():
+        CodeExecutor().execute(LARGE_OUTPUT_CODE)
+    return run
+
+@benchmark('executor.execute.warm_large_output')
+def bench_execute_warm_large_output():
+    from src.utils.code_executor import CodeExecutor
+    executor = CodeExecutor()
+    
+    def run():
+        executor.execute(LARGE_OUTPUT_CODE)
+    return run
+
+@benchmark('executor.check_for_input_functions.big_source')
+def bench_check_input_functions():
+    from src.utils.code_executor import CodeExecutor
+    executor = CodeExecutor()
+    source = _big_source()
+    
+    def run():
+        executor.check_for_input_functions(source)
+    return run
+
+# Telemetry (10000 events per run, so 10 ms here means 1 µs per event)
+
+@benchmark('telemetry.observe.10000_events')
+def bench_telemetry_observe():
+    from src.utils.telemetry import Telemetry
+    telemetry = Telemetry()
+    
+    def run():
+        observe = telemetry.observe
+        for _ in range(10000):
+            observe('exec', 0.00125)
+    return run
+
+@benchmark('telemetry.increment.10000_events')
+def bench_telemetry_increment():
+    from src.utils.telemetry import Telemetry
+    telemetry = Telemetry()
+    
+    def run():
+        increment = telemetry.increment
+        for _ in range(10000):
+            increment('runs')
+    return run
+
+# FileManager
+
+def _saved_scripts_dir(count: int) -> str:
+    """Directory of saved scripts, aged so the file index trusts its mtime"""
+    base_dir = _temp_dir()
+    os.makedirs(os.path.join(base_dir, '.cache'), exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(base_dir, f"script_{i:05d}.py"), 'w', encoding='utf-8') as f:
+            f.write(f"print({i})\n")
+    past = time.time() - 60
+    os.utime(base_dir, (past, past))
+    return base_dir
+
+@benchmark('file_manager.list_files.3000_files')
+def bench_list_files():
+    try:
+        from src.utils.file_manager import FileManager
+    except ImportError as e:
+        raise SkipBenchmark(f"FileManager unavailable ({e})")
+    
+    manager = FileManager(base_dir=_saved_scripts_dir(3000))
+    
+    def run():
+        manager.list_files()
+    return run
+
+@benchmark('file_manager.cold_start_latest.3000_files')
+def bench_cold_start_latest():
+    try:
+        from src.utils.file_manager import FileManager
+    except ImportError as e:
+        raise SkipBenchmark(f"FileManager unavailable ({e})")
+    
+    base_dir = _saved_scripts_dir(3000)
+    # Leaves the index snapshot behind, as a previous app session would
+    FileManager(base_dir=base_dir).list_files()
+    
+    def run():
+        FileManager(base_dir=base_dir).file_index.most_recent()
+    return run
+
+@benchmark('file_manager.search.3000_files')
+def bench_search():
+    try:
+        from src.utils.file_manager import FileManager
+    except ImportError as e:
+        raise SkipBenchmark(f"FileManager unavailable ({e})")
+    
+    manager = FileManager(base_dir=_saved_scripts_dir(3000))
+    # Builds the index once; later searches only read the candidates
+    manager.search('print(1234)')
+    
+    def run():
+        manager.search('print(1234)')
+        manager.search(r'print\(29\d\d\)', regex=True)
+    return run
+
+# Widgets
+
+@benchmark('widgets.line_numbers.update_lines_5000')
+def bench_update_lines():
+    widget = _create_kivy_widget('src.widgets.code_editor', 'LineNumbersWidget')
+    
+    def run():
+        widget.update_lines(5000)
+    return run
+
+@benchmark('widgets.output_display.append_text_500')
+def bench_append_text():
+    display = _create_kivy_widget('src.widgets.output_display', 'OutputDisplay')
+    
+    def run():
+        display.clear_output()
+        for i in range(500):
+            display.append_text(f"output line {i}")
+    return run
@@ -6,16 +6,19 @@ Main entry point for the Kivy application
 
 import os
 import sys
-from kivy.core.window import Window
-from kivy.lang import Builder
-from kivy.resources import resource_add_path
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.app import PythonCodeExecutorApp
-
 if __name__ == '__main__':
+    # Imported here, not at the top: worker processes started by a
+    # forkserver or spawn import this module as __mp_main__, and importing
+    # Kivy's window there would open a second one
+    from kivy.core.window import Window
+    from kivy.lang import Builder
+    from kivy.resources import resource_add_path
+    from src.app import PythonCodeExecutorApp
+    
     # Set window size for desktop testing (will be fullscreen on mobile)
     Window.size = (400, 700)
     
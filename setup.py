@@ -45,6 +45,8 @@ setup(
     entry_points={
         'console_scripts': [
             'python-code-executor=main:main',
+            'python-code-executor-batch=src.cli:main',
+            'python-code-executor-server=src.server:main',
         ],
     },
     keywords='kivy android mobile python code executor',
@@ -47,13 +47,28 @@ class PythonCodeExecutorApp(App):
         Window.fullscreen = 'auto'
     
     def on_pause(self):
-        """Handle app pause (Android)"""
+        """Handle app pause (Android); the app may be killed while paused"""
+        editor = self.get_screen('editor')
+        editor.flush_autosave()
+        editor.save_session()
+        editor.dump_telemetry()
         return True
     
     def on_resume(self):
         """Handle app resume (Android)"""
+        # Nothing to reload: a killed app restores its session when the
+        # editor screen is created
         pass
     
+    def on_stop(self):
+        """Save the session and executor telemetry when the app closes"""
+        editor = self.get_screen('editor')
+        editor.save_session()
+        editor.dump_telemetry()
+        editor.shutdown_workers()
+        # Last, so the background writes finish before the process exits
+        editor.flush_autosave(wait=True)
+    
     def get_screen(self, name):
         """Get a screen by name"""
         return self.screen_manager.get_screen(name)
@@ -0,0 +1,77 @@
+"""
+Headless command line interface for running saved scripts in batch
+
+Never imports Kivy, so it can run on servers and in CI.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from .utils.batch_executor import execute_many
+from .utils.file_manager import default_base_dir
+
+def resolve_paths(paths, pattern: str, base_dir: str) -> list:
+    """
+    Expand the scripts to run
+    
+    Args:
+        paths: Files or glob patterns given on the command line
+        pattern: Glob used inside base_dir when no paths are given
+        base_dir: Directory of saved scripts
+    
+    Returns:
+        Sorted list of unique file paths
+    """
+    if not paths:
+        paths = [os.path.join(base_dir, pattern)]
+    
+    resolved = set()
+    for path in paths:
+        matches = glob.glob(path, recursive=True)
+        if not matches and not os.path.isabs(path):
+            # Relative names also resolve against the saved scripts directory
+            matches = glob.glob(os.path.join(base_dir, path), recursive=True)
+        resolved.update(match for match in matches if os.path.isfile(match))
+    return sorted(resolved)
+
+def main(argv=None) -> int:
+    """Run scripts and print one JSON object per script"""
+    parser = argparse.ArgumentParser(
+        description='Run saved Python scripts in parallel and report results as JSON lines'
+    )
+    parser.add_argument('paths', nargs='*',
+                        help='script files or glob patterns (default: all scripts in the base directory)')
+    parser.add_argument('--base-dir', help='directory of saved scripts (default: the app directory)')
+    parser.add_argument('--glob', default='*.py', help='pattern used when no paths are given')
+    parser.add_argument('--workers', type=int, help='worker processes (default: number of cores)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-script time limit in seconds')
+    parser.add_argument('--no-output', action='store_true', help='omit script output from the results')
+    args = parser.parse_args(argv)
+    
+    base_dir = args.base_dir or default_base_dir()
+    paths = resolve_paths(args.paths, args.glob, base_dir)
+    if not paths:
+        print("No scripts found", file=sys.stderr)
+        return 2
+    
+    start = time.perf_counter()
+    counts = {}
+    for record in execute_many(paths, workers=args.workers, timeout=args.timeout):
+        counts[record['status']] = counts.get(record['status'], 0) + 1
+        if args.no_output:
+            del record['stdout'], record['stderr']
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+    elapsed = time.perf_counter() - start
+    
+    summary = ', '.join(f"{status}: {count}" for status, count in sorted(counts.items()))
+    print(f"{len(paths)} scripts in {elapsed:.2f} s ({len(paths) / elapsed:.1f}/s) - {summary}",
+          file=sys.stderr)
+    
+    return 0 if counts.get('ok', 0) == len(paths) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,25 +2,76 @@
 Editor Screen - Main interface for writing and executing Python code
 """
 
+import threading
+from functools import partial
+
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
+from kivy.uix.togglebutton import ToggleButton
 from kivy.uix.textinput import TextInput
 from kivy.uix.label import Label
 from kivy.uix.scrollview import ScrollView
 from kivy.metrics import dp
+from kivy.clock import Clock
 
 from ..utils.code_executor import CodeExecutor
 from ..utils.file_manager import FileManager
+from ..utils.file_io import FileIOWorker, Autosaver
+from ..utils.session_store import SessionStore
+from ..utils.run_scheduler import RunScheduler
+from ..utils.resource_limits import ResourceLimits
+from ..utils.worker_pool import WorkerPool
 
 class EditorScreen(Screen):
     """Main editor screen for writing Python code"""
     
+    # Per-run limits that keep a runaway script from taking the app down.
+    # Memory is not capped here: measuring it in-process needs tracemalloc,
+    # which makes every run several times slower
+    RUN_LIMITS = {
+        'cpu_seconds': 60,
+        'output_bytes': 16 * 1024 * 1024,
+    }
+    
+    # Limits for isolated runs, which the OS enforces in the worker process
+    WORKER_LIMITS = {
+        'memory_bytes': 256 * 1024 * 1024,
+        'cpu_seconds': 60,
+        'output_bytes': 16 * 1024 * 1024,
+    }
+    
+    # Seconds between autosaves of the editor contents while typing
+    AUTOSAVE_INTERVAL = 2.0
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.code_executor = CodeExecutor()
         self.file_manager = FileManager()
+        # File I/O runs off the UI thread; results come back through Clock
+        self.file_io = FileIOWorker(self.file_manager, dispatch=self._on_ui_thread)
+        self.autosaver = Autosaver(self._write_draft, interval=self.AUTOSAVE_INTERVAL)
+        self.code_executor = CodeExecutor(
+            cache_dir=self.file_manager.get_cache_dir('bytecode'),
+            limits=ResourceLimits(**self.RUN_LIMITS)
+        )
+        # Variables of the previous session come back lazily, on first use.
+        # They are unpickled, so they live in app-private storage
+        self.session_store = SessionStore(self.file_manager.get_private_dir('session'))
+        self.file_io.call(self.session_store.restore, self.code_executor)
+        # Runs go through a queue that drops presses made while the same code
+        # is already queued and replaces runs of older versions of the buffer
+        self.run_scheduler = RunScheduler(self.code_executor)
+        # RunRequest of the latest run, whose output the output screen shows
+        self._run_request = None
+        # File the editor contents are saved to (None until the first save)
+        self.current_filename = None
+        # How many versions back the History button has gone
+        self._history_steps = 0
+        self._stats_event = None
+        # Runs waiting for the worker pool while it starts (None when not starting)
+        self._pool_waiters = None
         self.setup_ui()
+        self.file_io.call(self.file_manager.load_draft, callback=self._restore_draft)
     
     def setup_ui(self):
         """Set up the user interface"""
@@ -34,16 +85,30 @@ class EditorScreen(Screen):
             text='Python Code Editor',
             font_size=dp(18),
             bold=True,
-            size_hint_x=0.6
+            size_hint_x=0.3
         )
         
         run_button = Button(
             text='Run',
-            size_hint_x=0.2,
+            size_hint_x=0.15,
             background_color=(0.2, 0.8, 0.2, 1),
             on_press=self.run_code
         )
         
+        stop_button = Button(
+            text='Stop',
+            size_hint_x=0.15,
+            background_color=(0.9, 0.3, 0.3, 1),
+            on_press=self.stop_code
+        )
+        
+        profile_button = Button(
+            text='Profile',
+            size_hint_x=0.2,
+            background_color=(0.8, 0.5, 0.2, 1),
+            on_press=self.profile_code
+        )
+        
         save_button = Button(
             text='Save',
             size_hint_x=0.2,
@@ -53,6 +118,8 @@ class EditorScreen(Screen):
         
         header.add_widget(title_label)
         header.add_widget(run_button)
+        header.add_widget(stop_button)
+        header.add_widget(profile_button)
         header.add_widget(save_button)
         
         # Code editor area
@@ -77,6 +144,8 @@ class EditorScreen(Screen):
             height=dp(300)
         )
         
+        self.code_editor.bind(text=self.on_text_changed)
+        
         editor_layout.add_widget(editor_label)
         editor_layout.add_widget(self.code_editor)
         
@@ -85,75 +154,282 @@ class EditorScreen(Screen):
         
         load_button = Button(
             text='Load File',
-            size_hint_x=0.5,
+            size_hint_x=0.2,
             background_color=(0.8, 0.6, 0.2, 1),
             on_press=self.load_file
         )
         
+        # Steps back through the saved versions of the current file
+        history_button = Button(
+            text='History',
+            size_hint_x=0.15,
+            background_color=(0.3, 0.5, 0.7, 1),
+            on_press=self.load_previous_version
+        )
+        
         clear_button = Button(
             text='Clear',
-            size_hint_x=0.5,
+            size_hint_x=0.15,
             background_color=(0.8, 0.2, 0.2, 1),
             on_press=self.clear_code
         )
         
+        # Cell mode re-runs only the '# %%' cells that changed since the last run
+        self.cell_mode_button = ToggleButton(
+            text='Cells',
+            size_hint_x=0.15,
+            background_color=(0.5, 0.4, 0.8, 1)
+        )
+        
+        # Isolated runs go to a worker process with a hard memory cap
+        self.isolate_button = ToggleButton(
+            text='Isolate',
+            size_hint_x=0.15,
+            background_color=(0.3, 0.6, 0.5, 1)
+        )
+        
+        # Debug overlay with the executor's telemetry
+        stats_button = ToggleButton(
+            text='Stats',
+            size_hint_x=0.2,
+            background_color=(0.4, 0.4, 0.4, 1),
+            on_press=self.toggle_stats
+        )
+        
         file_layout.add_widget(load_button)
+        file_layout.add_widget(history_button)
         file_layout.add_widget(clear_button)
+        file_layout.add_widget(self.cell_mode_button)
+        file_layout.add_widget(self.isolate_button)
+        file_layout.add_widget(stats_button)
+        
+        # Telemetry overlay, hidden until the Stats button is pressed
+        self.stats_label = Label(
+            text='',
+            font_size=dp(11),
+            halign='left',
+            valign='top',
+            color=(0.6, 0.9, 0.6, 1),
+            size_hint_y=None,
+            height=0,
+            opacity=0
+        )
+        self.stats_label.bind(size=self.stats_label.setter('text_size'))
         
         # Add all widgets to main layout
         main_layout.add_widget(header)
         main_layout.add_widget(editor_layout)
         main_layout.add_widget(file_layout)
+        main_layout.add_widget(self.stats_label)
         
         self.add_widget(main_layout)
     
-    def run_code(self, instance=None):
-        """Execute the Python code"""
+    def run_code(self, instance=None, mode=None):
+        """Execute the Python code in the background, streaming its output"""
         code = self.code_editor.text
         if not code.strip():
             return
         
         try:
-            # Execute the code and get results
-            result = self.code_executor.execute(code)
-            
-            # Switch to output screen to show results
+            # Switch to output screen and stream results as they are produced
             app = self.manager.get_screen('output')
-            app.display_output(result)
             self.manager.current = 'output'
             
+            if mode is None:
+                if self.cell_mode_button.state == 'down':
+                    mode = 'cells'
+                elif self.isolate_button.state == 'down':
+                    mode = 'isolated'
+                else:
+                    mode = 'normal'
+            if mode == 'isolated' and self.code_executor.worker_pool is None:
+                # The run follows once the worker process is up
+                app.display_output("Starting worker process...")
+                self._start_worker_pool(lambda: self._submit_run(code, mode))
+                return
+            self._submit_run(code, mode)
+            
         except Exception as e:
             # Show error in output screen
             app = self.manager.get_screen('output')
             app.display_output(f"Error: {str(e)}")
             self.manager.current = 'output'
     
+    def _submit_run(self, code, mode):
+        app = self.manager.get_screen('output')
+        run_id = app.new_run_id()
+        # A press for code that is already queued or running joins that
+        # run; anything else supersedes the previous run
+        request = self.run_scheduler.submit(
+            code,
+            mode=mode,
+            source='editor',
+            on_output=partial(app.stream_output, run_id=run_id),
+            on_complete=partial(app.finish_stream, run_id=run_id)
+        )
+        if request is not self._run_request:
+            self._run_request = request
+            app.begin_stream(run_id)
+    
+    def _start_worker_pool(self, then):
+        # Started on the first isolated run, so plain runs never pay for it.
+        # Forking and warming up the worker takes a while, so it happens
+        # off the UI thread
+        if self._pool_waiters is not None:
+            self._pool_waiters.append(then)
+            return
+        self._pool_waiters = [then]
+        threading.Thread(target=self._create_worker_pool, name='worker-pool-start', daemon=True).start()
+    
+    def _create_worker_pool(self):
+        try:
+            pool, error = WorkerPool(size=1, limits=ResourceLimits(**self.WORKER_LIMITS)), None
+        except Exception as e:
+            pool, error = None, e
+        self._on_ui_thread(lambda: self._on_worker_pool_started(pool, error))
+    
+    def _on_worker_pool_started(self, pool, error):
+        waiters, self._pool_waiters = self._pool_waiters, None
+        if error is not None:
+            app = self.manager.get_screen('output')
+            app.display_output(f"Error starting worker process: {str(error)}")
+            return
+        self.code_executor.worker_pool = pool
+        for then in waiters:
+            then()
+    
+    def shutdown_workers(self):
+        """Stop the worker process of isolated runs, if it was started"""
+        if self.code_executor.worker_pool is not None:
+            self.code_executor.worker_pool.shutdown()
+            self.code_executor.worker_pool = None
+    
+    def stop_code(self, instance=None):
+        """Stop the running code and any queued runs from the editor"""
+        if self._pool_waiters is not None:
+            # Runs waiting for the worker process to start are dropped too
+            self._pool_waiters.clear()
+        self.run_scheduler.cancel(source='editor')
+    
+    def profile_code(self, instance=None):
+        """Execute the Python code under the profiler"""
+        self.run_code(mode='profile')
+    
     def save_code(self, instance=None):
         """Save the current code to a file"""
         code = self.code_editor.text
         if code.strip():
-            try:
-                filename = self.file_manager.save_code(code)
-                # Show success message
-                app = self.manager.get_screen('output')
-                app.display_output(f"Code saved successfully to: {filename}")
-                self.manager.current = 'output'
-            except Exception as e:
-                app = self.manager.get_screen('output')
-                app.display_output(f"Error saving file: {str(e)}")
-                self.manager.current = 'output'
+            self.file_io.save(code, self.current_filename, callback=self._on_saved)
+    
+    def _on_saved(self, filename, error):
+        app = self.manager.get_screen('output')
+        if error is None:
+            # Later saves update this file and add to its history
+            self.current_filename = filename
+            self._history_steps = 0
+            # Show success message
+            app.display_output(f"Code saved successfully to: {filename}")
+        else:
+            app.display_output(f"Error saving file: {str(error)}")
+        self.manager.current = 'output'
     
     def load_file(self, instance=None):
         """Load code from a file"""
-        try:
-            code = self.file_manager.load_code()
-            if code:
-                self.code_editor.text = code
-        except Exception as e:
+        self.file_io.call(self._read_file, callback=self._on_loaded)
+    
+    def _read_file(self):
+        # Runs on the I/O thread, so the name belongs to this load
+        code = self.file_manager.load_code()
+        return self.file_manager.last_loaded, code
+    
+    def _on_loaded(self, loaded, error):
+        if error is not None:
             app = self.manager.get_screen('output')
-            app.display_output(f"Error loading file: {str(e)}")
+            app.display_output(f"Error loading file: {str(error)}")
             self.manager.current = 'output'
+        elif loaded and loaded[1]:
+            self.current_filename, self.code_editor.text = loaded
+            self._history_steps = 0
+    
+    def load_previous_version(self, instance=None):
+        """Replace the editor contents with the previous saved version of the file"""
+        if self.current_filename is None:
+            return
+        self._history_steps += 1
+        # Version -1 is the latest save
+        self.file_io.call(self.file_manager.load_version, self.current_filename,
+                          -1 - self._history_steps, callback=self._on_version_loaded)
+    
+    def _on_version_loaded(self, code, error):
+        if error is not None:
+            self._history_steps -= 1
+            app = self.manager.get_screen('output')
+            app.display_output(f"No earlier version of {self.current_filename}")
+            self.manager.current = 'output'
+        else:
+            self.code_editor.text = code
+    
+    def _on_ui_thread(self, callback):
+        Clock.schedule_once(lambda dt: callback())
+    
+    def on_text_changed(self, instance, text):
+        """Autosave the editor contents, coalescing rapid edits"""
+        self.autosaver.schedule(text)
+    
+    def _write_draft(self, text):
+        self.file_io.call(self.file_manager.save_draft, text)
+    
+    def _restore_draft(self, draft, error):
+        # Only fill an untouched editor, never overwrite what the user typed
+        if draft and not self.code_editor.text:
+            self.code_editor.text = draft
+    
+    def flush_autosave(self, wait: bool = False):
+        """Write pending editor changes now, e.g. when the app is paused"""
+        self.autosaver.flush()
+        if wait:
+            self.file_io.shutdown(wait=True)
+    
+    def toggle_stats(self, instance=None):
+        """Show or hide the telemetry overlay"""
+        if self._stats_event is None:
+            self.stats_label.height = dp(80)
+            self.stats_label.opacity = 1
+            self.update_stats()
+            self._stats_event = Clock.schedule_interval(self.update_stats, 1.0)
+        else:
+            self._stats_event.cancel()
+            self._stats_event = None
+            self.stats_label.height = 0
+            self.stats_label.opacity = 0
+    
+    def update_stats(self, dt=None):
+        """Refresh the telemetry overlay"""
+        self.stats_label.text = self.code_executor.telemetry.format_summary()
+    
+    def dump_telemetry(self):
+        """Append the current telemetry to the rotating file in the app directory"""
+        try:
+            return self.code_executor.telemetry.dump(self.file_manager.get_cache_dir('telemetry'))
+        except OSError:
+            # Telemetry is best effort and must never break the app
+            return None
+    
+    def save_session(self):
+        """
+        Save the executor's variables so a restarted app can pick them up
+        
+        Pickling a large namespace takes a while, and Android kills apps
+        that stall in on_pause, so this runs on the file I/O thread.
+        
+        Returns:
+            Future of the save statistics
+        """
+        return self.file_io.call(self.session_store.save, self.code_executor)
     
     def clear_code(self, instance=None):
         """Clear the code editor"""
-        self.code_editor.text = "" 
\ No newline at end of file
+        self.code_editor.text = ""
+        # The next save starts a new file
+        self.current_filename = None
+        self._history_steps = 0 
\ No newline at end of file
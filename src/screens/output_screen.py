@@ -2,6 +2,9 @@
 Output Screen - Displays code execution results and error messages
 """
 
+import itertools
+import threading
+
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
@@ -9,12 +12,28 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.label import Label
 from kivy.uix.scrollview import ScrollView
 from kivy.metrics import dp
+from kivy.clock import Clock
+
+from ..utils.result_formatter import format_result, format_report
 
 class OutputScreen(Screen):
     """Screen for displaying code execution output"""
     
+    # Streamed text beyond this many characters is trimmed from the start
+    MAX_STREAM_CHARS = 200000
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # Streamed output is collected from worker threads and applied on the
+        # UI thread at most once per frame
+        self._stream_lock = threading.Lock()
+        self._pending_chunks = []
+        self._pending_result = None
+        # Callbacks are tagged with the id of their run, so a stopped run
+        # that reports late cannot write into the next run's output
+        self._run_ids = itertools.count(1)
+        self._run_id = None
+        self._flush_trigger = Clock.create_trigger(self._flush_stream, 0)
         self.setup_ui()
     
     def setup_ui(self):
@@ -29,7 +48,14 @@ class OutputScreen(Screen):
             text='Code Execution Output',
             font_size=dp(18),
             bold=True,
-            size_hint_x=0.7
+            size_hint_x=0.5
+        )
+        
+        stop_button = Button(
+            text='Stop',
+            size_hint_x=0.2,
+            background_color=(0.9, 0.3, 0.3, 1),
+            on_press=self.stop_execution
         )
         
         back_button = Button(
@@ -40,6 +66,7 @@ class OutputScreen(Screen):
         )
         
         header.add_widget(title_label)
+        header.add_widget(stop_button)
         header.add_widget(back_button)
         
         # Output display area
@@ -64,8 +91,21 @@ class OutputScreen(Screen):
             height=dp(400)
         )
         
+        # Profile report, only shown after a profiled run
+        self.report_display = TextInput(
+            readonly=True,
+            font_size=dp(12),
+            background_color=(0.15, 0.15, 0.2, 1),
+            foreground_color=(0.9, 0.85, 0.6, 1),
+            multiline=True,
+            size_hint_y=None,
+            height=0,
+            opacity=0
+        )
+        
         output_layout.add_widget(output_label)
         output_layout.add_widget(self.output_display)
+        output_layout.add_widget(self.report_display)
         
         # Action buttons
         button_layout = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10))
@@ -94,9 +134,93 @@ class OutputScreen(Screen):
         
         self.add_widget(main_layout)
     
-    def display_output(self, output):
-        """Display the execution output"""
+    def display_output(self, output, report=None):
+        """Display the execution output and an optional profile report"""
         self.output_display.text = str(output)
+        self.display_report(report)
+    
+    def display_result(self, result):
+        """Display an ExecutionResult together with any report it carries"""
+        self.display_output(format_result(result), format_report(result))
+    
+    def display_report(self, report):
+        """Show a profile report below the output, or hide the report area"""
+        if report is None:
+            self.report_display.text = ""
+            self.report_display.height = 0
+            self.report_display.opacity = 0
+        else:
+            self.report_display.text = str(report)
+            self.report_display.height = dp(250)
+            self.report_display.opacity = 1
+    
+    def new_run_id(self) -> int:
+        """Id to tag the stream callbacks of a new run with"""
+        return next(self._run_ids)
+    
+    def begin_stream(self, run_id=None):
+        """
+        Prepare the display for a new streamed run
+        
+        Args:
+            run_id: Optional id from new_run_id(); from now on only
+                callbacks tagged with it are shown
+        """
+        with self._stream_lock:
+            self._run_id = run_id
+            self._pending_chunks = []
+            self._pending_result = None
+        self.output_display.text = ""
+        self.display_report(None)
+    
+    def stream_output(self, stream_name, text, run_id=None):
+        """
+        Queue a chunk of output for display (safe to call from any thread)
+        
+        Args:
+            stream_name: 'stdout' or 'stderr'
+            text: The text written by the running code
+            run_id: Id the run was started with; chunks of other runs are dropped
+        """
+        with self._stream_lock:
+            if run_id != self._run_id:
+                return
+            self._pending_chunks.append(text)
+        self._flush_trigger()
+    
+    def finish_stream(self, result, run_id=None):
+        """
+        Replace the streamed output with the final result (safe to call from any thread)
+        
+        Args:
+            result: The final ExecutionResult
+            run_id: Id the run was started with; results of other runs are dropped
+        """
+        with self._stream_lock:
+            if run_id != self._run_id:
+                return
+            self._pending_result = result
+        self._flush_trigger()
+    
+    def _flush_stream(self, dt):
+        """Apply all queued chunks to the display in a single update"""
+        with self._stream_lock:
+            chunks = self._pending_chunks
+            result = self._pending_result
+            self._pending_chunks = []
+            self._pending_result = None
+        
+        if result is not None:
+            self.display_result(result)
+        elif chunks:
+            text = self.output_display.text + ''.join(chunks)
+            if len(text) > self.MAX_STREAM_CHARS:
+                text = "[earlier output trimmed]\n" + text[-self.MAX_STREAM_CHARS:]
+            self.output_display.text = text
+    
+    def stop_execution(self, instance=None):
+        """Stop the code started from the editor"""
+        self.manager.get_screen('editor').stop_code()
     
     def go_back(self, instance=None):
         """Return to the editor screen"""
@@ -116,4 +240,5 @@ class OutputScreen(Screen):
     
     def clear_output(self, instance=None):
         """Clear the output display"""
-        self.output_display.text = ""
\ No newline at end of file
+        self.output_display.text = ""
+        self.display_report(None)
\ No newline at end of file
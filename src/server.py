@@ -0,0 +1,212 @@
+"""
+Remote execution server - Runs code sent by the app on a faster machine
+
+Never imports Kivy. Start it on a workstation and give the app a
+RemoteClient pointing at it. Anyone who can reach the port can run code,
+so it listens on localhost unless told otherwise.
+"""
+
+import argparse
+import json
+import queue
+import sys
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from .utils.code_executor import CodeExecutor
+from .utils.execution_result import ExecutionResult
+from .utils.resource_limits import ResourceLimits
+from .utils.telemetry import Telemetry
+
+# Seconds of silence after which an empty line is sent, so a client can tell
+# a slow run from a dead connection and a server notices a client that left
+HEARTBEAT_INTERVAL = 0.5
+
+def decode_body(body: bytes, encoding: Optional[str]) -> bytes:
+    """Undo the Content-Encoding of a request body"""
+    if not encoding or encoding == 'identity':
+        return body
+    if encoding in ('gzip', 'deflate'):
+        # wbits 47 accepts both gzip and zlib framing
+        return zlib.decompress(body, 47)
+    raise ValueError(f"Unknown content encoding: {encoding}")
+
+class ExecutionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles GET /health and POST /execute
+    
+    /execute takes a JSON object with 'code' and an optional 'timeout' and
+    answers with a chunked stream of JSON lines: {"stream", "text"} for
+    output as the code writes it, then {"result": ...} with the
+    ExecutionResult data. Empty lines are heartbeats.
+    """
+    
+    # Keep-alive connections and chunked responses
+    protocol_version = 'HTTP/1.1'
+    # Small chunks go out at once instead of waiting for the client's delayed ACK
+    disable_nagle_algorithm = True
+    server_version = 'PythonCodeExecutor/1.0'
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        self._send_json(200, {'status': 'ok', 'runs': self.server.telemetry.counter('runs')})
+    
+    def do_POST(self):
+        if self.path != '/execute':
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = decode_body(self.rfile.read(length), self.headers.get('Content-Encoding'))
+            request = json.loads(body)
+            code = request['code']
+            timeout = min(float(request.get('timeout') or self.server.max_timeout), self.server.max_timeout)
+        except (ValueError, KeyError, TypeError, zlib.error) as e:
+            self._send_json(400, {'error': f"Bad request: {e}"})
+            return
+        self._stream_run(code, timeout)
+    
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _write_chunk(self, data: bytes, compressor=None, final: bool = False):
+        """Send one HTTP chunk, compressed and flushed so the client can read it at once"""
+        if compressor is not None:
+            data = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        if data:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        if final:
+            self.wfile.write(b'0\r\n\r\n')
+    
+    def _write_events(self, events: list, compressor=None):
+        data = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+        self._write_chunk(data.encode('utf-8'), compressor)
+    
+    def _stream_run(self, code: str, timeout: float):
+        events = queue.Queue()
+        executor = CodeExecutor(cache_dir=self.server.cache_dir, telemetry=self.server.telemetry,
+                                limits=self.server.limits)
+        handle = executor.execute_async(
+            code,
+            on_output=lambda stream, text: events.put((stream, text)),
+            on_complete=lambda result: events.put(('result', result))
+        )
+        
+        compressor = None
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            compressor = zlib.compressobj(wbits=31)
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        
+        deadline = time.monotonic() + timeout
+        result = None
+        try:
+            while result is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    handle.cancel(wait=1.0)
+                    result = ExecutionResult.timed_out(timeout)
+                    break
+                try:
+                    event = events.get(timeout=min(HEARTBEAT_INTERVAL, remaining))
+                except queue.Empty:
+                    self._write_chunk(b'\n', compressor)
+                    continue
+                
+                # Send all output that is already waiting in one chunk
+                lines = []
+                while True:
+                    stream, payload = event
+                    if stream == 'result':
+                        result = payload
+                        break
+                    lines.append({'stream': stream, 'text': payload})
+                    try:
+                        event = events.get_nowait()
+                    except queue.Empty:
+                        break
+                if lines:
+                    self._write_events(lines, compressor)
+            
+            data = result.to_dict()
+            # Keep the reasons, which to_dict() leaves out
+            data['blocked_functions'] = result.blocked_functions
+            self._write_events([{'result': data}], compressor)
+            self._write_chunk(b'', compressor, final=True)
+        except OSError:
+            # The client went away or gave up: stop its code
+            handle.cancel(wait=1.0)
+            self.close_connection = True
+
+class ExecutionServer(ThreadingHTTPServer):
+    """HTTP server running each request in its own thread with a fresh namespace"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, limits: Optional[ResourceLimits] = None, max_timeout: float = 60.0,
+                 cache_dir: Optional[str] = None, verbose: bool = False):
+        """
+        Args:
+            address: (host, port) to listen on; port 0 picks a free port
+            limits: Optional ResourceLimits applied to every run
+            max_timeout: Longest run allowed, whatever the client asks for
+            cache_dir: Optional directory for the shared bytecode cache
+            verbose: Log every request to stderr
+        """
+        super().__init__(address, ExecutionRequestHandler)
+        self.limits = limits
+        self.max_timeout = max_timeout
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+        self.telemetry = Telemetry()
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def main(argv=None) -> int:
+    """Serve until interrupted"""
+    parser = argparse.ArgumentParser(description='Run Python code sent by the app on this machine')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on (0.0.0.0 for the whole network)')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    parser.add_argument('--timeout', type=float, default=60.0, help='longest run allowed in seconds')
+    parser.add_argument('--memory-mb', type=int, help='memory limit per run in MB')
+    parser.add_argument('--cache-dir', help='directory for the bytecode cache')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+    
+    limits = None
+    if args.memory_mb:
+        limits = ResourceLimits(memory_bytes=args.memory_mb * 1024 * 1024)
+    
+    server = ExecutionServer((args.host, args.port), limits=limits, max_timeout=args.timeout,
+                             cache_dir=args.cache_dir, verbose=args.verbose)
+    print(f"Serving on {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Batch Executor - Runs many saved scripts in parallel worker processes
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, Optional
+
+from .worker_pool import WorkerPool
+from .execution_result import ExecutionResult
+
+def _run_script(pool: WorkerPool, path: str, timeout: Optional[float]) -> dict:
+    """Run one script in the pool and describe the outcome"""
+    start = time.perf_counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            code = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        result = ExecutionResult.failed(e)
+    else:
+        result = pool.execute(code, timeout)
+    
+    record = {'path': path, 'time': time.perf_counter() - start}
+    record.update(result.to_dict())
+    return record
+
+def execute_many(paths: Iterable[str], workers: Optional[int] = None,
+                 timeout: Optional[float] = None) -> Iterator[dict]:
+    """
+    Execute scripts in parallel, one isolated worker process per script at a time
+    
+    Args:
+        paths: Paths of the scripts to run
+        workers: Number of worker processes (defaults to the number of cores)
+        timeout: Per-script time limit in seconds; scripts past it are killed
+    
+    Yields:
+        One dictionary per script, in completion order, with path, time in
+        seconds and the fields of ExecutionResult.to_dict() (status, stdout,
+        stderr, error, timings, ...)
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    
+    with WorkerPool(size=workers) as pool, ThreadPoolExecutor(max_workers=workers) as dispatcher:
+        futures = [dispatcher.submit(_run_script, pool, path, timeout) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,159 @@
+"""
+Blob Store - Content-addressed, compressed storage for saved scripts
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from .file_io import atomic_write
+
+MANIFEST_VERSION = 1
+
+class BlobStore:
+    """
+    Scripts stored as zlib-compressed blobs named by their content hash
+    
+    A manifest maps each script name to the hash of its content, so any
+    number of names holding the same code share one blob, and saving code
+    a name already holds writes nothing at all. A blob is deleted once no
+    name refers to it any more.
+    """
+    
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory holding the blobs and the manifest
+        """
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, 'blobs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        # name -> {'hash', 'size', 'modified'}
+        self._manifest: Dict[str, dict] = {}
+        self.writes = 0
+        self.skipped = 0
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self._manifest = manifest['names']
+        except (OSError, ValueError, KeyError):
+            self._manifest = {}
+    
+    @staticmethod
+    def hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+    
+    def _blob_path(self, digest: str) -> str:
+        # Fanned out so no directory gets too large
+        return os.path.join(self.blob_dir, digest[:2], digest[2:])
+    
+    def _write_manifest(self):
+        atomic_write(self.manifest_path, json.dumps(
+            {'version': MANIFEST_VERSION, 'names': self._manifest}, separators=(',', ':')))
+    
+    def _put(self, data: bytes, digest: str):
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _release(self, digest: str):
+        """Delete a blob if no name refers to it"""
+        if any(entry['hash'] == digest for entry in self._manifest.values()):
+            return
+        try:
+            os.remove(self._blob_path(digest))
+        except OSError:
+            pass
+    
+    def save(self, name: str, text: str) -> bool:
+        """
+        Store text under a name
+        
+        Returns:
+            False if the name already held this text and nothing was written
+        """
+        data = text.encode('utf-8')
+        digest = self.hash(data)
+        previous = self._manifest.get(name)
+        if previous is not None and previous['hash'] == digest:
+            self.skipped += 1
+            return False
+        self._put(data, digest)
+        self._manifest[name] = {'hash': digest, 'size': len(data), 'modified': time.time()}
+        self._write_manifest()
+        self.writes += 1
+        if previous is not None:
+            self._release(previous['hash'])
+        return True
+    
+    def load(self, name: str) -> str:
+        """
+        Text stored under a name
+        
+        Raises:
+            KeyError: If nothing is stored under the name
+        """
+        entry = self._manifest[name]
+        with open(self._blob_path(entry['hash']), 'rb') as f:
+            return zlib.decompress(f.read()).decode('utf-8')
+    
+    def delete(self, name: str) -> bool:
+        """Remove a name; False if it was not stored"""
+        entry = self._manifest.pop(name, None)
+        if entry is None:
+            return False
+        self._write_manifest()
+        self._release(entry['hash'])
+        return True
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._manifest
+    
+    def __len__(self) -> int:
+        return len(self._manifest)
+    
+    def get(self, name: str) -> Optional[dict]:
+        """Information on one name, or None if it is not stored"""
+        entry = self._manifest.get(name)
+        if entry is None:
+            return None
+        return {
+            'name': name,
+            'size': entry['size'],
+            'modified': entry['modified'],
+            'hash': entry['hash'],
+        }
+    
+    def list(self) -> List[dict]:
+        """Information on every stored name, most recently saved first"""
+        infos = [self.get(name) for name in self._manifest]
+        infos.sort(key=lambda info: info['modified'], reverse=True)
+        return infos
+    
+    def stored_bytes(self) -> int:
+        """Bytes taken by the blobs"""
+        total = 0
+        for root, _, files in os.walk(self.blob_dir):
+            for filename in files:
+                total += os.path.getsize(os.path.join(root, filename))
+        return total
@@ -0,0 +1,119 @@
+"""
+Execution Budget - Step limits enforced by instrumenting the user's AST
+"""
+
+import ast
+
+# Names injected into the executed code's globals while a budget is active
+TICK_NAME = '__budget_tick__'
+ITER_NAME = '__budget_iter__'
+
+class BudgetTransformer(ast.NodeTransformer):
+    """
+    Rewrite a module so that running it spends an execution budget
+    
+    Every loop iteration and every function call starts with a call to
+    __budget_tick__(), and the iterables of comprehensions and generator
+    expressions are wrapped in __budget_iter__() so each item they
+    produce is paid for too.
+    """
+    
+    def _tick(self, node: ast.AST) -> ast.stmt:
+        call = ast.Expr(ast.Call(ast.Name(TICK_NAME, ast.Load()), [], []))
+        return ast.copy_location(call, node)
+    
+    def _prepend_tick(self, node, body: list) -> list:
+        # Keep a docstring as the first statement so __doc__ still works
+        if (body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)):
+            return [body[0], self._tick(node)] + body[1:]
+        return [self._tick(node)] + body
+    
+    def _visit_loop(self, node):
+        self.generic_visit(node)
+        node.body = [self._tick(node)] + node.body
+        return node
+    
+    visit_For = visit_AsyncFor = visit_While = _visit_loop
+    
+    def _visit_function(self, node):
+        self.generic_visit(node)
+        node.body = self._prepend_tick(node, node.body)
+        return node
+    
+    visit_FunctionDef = visit_AsyncFunctionDef = _visit_function
+    
+    def visit_comprehension(self, node: ast.comprehension):
+        self.generic_visit(node)
+        if not node.is_async:
+            wrapped = ast.Call(ast.Name(ITER_NAME, ast.Load()), [node.iter], [])
+            node.iter = ast.copy_location(wrapped, node.iter)
+        return node
+
+def instrument_tree(tree: ast.Module) -> ast.Module:
+    """
+    Instrument a parsed module in place for budgeted execution
+    
+    Args:
+        tree: Module parsed from the user's code
+    
+    Returns:
+        The same tree, ready to compile
+    """
+    BudgetTransformer().visit(tree)
+    return ast.fix_missing_locations(tree)
+
+class ExecutionBudget:
+    """
+    Step budget for code compiled with instrument_tree
+    
+    Used as a context manager around the run: it installs the tick
+    functions into the namespace and disarms them afterwards. Once the
+    budget is spent every further tick raises again, so user code that
+    catches the TimeoutError cannot keep looping.
+    """
+    
+    def __init__(self, namespace: dict, max_steps: int):
+        """
+        Args:
+            namespace: Globals the instrumented code runs in
+            max_steps: Loop iterations, function calls and comprehension
+                items allowed before the run is stopped
+        """
+        self.namespace = namespace
+        self.max_steps = max_steps
+        self.remaining = max_steps
+    
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining < 0
+    
+    @property
+    def steps(self) -> int:
+        """Steps spent so far"""
+        return min(self.max_steps - self.remaining, self.max_steps)
+    
+    def tick(self):
+        self.remaining -= 1
+        if self.remaining < 0:
+            raise TimeoutError(f"Execution budget of {self.max_steps} steps exhausted")
+    
+    def iterate(self, iterable):
+        tick = self.tick
+        for item in iterable:
+            tick()
+            yield item
+    
+    def __enter__(self):
+        self.namespace[TICK_NAME] = self.tick
+        self.namespace[ITER_NAME] = self.iterate
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        # Functions defined during the run keep calling the tick functions,
+        # so leave free stand-ins behind instead of removing them
+        self.namespace[TICK_NAME] = _free_tick
+        self.namespace[ITER_NAME] = iter
+
+def _free_tick():
+    """Tick used once the budgeted run is over"""
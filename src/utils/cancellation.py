@@ -0,0 +1,135 @@
+"""
+Cancellation - Stopping running code from another thread
+"""
+
+import sys
+import threading
+from typing import Optional
+
+try:
+    import ctypes
+    _set_async_exc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+except (ImportError, AttributeError):  # Interpreters without the C API
+    ctypes = None
+    _set_async_exc = None
+
+class ExecutionCancelled(BaseException):
+    """
+    Raised inside code that was cancelled
+    
+    Derives from BaseException so that the usual 'except Exception' in
+    user code does not swallow it.
+    """
+
+class CancelHandle:
+    """
+    Handle for stopping a run
+    
+    The executor enters the handle around the user's code. cancel() then
+    raises ExecutionCancelled in the thread running that code, by async
+    exception injection where the C API is available and through a trace
+    function otherwise. The exception is injected again until the code
+    has stopped, so a bare 'except:' cannot keep it running. Code blocked
+    in a single C call (such as a long time.sleep) stops when that call
+    returns.
+    """
+    
+    # Seconds between repeated injections while the code keeps running
+    RETRY_INTERVAL = 0.05
+    
+    def __init__(self):
+        self.thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        # Exception raised in the code, ExecutionCancelled or a subclass
+        self.exception = ExecutionCancelled
+        # Identifier of the thread currently inside the user's code
+        self._target = None
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def cancel(self, wait: Optional[float] = None, exception=ExecutionCancelled) -> bool:
+        """
+        Request that the code stops
+        
+        Args:
+            wait: Seconds to wait for the code to stop (None returns at once)
+            exception: ExecutionCancelled subclass to raise in the code, so
+                it can tell why it was stopped
+        
+        Returns:
+            True if the code is known to have stopped
+        """
+        if not self._cancelled.is_set():
+            self.exception = exception
+            self._cancelled.set()
+            if _set_async_exc is not None and self._inject():
+                threading.Thread(target=self._keep_injecting, daemon=True).start()
+        if wait is not None:
+            self._finished.wait(wait)
+        return self._finished.is_set() or self._target is None
+    
+    def _inject(self) -> bool:
+        """Raise ExecutionCancelled in the running code; False once it has left"""
+        with self._lock:
+            if self._target is None or self._finished.is_set():
+                return False
+            _set_async_exc(ctypes.c_ulong(self._target), ctypes.py_object(self.exception))
+            return True
+    
+    def _keep_injecting(self):
+        while not self._finished.wait(self.RETRY_INTERVAL):
+            if not self._inject():
+                break
+    
+    def _trace(self, frame, event, arg):
+        # Fallback when exceptions cannot be injected: checked on every line
+        if self._cancelled.is_set():
+            raise self.exception()
+        return self._trace
+    
+    def is_alive(self) -> bool:
+        """Whether the thread running the code (if any) is still going"""
+        return self.thread is not None and self.thread.is_alive()
+    
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the thread running the code"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+    
+    def __enter__(self):
+        self._finished.clear()
+        with self._lock:
+            if self._cancelled.is_set():
+                # Cancelled before the code started
+                self._finished.set()
+                raise self.exception()
+            self._target = threading.get_ident()
+        if _set_async_exc is None:
+            sys.settrace(self._trace)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            if _set_async_exc is None:
+                sys.settrace(None)
+        finally:
+            self._leave()
+    
+    def _leave(self):
+        """Stop injecting into this thread, which may go on to run other code"""
+        while True:
+            try:
+                with self._lock:
+                    if self._target is not None and _set_async_exc is not None and self._cancelled.is_set():
+                        # Drop an injected exception that has not been delivered yet
+                        _set_async_exc(ctypes.c_ulong(self._target), None)
+                    self._target = None
+                self._finished.set()
+                return
+            except ExecutionCancelled:
+                # Delivered after the code had finished; the run is over anyway
+                continue
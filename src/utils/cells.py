@@ -0,0 +1,64 @@
+"""
+Cells - Split editor source into notebook-style cells on '# %%' markers
+"""
+
+import re
+from collections import namedtuple
+from typing import List, Sequence
+
+from .compile_cache import CompileCache
+
+# A marker line starts a new cell: '# %%', '#%%', '# %% Load data', ...
+CELL_MARKER = re.compile(r'^#\s*%%')
+
+Cell = namedtuple('Cell', ['index', 'first_line', 'source', 'key'])
+
+def split_cells(code: str) -> List[Cell]:
+    """
+    Split source code into cells
+    
+    Each marker line belongs to the cell it starts. Code before the first
+    marker forms its own cell.
+    
+    Args:
+        code: Python source code
+    
+    Returns:
+        List of cells with their 1-based first line number and source hash
+    """
+    cells = []
+    current = []
+    first_line = 1
+    
+    for line_number, line in enumerate(code.splitlines(True), start=1):
+        if CELL_MARKER.match(line) and current:
+            cells.append(_make_cell(len(cells), first_line, current))
+            current = []
+            first_line = line_number
+        current.append(line)
+    
+    if current:
+        cells.append(_make_cell(len(cells), first_line, current))
+    
+    return cells
+
+def _make_cell(index: int, first_line: int, lines: List[str]) -> Cell:
+    source = ''.join(lines)
+    return Cell(index, first_line, source, CompileCache.make_key(source))
+
+def first_changed_cell(cells: Sequence[Cell], previous_keys: Sequence[str]) -> int:
+    """
+    Find the first cell that has to be executed again
+    
+    Args:
+        cells: Cells of the current source
+        previous_keys: Source hashes of the cells that ran successfully last time
+    
+    Returns:
+        Index of the first cell whose source differs from the previous run
+        (len(cells) if nothing changed)
+    """
+    for index, cell in enumerate(cells):
+        if index >= len(previous_keys) or previous_keys[index] != cell.key:
+            return index
+    return len(cells)
@@ -0,0 +1,112 @@
+"""
+Checkpoints - Named snapshots of an executor namespace
+"""
+
+import copy
+import time
+import types
+from typing import Dict, List, Tuple
+
+# Values of these types are never modified in place, so snapshots share them
+_SHARED_TYPES = (
+    type(None), bool, int, float, complex, str, bytes, range, type,
+    types.FunctionType, types.BuiltinFunctionType, types.ModuleType,
+    types.MethodType, types.CodeType,
+)
+
+def _copy_namespace(namespace: dict, memo: dict) -> Tuple[dict, List[str]]:
+    """
+    Copy a namespace for a snapshot
+    
+    Immutable values are shared; everything else is deep-copied, using one
+    memo for the whole snapshot so objects reachable under several names
+    stay shared between them. Values that cannot be copied are shared too.
+    
+    Returns:
+        Tuple of (copied namespace, names of values that had to be shared)
+    """
+    copied = {}
+    uncopyable = []
+    for name, value in namespace.items():
+        if name == '__builtins__' or isinstance(value, _SHARED_TYPES):
+            copied[name] = value
+            continue
+        try:
+            copied[name] = copy.deepcopy(value, memo)
+        except Exception:
+            copied[name] = value
+            uncopyable.append(name)
+    return copied, uncopyable
+
+class NamespaceCheckpoint:
+    """Snapshot of the global and local namespaces of a CodeExecutor"""
+    
+    def __init__(self, name: str, global_vars: dict, local_vars: dict, cell_keys: list):
+        """
+        Take the snapshot
+        
+        Args:
+            name: Name of the checkpoint
+            global_vars: Global namespace to copy
+            local_vars: Local namespace to copy
+            cell_keys: Cell-mode state at the time of the snapshot
+        """
+        start = time.perf_counter()
+        memo = {}
+        self.name = name
+        self.global_vars, uncopyable = _copy_namespace(global_vars, memo)
+        self.local_vars, uncopyable_locals = _copy_namespace(local_vars, memo)
+        # Names whose values are shared with the live namespace, e.g. open files
+        self.uncopyable = uncopyable + uncopyable_locals
+        self.cell_keys = list(cell_keys)
+        self.created = time.time()
+        self.snapshot_time = time.perf_counter() - start
+    
+    def restore_into(self, global_vars: dict, local_vars: dict):
+        """
+        Replace the contents of the live namespaces with a copy of the snapshot
+        
+        The dictionaries are updated in place because functions defined by
+        the user's code keep a reference to the global namespace. The
+        snapshot itself stays untouched, so it can be restored again.
+        """
+        memo = {}
+        restored_globals, _ = _copy_namespace(self.global_vars, memo)
+        restored_locals, _ = _copy_namespace(self.local_vars, memo)
+        global_vars.clear()
+        global_vars.update(restored_globals)
+        local_vars.clear()
+        local_vars.update(restored_locals)
+    
+    def __repr__(self):
+        return (f"<NamespaceCheckpoint {self.name!r}: {len(self.global_vars) + len(self.local_vars)} "
+                f"names, taken in {self.snapshot_time * 1000:.1f} ms>")
+
+class CheckpointStore:
+    """Named checkpoints kept by an executor"""
+    
+    def __init__(self):
+        self._checkpoints: Dict[str, NamespaceCheckpoint] = {}
+    
+    def save(self, checkpoint: NamespaceCheckpoint):
+        """Store a checkpoint, replacing any with the same name"""
+        self._checkpoints[checkpoint.name] = checkpoint
+    
+    def get(self, name: str) -> NamespaceCheckpoint:
+        if name not in self._checkpoints:
+            raise ValueError(f"Unknown checkpoint: {name}")
+        return self._checkpoints[name]
+    
+    def delete(self, name: str):
+        self._checkpoints.pop(name, None)
+    
+    def names(self) -> List[str]:
+        """Checkpoint names, oldest first"""
+        return [checkpoint.name for checkpoint in
+                sorted(self._checkpoints.values(), key=lambda checkpoint: checkpoint.created)]
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._checkpoints
+    
+    def __len__(self) -> int:
+        return len(self._checkpoints)
@@ -3,20 +3,69 @@ Code Executor - Safely executes Python code and captures output
 """
 
 import sys
-import io
-import traceback
 import ast
-from contextlib import redirect_stdout, redirect_stderr
-from typing import Dict, Any, Optional
+import threading
+from contextlib import nullcontext
+from types import CodeType
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from . import stream_router
+from .compile_cache import CompileCache
+from .cells import split_cells, first_changed_cell
+from .profiler import ExecutionProfiler
+from .line_timer import LineTimer
+from .output_capture import BoundedOutputBuffer
+from .execution_result import ExecutionResult, ErrorInfo, peak_rss
+from .telemetry import Telemetry
+from .budget import ExecutionBudget, instrument_tree
+from .cancellation import CancelHandle, ExecutionCancelled
+from .resource_limits import ResourceLimits, ResourceLimitExceeded, ResourceMonitor, OutputBudget
+from .checkpoints import NamespaceCheckpoint, CheckpointStore
+from .session_store import LazyBuiltins
+
+# Modes accepted by execute_async
+EXECUTION_MODES = ('normal', 'cells', 'profile', 'lines', 'budget', 'remote', 'isolated')
+
+# Steps allowed in budgeted mode: tens of millions of loop iterations take
+# seconds, not minutes, on a phone
+DEFAULT_MAX_STEPS = 20000000
 
 class CodeExecutor:
     """Handles safe execution of Python code"""
     
-    def __init__(self):
+    def __init__(self, worker_pool=None, cache_dir: Optional[str] = None, cache_size: int = 64,
+                 max_output_memory: int = 1024 * 1024, telemetry: Optional[Telemetry] = None,
+                 limits: Optional[ResourceLimits] = None, remote=None):
+        """
+        Args:
+            worker_pool: Optional WorkerPool used by execute_with_timeout to run
+                code in separate processes that can be killed on timeout
+            cache_dir: Optional directory for the persistent bytecode cache
+            cache_size: Number of compiled scripts kept in memory
+            max_output_memory: Bytes of stdout/stderr kept in memory per run;
+                output past this is spilled to a temporary file
+            telemetry: Optional Telemetry to record runs in, e.g. one shared
+                by several executors (defaults to a new one)
+            limits: Optional ResourceLimits applied to every in-process run
+            remote: Optional RemoteClient used by execute_remote to run code
+                on an execution server
+        """
+        self.worker_pool = worker_pool
+        self.max_output_memory = max_output_memory
+        self.compile_cache = CompileCache(cache_size, cache_dir)
+        self.telemetry = telemetry or Telemetry()
+        self.limits = limits
+        self.remote = remote
         self.global_vars = {}
         self.local_vars = {}
-        self.output_buffer = io.StringIO()
-        self.error_buffer = io.StringIO()
+        # Named namespace snapshots
+        self.checkpoints = CheckpointStore()
+        # Source hashes of the cells that completed in the last cell-mode run
+        self._cell_keys = []
+        # Capture buffers of the most recent run, kept until the next run so
+        # the full (possibly spilled) output can still be read
+        self.output_buffer = self._new_buffer('stdout')
+        self.error_buffer = self._new_buffer('stderr')
         
         # Functions that require user input
         self.input_functions = {
@@ -47,122 +96,491 @@ class CodeExecutor:
         Returns:
             List of detected input functions
         """
-        detected_functions = []
-        
         try:
             # Parse the code to analyze it
-            tree = ast.parse(code)
-            
-            # Check for function calls and imports
-            for node in ast.walk(tree):
-                # Check for function calls
-                if isinstance(node, ast.Call):
-                    if isinstance(node.func, ast.Name):
-                        func_name = node.func.id
-                        if func_name in self.input_functions:
-                            detected_functions.append(func_name)
-                
-                # Check for imports
-                elif isinstance(node, ast.Import):
-                    for alias in node.names:
-                        if alias.name in self.input_functions:
-                            detected_functions.append(alias.name)
-                
-                # Check for from imports
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module in self.input_functions:
-                        detected_functions.append(node.module)
-                    for alias in node.names:
-                        if alias.name in self.input_functions:
-                            detected_functions.append(alias.name)
-        
+            return self.scan_tree(ast.parse(code))
         except SyntaxError:
             # If the code has syntax errors, we'll let the normal execution handle it
-            pass
+            return []
+    
+    def scan_tree(self, tree: ast.AST) -> list:
+        """
+        Check an already parsed module for functions that require user input
+        
+        Args:
+            tree: AST of the code to analyze
+            
+        Returns:
+            List of detected input functions
+        """
+        detected_functions = []
+        
+        # Check for function calls and imports
+        for node in ast.walk(tree):
+            # Check for function calls
+            if isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Name):
+                    func_name = node.func.id
+                    if func_name in self.input_functions:
+                        detected_functions.append(func_name)
+            
+            # Check for imports
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name in self.input_functions:
+                        detected_functions.append(alias.name)
+            
+            # Check for from imports
+            elif isinstance(node, ast.ImportFrom):
+                if node.module in self.input_functions:
+                    detected_functions.append(node.module)
+                for alias in node.names:
+                    if alias.name in self.input_functions:
+                        detected_functions.append(alias.name)
         
         return list(set(detected_functions))  # Remove duplicates
     
-    def execute(self, code: str) -> str:
+    def compile_code(self, code: str, result: Optional[ExecutionResult] = None,
+                     budgeted: bool = False) -> Tuple[Optional[CodeType], list]:
         """
-        Execute Python code safely and return the output
+        Parse, scan and compile code in a single pass, using the compile cache
+        
+        The source is parsed once; the input-function scan runs on that AST
+        and the same AST is compiled. Unchanged sources are served from the
+        cache without parsing or compiling again.
+        
+        Args:
+            code: Python code to compile
+            result: Optional result on which the parse, scan and compile
+                phases are timed
+            budgeted: Instrument the code to spend an ExecutionBudget
+            
+        Returns:
+            Tuple of (code object, detected input functions). The code object
+            is None when input functions were detected.
+            
+        Raises:
+            SyntaxError: If the code cannot be parsed
+        """
+        if result is None:
+            result = ExecutionResult()
+        
+        with result.phase('compile'):
+            key = self.compile_cache.make_key(code, 'budget' if budgeted else '')
+            cached = self.compile_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        with result.phase('parse'):
+            tree = ast.parse(code, filename='<string>')
+        with result.phase('scan'):
+            detected_functions = self.scan_tree(tree)
+        
+        # Blocked code is never executed, so don't spend time compiling it
+        code_obj = None
+        if not detected_functions:
+            with result.phase('compile'):
+                if budgeted:
+                    instrument_tree(tree)
+                code_obj = compile(tree, '<string>', 'exec')
+        
+        self.compile_cache.put(key, code_obj, detected_functions)
+        return code_obj, detected_functions
+    
+    def execute(self, code: str, on_output: Optional[Callable[[str, str], None]] = None,
+                cancel: Optional[CancelHandle] = None) -> ExecutionResult:
+        """
+        Execute Python code safely and return the outcome
         
         Args:
             code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) for every
+                write to stdout or stderr while the code runs
+            cancel: Optional CancelHandle for stopping the run from another thread
             
         Returns:
-            String containing the execution output and any errors
+            ExecutionResult with the captured output, any error and timings
         """
-        # Check for input functions first
-        input_functions = self.check_for_input_functions(code)
-        if input_functions:
-            error_msg = "❌ Code execution blocked!\n\n"
-            error_msg += "The following functions require user input and are not allowed:\n"
-            for func in input_functions:
-                error_msg += f"• {func}: {self.input_functions.get(func, 'Requires user interaction')}\n"
-            error_msg += "\n💡 Suggestions:\n"
-            error_msg += "• Use hardcoded values instead of input()\n"
-            error_msg += "• Define variables with your test data\n"
-            error_msg += "• Use random values for testing\n"
-            error_msg += "• Example: name = 'John' instead of name = input('Enter name: ')\n"
-            return error_msg
+        # Any namespace change invalidates what cell mode knows about earlier runs
+        self._cell_keys = []
         
-        # Clear previous output
-        self.output_buffer = io.StringIO()
-        self.error_buffer = io.StringIO()
+        result = ExecutionResult()
+        code_obj = self._prepare(code, result)
+        if code_obj is not None:
+            self._run_code_objects([code_obj], result, on_output, cancel=cancel)
+        return self._finish(result)
+    
+    def execute_cells(self, code: str, on_output: Optional[Callable[[str, str], None]] = None,
+                      cancel: Optional[CancelHandle] = None) -> ExecutionResult:
+        """
+        Execute code in cell mode, re-running only what changed
         
-        try:
-            # Capture stdout and stderr
-            with redirect_stdout(self.output_buffer), redirect_stderr(self.error_buffer):
-                # Execute the code
-                exec(code, self.global_vars, self.local_vars)
+        The source is split into cells on '# %%' marker lines. Cells that are
+        unchanged since the last successful run are skipped; the first changed
+        cell and every cell after it run in the existing namespace. When
+        nothing changed, the last cell is run again.
+        
+        Args:
+            code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) for every
+                write to stdout or stderr while the code runs
+            cancel: Optional CancelHandle for stopping the run from another thread
+            
+        Returns:
+            ExecutionResult; skipped_cells counts the cells that were not run
+        """
+        result = ExecutionResult()
+        cells = split_cells(code)
+        if not cells:
+            return self._finish(result)
+        
+        start = min(first_changed_cell(cells, self._cell_keys), len(cells) - 1)
+        result.skipped_cells = start
+        
+        # Compile every cell before running any, so a blocked or broken cell
+        # later in the buffer doesn't leave the namespace half updated
+        code_objects = []
+        for cell in cells[start:]:
+            # Pad with blank lines so tracebacks show editor line numbers
+            code_obj = self._prepare('\n' * (cell.first_line - 1) + cell.source, result)
+            if code_obj is None:
+                self._cell_keys = self._cell_keys[:start]
+                return self._finish(result)
+            code_objects.append(code_obj)
+        
+        completed = self._run_code_objects(code_objects, result, on_output, cancel=cancel)
+        
+        # Only cells that finished count as up to date; a failed cell runs again next time
+        self._cell_keys = [cell.key for cell in cells[:start + completed]]
+        return self._finish(result)
+    
+    def execute_profiled(self, code: str, on_output: Optional[Callable[[str, str], None]] = None,
+                         cancel: Optional[CancelHandle] = None) -> ExecutionResult:
+        """
+        Execute code under cProfile and tracemalloc
+        
+        Args:
+            code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) chunks
+            cancel: Optional CancelHandle for stopping the run from another thread
+            
+        Returns:
+            ExecutionResult whose profile holds the ProfileReport
+        """
+        self._cell_keys = []
+        
+        result = ExecutionResult()
+        code_obj = self._prepare(code, result)
+        if code_obj is not None:
+            profiler = ExecutionProfiler()
+            self._run_code_objects([code_obj], result, on_output, profiler, cancel)
+            result.profile = profiler.report
+        return self._finish(result)
+    
+    def execute_line_timed(self, code: str, on_output: Optional[Callable[[str, str], None]] = None,
+                           cancel: Optional[CancelHandle] = None) -> ExecutionResult:
+        """
+        Execute code recording the time and hit count of every source line
+        
+        Only the user's own code objects are traced.
+        
+        Args:
+            code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) chunks
+            cancel: Optional CancelHandle for stopping the run from another thread
             
-            # Get captured output
-            stdout_output = self.output_buffer.getvalue()
-            stderr_output = self.error_buffer.getvalue()
+        Returns:
+            ExecutionResult whose line_timings hold the LineTimings, e.g. for
+            highlighting hot lines in the editor
+        """
+        self._cell_keys = []
+        
+        result = ExecutionResult()
+        code_obj = self._prepare(code, result)
+        if code_obj is not None:
+            timer = LineTimer([code_obj])
+            self._run_code_objects([code_obj], result, on_output, timer, cancel)
+            result.line_timings = timer.timings
+        return self._finish(result)
+    
+    def execute_budgeted(self, code: str, on_output: Optional[Callable[[str, str], None]] = None,
+                         cancel: Optional[CancelHandle] = None,
+                         max_steps: int = DEFAULT_MAX_STEPS) -> ExecutionResult:
+        """
+        Execute code with a hard limit on the work it may do
+        
+        The code is instrumented so that loop iterations, function calls
+        and comprehension items each spend one step. When the budget runs
+        out the code is stopped with a TimeoutError, which, unlike a thread
+        timeout, really stops it without needing a separate process.
+        
+        Args:
+            code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) chunks
+            cancel: Optional CancelHandle for stopping the run from another thread
+            max_steps: Number of steps the code may spend
+            
+        Returns:
+            ExecutionResult, with status 'timeout' if the budget ran out
+        """
+        self._cell_keys = []
+        
+        result = ExecutionResult()
+        code_obj = self._prepare(code, result, budgeted=True)
+        if code_obj is not None:
+            budget = ExecutionBudget(self.global_vars, max_steps)
+            self._run_code_objects([code_obj], result, on_output, budget, cancel)
+            if budget.exhausted:
+                result.status = 'timeout'
+        return self._finish(result)
+    
+    def execute_remote(self, code: str, on_output: Optional[Callable[[str, str], None]] = None,
+                       cancel: Optional[CancelHandle] = None,
+                       timeout: Optional[float] = None) -> ExecutionResult:
+        """
+        Execute code on the remote execution server, or here if it is unavailable
+        
+        Like a worker process, the server runs the code in a fresh namespace.
+        If no server is configured or it cannot be reached, the code runs
+        locally with execute() instead.
+        
+        Args:
+            code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) chunks
+            cancel: Optional CancelHandle for stopping the run from another thread
+            timeout: Maximum execution time on the server in seconds
             
-            # Combine outputs
-            result = ""
-            if stdout_output:
-                result += f"✅ Output:\n{stdout_output}\n"
-            if stderr_output:
-                result += f"⚠️  Warnings:\n{stderr_output}\n"
+        Returns:
+            ExecutionResult of the run
+        """
+        if self.remote is not None:
+            result = self.remote.execute(code, timeout, on_output, cancel)
+            if result is not None:
+                self.telemetry.increment('remote')
+                return self._finish(result)
+            self.telemetry.increment('remote_fallback')
+        return self.execute(code, on_output, cancel)
+    
+    def execute_isolated(self, code: str, on_output: Optional[Callable[[str, str], None]] = None,
+                         cancel: Optional[CancelHandle] = None,
+                         timeout: Optional[float] = None) -> ExecutionResult:
+        """
+        Execute code in a worker process, or here if there is no worker pool
+        
+        The worker runs the code in a fresh namespace under the pool's limits,
+        which the operating system enforces (RLIMIT_AS for memory), so the
+        run is not slowed down by in-process memory tracking. Its output is
+        passed to on_output once the run has finished.
+        
+        Args:
+            code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) chunks
+            cancel: Optional CancelHandle; cancelling it kills the worker
+            timeout: Maximum execution time in seconds (None waits forever)
             
-            if not result.strip():
-                result = "✅ Code executed successfully (no output)"
+        Returns:
+            ExecutionResult of the run
+        """
+        if self.worker_pool is None:
+            return self.execute(code, on_output, cancel)
+        result = self._finish(self.worker_pool.execute(code, timeout, cancel))
+        if on_output:
+            for stream_name in ('stdout', 'stderr'):
+                text = getattr(result, stream_name)
+                if text:
+                    on_output(stream_name, text)
+        return result
+    
+    def _finish(self, result: ExecutionResult) -> ExecutionResult:
+        """Record a finished run in the telemetry and hand the result back"""
+        self.telemetry.record_result(result)
+        return result
+    
+    def _prepare(self, code: str, result: ExecutionResult, budgeted: bool = False) -> Optional[CodeType]:
+        """
+        Compile code for a run, recording syntax errors and blocked functions
+        
+        Returns:
+            The code object, or None if the code must not run
+        """
+        try:
+            code_obj, input_functions = self.compile_code(code, result, budgeted)
+        except SyntaxError as e:
+            result.status = 'error'
+            result.error = ErrorInfo.from_exception(e)
+            return None
+        
+        if input_functions:
+            result.status = 'blocked'
+            result.blocked_functions = [
+                (func, self.input_functions.get(func, 'Requires user interaction'))
+                for func in input_functions
+            ]
+            return None
+        
+        return code_obj
+    
+    def _run_code_objects(self, code_objects: list, result: ExecutionResult,
+                          on_output: Optional[Callable[[str, str], None]] = None,
+                          instrument=None, cancel: Optional[CancelHandle] = None) -> int:
+        """
+        Execute compiled code objects in order, recording output on the result
+        
+        Args:
+            code_objects: Code objects to execute in the current namespace
+            result: Result receiving output, errors and the exec timing
+            on_output: Optional callback receiving (stream_name, text) chunks
+            instrument: Optional context manager active only while the code runs
+            cancel: Optional CancelHandle that can stop the code
             
-            return result
+        Returns:
+            Number of code objects that completed
+        """
+        limits = self.limits
+        monitor = None
+        if limits is not None:
+            # The monitor stops code that goes over a limit through the cancel handle
+            cancel = cancel or CancelHandle()
+            monitor = ResourceMonitor(limits, cancel)
+        output_budget = None
+        if limits is not None and limits.output_bytes is not None:
+            output_budget = OutputBudget(limits.output_bytes)
+        
+        # Clear previous output
+        self.output_buffer.close()
+        self.error_buffer.close()
+        self.output_buffer = self._new_buffer('stdout', on_output, output_budget)
+        self.error_buffer = self._new_buffer('stderr', on_output, output_budget)
+        
+        completed = 0
+        rss_before = peak_rss()
+        
+        try:
+            # Capture stdout and stderr written by this thread only
+            with result.phase('exec'), \
+                    stream_router.capture(self.output_buffer, self.error_buffer), \
+                    (instrument or nullcontext()), \
+                    (monitor or nullcontext()), \
+                    (cancel or nullcontext()):
+                # Execute the code
+                for code_obj in code_objects:
+                    exec(code_obj, self.global_vars, self.local_vars)
+                    completed += 1
+        
+        except ResourceLimitExceeded as e:
+            # Raised wherever the code happened to be, so a traceback says nothing
+            result.status = 'error'
+            result.error = ErrorInfo(type(e).__name__, limits.describe(e.resource))
+        
+        except ExecutionCancelled:
+            stopped = ExecutionResult.stopped()
+            result.status, result.error = stopped.status, stopped.error
+        
+        except BaseException as e:
+            # Includes SystemExit from sys.exit() and exit(), which end the
+            # script, not the executor
+            result.status = 'error'
+            result.error = ErrorInfo.from_exception(e)
+        
+        result.stdout = self.output_buffer.getvalue()
+        result.stderr = self.error_buffer.getvalue()
+        result.stdout_bytes = self.output_buffer.total_bytes
+        result.stderr_bytes = self.error_buffer.total_bytes
+        result.peak_rss_delta = peak_rss() - rss_before
+        if monitor is not None:
+            result.resource_usage = monitor.usage(result.stdout_bytes + result.stderr_bytes)
+        return completed
+    
+    def _new_buffer(self, stream_name: str,
+                    on_output: Optional[Callable[[str, str], None]] = None,
+                    budget: Optional[OutputBudget] = None) -> BoundedOutputBuffer:
+        """Create a capture buffer bounded by max_output_memory"""
+        return BoundedOutputBuffer(
+            max_memory=self.max_output_memory,
+            tail_size=min(64 * 1024, self.max_output_memory),
+            stream_name=stream_name,
+            on_write=on_output,
+            budget=budget
+        )
+    
+    def execute_async(self, code: str,
+                      on_output: Optional[Callable[[str, str], None]] = None,
+                      on_complete: Optional[Callable[[ExecutionResult], None]] = None,
+                      mode: str = 'normal') -> CancelHandle:
+        """
+        Execute code in a background thread
+        
+        Args:
+            code: Python code to execute
+            on_output: Optional callback receiving (stream_name, text) chunks
+                as the code writes them
+            on_complete: Optional callback receiving the ExecutionResult
+            mode: 'normal' to run the whole buffer, 'cells' for cell mode,
+                'profile' to run under the profiler, 'lines' for line timings,
+                'budget' to stop the code after DEFAULT_MAX_STEPS steps,
+                'remote' to run it on the execution server if there is one,
+                'isolated' to run it in a worker process
             
-        except Exception as e:
-            # Get the full traceback
-            error_traceback = traceback.format_exc()
-            return f"❌ Execution Error:\n{error_traceback}"
+        Returns:
+            CancelHandle for stopping the run; its thread attribute is the
+            thread running the code
+        """
+        runners = {
+            'normal': self.execute,
+            'cells': self.execute_cells,
+            'profile': self.execute_profiled,
+            'lines': self.execute_line_timed,
+            'budget': self.execute_budgeted,
+            'remote': self.execute_remote,
+            'isolated': self.execute_isolated,
+        }
+        if mode not in runners:
+            raise ValueError(f"Unknown execution mode: {mode}")
+        runner = runners[mode]
+        handle = CancelHandle()
         
-        finally:
-            # Clean up
-            self.output_buffer.close()
-            self.error_buffer.close()
+        def target():
+            try:
+                result = runner(code, on_output=on_output, cancel=handle)
+            except BaseException as e:
+                # on_complete is called whatever happens, so the caller never waits forever
+                result = self._finish(ExecutionResult.failed(e))
+            if on_complete:
+                on_complete(result)
+        
+        handle.thread = threading.Thread(target=target)
+        handle.thread.daemon = True
+        handle.thread.start()
+        return handle
     
-    def execute_with_timeout(self, code: str, timeout: float = 5.0) -> str:
+    def execute_with_timeout(self, code: str, timeout: float = 5.0,
+                             cancel: Optional[CancelHandle] = None) -> ExecutionResult:
         """
         Execute code with a timeout limit
         
+        When a worker pool is configured the code runs in a worker process
+        with a fresh namespace, and a worker that times out or is cancelled
+        is killed. Otherwise the code runs in a background thread that is
+        cancelled when the timeout expires.
+        
         Args:
             code: Python code to execute
             timeout: Maximum execution time in seconds
+            cancel: Optional CancelHandle for stopping the run from another thread
             
         Returns:
-            String containing the execution output
+            ExecutionResult of the run, with status 'timeout' if it took too long
         """
-        import signal
-        import threading
-        import time
+        if self.worker_pool is not None:
+            return self._finish(self.worker_pool.execute(code, timeout, cancel))
         
+        cancel = cancel or CancelHandle()
         result = [None]
         exception = [None]
         
         def target():
             try:
-                result[0] = self.execute(code)
+                result[0] = self.execute(code, cancel=cancel)
             except Exception as e:
                 exception[0] = e
         
@@ -172,20 +590,90 @@ class CodeExecutor:
         thread.join(timeout)
         
         if thread.is_alive():
-            return f"⏰ Execution timed out after {timeout} seconds"
+            # Stop the code so it doesn't keep running in the background; the
+            # run itself is already counted, as cancelled, by execute()
+            cancel.cancel(wait=1.0)
+            self.telemetry.increment('timeout')
+            return ExecutionResult.timed_out(timeout)
         
         if exception[0]:
-            return f"❌ Execution Error: {str(exception[0])}"
+            error_result = ExecutionResult()
+            error_result.status = 'error'
+            error_result.error = ErrorInfo(type(exception[0]).__name__, str(exception[0]))
+            return self._finish(error_result)
         
         return result[0]
     
     def reset_environment(self):
-        """Reset the execution environment"""
-        self.global_vars = {}
-        self.local_vars = {}
+        """Reset the execution environment (checkpoints are kept)"""
+        # Cleared in place: functions restored from a checkpoint keep
+        # referring to this global namespace
+        self._discard_pending()
+        self.global_vars.clear()
+        self.local_vars.clear()
+        self._cell_keys = []
+    
+    def checkpoint(self, name: str) -> NamespaceCheckpoint:
+        """
+        Save the current namespace under a name
+        
+        Mutable values are deep-copied, so later runs don't change the
+        checkpoint; immutable values, functions, classes and modules are
+        shared, and values that cannot be copied are shared as they are.
+        
+        Args:
+            name: Name of the checkpoint, e.g. 'after data load'
+            
+        Returns:
+            The new checkpoint (replacing any with the same name)
+        """
+        self._load_pending()
+        checkpoint = NamespaceCheckpoint(name, self.global_vars, self.local_vars, self._cell_keys)
+        self.checkpoints.save(checkpoint)
+        return checkpoint
+    
+    def restore_checkpoint(self, name: str):
+        """
+        Return the namespace to the state saved under a name
+        
+        This costs a copy of the saved values instead of re-running the code
+        that produced them. Cell mode also resumes from the checkpoint, so
+        only cells changed since it was taken run again.
+        
+        Args:
+            name: Name of the checkpoint
+            
+        Raises:
+            ValueError: If there is no checkpoint with that name
+        """
+        checkpoint = self.checkpoints.get(name)
+        self._discard_pending()
+        checkpoint.restore_into(self.global_vars, self.local_vars)
+        self._cell_keys = list(checkpoint.cell_keys)
+    
+    def _load_pending(self):
+        """Load any entries of a restored session that code has not touched yet"""
+        lazy = self.global_vars.get('__builtins__')
+        if isinstance(lazy, LazyBuiltins):
+            lazy.load_all()
+    
+    def _discard_pending(self):
+        """Forget the entries of a restored session that code has not touched yet"""
+        lazy = self.global_vars.get('__builtins__')
+        if isinstance(lazy, LazyBuiltins):
+            lazy.discard()
+    
+    def list_checkpoints(self) -> list:
+        """Names of the saved checkpoints, oldest first"""
+        return self.checkpoints.names()
+    
+    def delete_checkpoint(self, name: str):
+        """Forget a checkpoint"""
+        self.checkpoints.delete(name)
     
     def get_variables(self) -> Dict[str, Any]:
         """Get current variables in the execution environment"""
+        self._load_pending()
         return self.local_vars.copy()
     
     def set_variable(self, name: str, value: Any):
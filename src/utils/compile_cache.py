@@ -0,0 +1,213 @@
+"""
+Compile Cache - Size-bounded LRU cache of compiled code objects
+"""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import List, Optional, Tuple
+
+# Entries are (code object or None when execution is blocked, detected input functions)
+CacheEntry = Tuple[Optional[CodeType], List[str]]
+
+class CompileCache:
+    """
+    Caches compiled code in memory and optionally on disk, keyed by source hash
+    
+    The on-disk cache is bounded too: loading a file refreshes its mtime, and
+    once the directory holds more than max_disk_entries files or
+    max_disk_bytes bytes the least recently used files are deleted.
+    """
+    
+    def __init__(self, max_entries: int = 64, cache_dir: Optional[str] = None,
+                 max_disk_entries: int = 1024, max_disk_bytes: int = 32 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Maximum number of code objects kept in memory
+            cache_dir: Optional directory for the persistent on-disk cache
+            max_disk_entries: Maximum number of files kept in cache_dir
+            max_disk_bytes: Maximum total size of the files in cache_dir
+        """
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max(1, max_disk_entries)
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # (files, bytes) in cache_dir, counted on the first save
+        self._disk_usage = None
+        
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(code: str, variant: str = '') -> str:
+        """
+        Build the cache key for a piece of source code
+        
+        Args:
+            code: Python source code
+            variant: Extra tag for code compiled with different options
+        
+        Returns:
+            Hex digest identifying the source and variant
+        """
+        digest = hashlib.sha256(code.encode('utf-8', 'surrogatepass'))
+        if variant:
+            digest.update(b'\0' + variant.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Look up a compiled entry
+        
+        Args:
+            key: Key returned by make_key
+        
+        Returns:
+            The cached entry or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        
+        entry = self._load_from_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, entry)
+        return entry
+    
+    def put(self, key: str, code_obj: Optional[CodeType], detected: List[str]):
+        """
+        Store a compiled entry
+        
+        Args:
+            key: Key returned by make_key
+            code_obj: Compiled code object (None if execution is blocked)
+            detected: Input functions detected in the source
+        """
+        entry = (code_obj, list(detected))
+        with self._lock:
+            self._store(key, entry)
+        self._save_to_disk(key, entry)
+    
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _store(self, key: str, entry: CacheEntry):
+        """Insert an entry and evict the least recently used ones (lock held)"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.bin')
+    
+    def _load_from_disk(self, key: str) -> Optional[CacheEntry]:
+        """Read an entry written by a previous session, if it is still valid"""
+        if not self.cache_dir:
+            return None
+        
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Mark the file as recently used so pruning keeps it
+            os.utime(path)
+        except OSError:
+            return None
+        
+        # Bytecode from another interpreter version is unusable
+        magic = importlib.util.MAGIC_NUMBER
+        if not data.startswith(magic):
+            return None
+        
+        try:
+            code_obj, detected = marshal.loads(data[len(magic):])
+        except (EOFError, ValueError, TypeError):
+            return None
+        return (code_obj, list(detected))
+    
+    def _save_to_disk(self, key: str, entry: CacheEntry):
+        """Persist an entry, writing atomically so readers never see partial files"""
+        if not self.cache_dir:
+            return
+        
+        temp_path = None
+        try:
+            data = importlib.util.MAGIC_NUMBER + marshal.dumps(entry)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            path = self._disk_path(key)
+            replaced = os.path.exists(path)
+            os.replace(temp_path, path)
+        except (OSError, ValueError):
+            # The disk cache is an optimization; failures only cost a recompile
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        
+        with self._lock:
+            if self._disk_usage is None:
+                self._disk_usage = self._scan_disk()[1:]
+            elif not replaced:
+                files, size = self._disk_usage
+                self._disk_usage = (files + 1, size + len(data))
+            files, size = self._disk_usage
+            if files > self.max_disk_entries or size > self.max_disk_bytes:
+                self._prune_disk()
+    
+    def _scan_disk(self) -> Tuple[List[Tuple[float, int, str]], int, int]:
+        """List the cached files as (mtime, size, path) with their count and total size"""
+        files = []
+        total = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return files, 0, 0
+        for name in names:
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        return files, len(files), total
+    
+    def _prune_disk(self):
+        """Delete the least recently used files until the disk limits are met (lock held)"""
+        files, count, total = self._scan_disk()
+        files.sort()
+        for _, size, path in files:
+            if count <= self.max_disk_entries and total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            count -= 1
+            total -= size
+        self._disk_usage = (count, total)
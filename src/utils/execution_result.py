@@ -0,0 +1,181 @@
+"""
+Execution Result - Structured outcome of running a piece of code
+"""
+
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class ErrorInfo:
+    """Exception raised by executed code, reduced to picklable text"""
+    
+    __slots__ = ('type', 'message', 'traceback')
+    
+    def __init__(self, type: str, message: str, traceback: str = ''):
+        self.type = type
+        self.message = message
+        self.traceback = traceback
+    
+    @classmethod
+    def from_exception(cls, exc: BaseException) -> 'ErrorInfo':
+        """Capture the exception currently being handled"""
+        return cls(type(exc).__name__, str(exc), traceback.format_exc())
+    
+    def to_dict(self) -> dict:
+        return {'type': self.type, 'message': self.message, 'traceback': self.traceback}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ErrorInfo':
+        return cls(data['type'], data['message'], data.get('traceback', ''))
+
+class ExecutionResult:
+    """
+    Outcome of one execution
+    
+    status is 'ok', 'error', 'blocked', 'timeout' or 'cancelled'. timings maps a phase
+    ('parse', 'scan', 'compile', 'exec') to a (wall seconds, CPU seconds)
+    pair. Rendering is left to the caller.
+    """
+    
+    __slots__ = ('status', 'stdout', 'stderr', 'stdout_bytes', 'stderr_bytes', 'error',
+                 'blocked_functions', 'timings', 'peak_rss_delta', 'resource_usage',
+                 'skipped_cells', 'profile', 'line_timings')
+    
+    def __init__(self):
+        self.status = 'ok'
+        self.stdout = ''
+        self.stderr = ''
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self.error: Optional[ErrorInfo] = None
+        # (function name, reason) pairs when execution was blocked
+        self.blocked_functions: List[Tuple[str, str]] = []
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        # Growth of the process's peak resident set size during the run, in bytes
+        self.peak_rss_delta = 0
+        # Resource name ('memory', 'cpu', 'output') -> (used, limit or None)
+        # for runs with resource limits
+        self.resource_usage: Dict[str, Tuple[float, Optional[float]]] = {}
+        # Cell mode: unchanged cells that were not run again
+        self.skipped_cells = 0
+        self.profile = None
+        self.line_timings = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.status == 'ok'
+    
+    @property
+    def cache_hit(self) -> bool:
+        """True when the code came from the compile cache without being parsed"""
+        return 'compile' in self.timings and 'parse' not in self.timings
+    
+    @property
+    def total_time(self) -> float:
+        """Wall time over all phases"""
+        return sum(wall for wall, _ in self.timings.values())
+    
+    def limit_fraction(self, name: str) -> Optional[float]:
+        """How much of the named resource limit the run used (None if unlimited)"""
+        used, limit = self.resource_usage.get(name, (0, None))
+        if not limit:
+            return None
+        return used / limit
+    
+    @classmethod
+    def failed(cls, exc: BaseException) -> 'ExecutionResult':
+        """Build an error result from the exception currently being handled"""
+        result = cls()
+        result.status = 'error'
+        result.error = ErrorInfo.from_exception(exc)
+        return result
+    
+    @classmethod
+    def timed_out(cls, timeout: float) -> 'ExecutionResult':
+        """Build the result of a run stopped at its time limit"""
+        result = cls()
+        result.status = 'timeout'
+        result.error = ErrorInfo('TimeoutError', f"Execution timed out after {timeout} seconds")
+        return result
+    
+    @classmethod
+    def stopped(cls) -> 'ExecutionResult':
+        """Build the result of a run that was cancelled"""
+        result = cls()
+        result.status = 'cancelled'
+        result.error = ErrorInfo('ExecutionCancelled', "Execution stopped")
+        return result
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Time a phase, adding to any time already recorded for it"""
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            previous_wall, previous_cpu = self.timings.get(name, (0.0, 0.0))
+            self.timings[name] = (previous_wall + wall, previous_cpu + cpu)
+    
+    def to_dict(self) -> dict:
+        """Plain-data representation, e.g. for JSON output"""
+        return {
+            'status': self.status,
+            'stdout': self.stdout,
+            'stderr': self.stderr,
+            'stdout_bytes': self.stdout_bytes,
+            'stderr_bytes': self.stderr_bytes,
+            'error': self.error.to_dict() if self.error else None,
+            'blocked_functions': [name for name, _ in self.blocked_functions],
+            'timings': {phase: {'wall': wall, 'cpu': cpu} for phase, (wall, cpu) in self.timings.items()},
+            'cache_hit': self.cache_hit,
+            'peak_rss_delta': self.peak_rss_delta,
+            'resource_usage': {name: {'used': used, 'limit': limit, 'fraction': self.limit_fraction(name)}
+                               for name, (used, limit) in self.resource_usage.items()},
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ExecutionResult':
+        """
+        Rebuild a result from to_dict() data, e.g. received from a server
+        
+        Profiles and line timings are not part of the data. Blocked
+        functions may be given as names or as (name, reason) pairs.
+        """
+        result = cls()
+        result.status = data['status']
+        result.stdout = data.get('stdout', '')
+        result.stderr = data.get('stderr', '')
+        result.stdout_bytes = data.get('stdout_bytes', 0)
+        result.stderr_bytes = data.get('stderr_bytes', 0)
+        if data.get('error'):
+            result.error = ErrorInfo.from_dict(data['error'])
+        result.blocked_functions = [(entry, '') if isinstance(entry, str) else tuple(entry)
+                                    for entry in data.get('blocked_functions', [])]
+        result.timings = {phase: (timing['wall'], timing['cpu'])
+                          for phase, timing in data.get('timings', {}).items()}
+        result.peak_rss_delta = data.get('peak_rss_delta', 0)
+        result.resource_usage = {name: (usage['used'], usage['limit'])
+                                 for name, usage in data.get('resource_usage', {}).items()}
+        return result
+    
+    def __repr__(self):
+        return (f"<ExecutionResult {self.status} stdout={self.stdout_bytes}B "
+                f"stderr={self.stderr_bytes}B time={self.total_time:.4f}s>")
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes (0 if unavailable)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
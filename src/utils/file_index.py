@@ -0,0 +1,207 @@
+"""
+File Index - Cached listing of the saved scripts in a directory
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+SNAPSHOT_VERSION = 1
+
+class FileIndex:
+    """
+    In-memory index of the files with one suffix in a directory
+    
+    The directory is scanned once with os.scandir. Each later call stats only
+    the directory itself and rescans only if its mtime changed, which
+    happens when files are created, deleted or renamed. Overwriting a file in
+    place does not change the directory, so writers in this process report
+    their changes with update() and remove(). The index is saved as a
+    compact snapshot, so a restarted app does not rescan an unchanged
+    directory.
+    
+    A directory modified within RACY_WINDOW seconds of a scan may change
+    again without its mtime moving on coarse-grained file systems, so such
+    a scan is not trusted and the next call scans again. Changes made by
+    other processes at the same moment as a reported one can go unnoticed
+    until the directory changes again.
+    """
+    
+    RACY_WINDOW = 2.0
+    
+    def __init__(self, directory: str, suffix: str = '.py', snapshot_path: Optional[str] = None):
+        """
+        Args:
+            directory: Directory to index
+            suffix: Only file names ending with this are indexed
+            snapshot_path: Optional file to persist the index in
+        """
+        self.directory = directory
+        self.suffix = suffix
+        self.snapshot_path = snapshot_path
+        # name -> (size, mtime)
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._dir_mtime_ns = None
+        self._trusted = False
+        # Listing sorted newest first, rebuilt only after a change
+        self._sorted: Optional[List[dict]] = None
+        self._latest: Optional[str] = None
+        self.scans = 0
+        if snapshot_path:
+            self._load_snapshot()
+    
+    def _info(self, name: str, entry: Tuple[int, float]) -> dict:
+        return {
+            'name': name,
+            'size': entry[0],
+            'modified': entry[1],
+            'path': os.path.join(self.directory, name)
+        }
+    
+    def _changed(self):
+        self._sorted = None
+        self._latest = None
+    
+    def refresh(self) -> bool:
+        """
+        Rescan the directory if it changed
+        
+        Returns:
+            True if the directory was scanned
+        """
+        try:
+            dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            if self._entries:
+                self._entries = {}
+                self._changed()
+            self._dir_mtime_ns = None
+            return False
+        if self._trusted and dir_mtime_ns == self._dir_mtime_ns:
+            return False
+        
+        entries = {}
+        with os.scandir(self.directory) as iterator:
+            for entry in iterator:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    # Deleted while scanning
+                    continue
+                entries[entry.name] = (stat.st_size, stat.st_mtime)
+        
+        self.scans += 1
+        self._entries = entries
+        self._dir_mtime_ns = dir_mtime_ns
+        self._trusted = time.time() - dir_mtime_ns / 1e9 > self.RACY_WINDOW
+        self._changed()
+        self.save_snapshot()
+        return True
+    
+    def list(self) -> List[dict]:
+        """Information on every indexed file, most recently modified first"""
+        self.refresh()
+        if self._sorted is None:
+            self._sorted = [self._info(name, entry) for name, entry in
+                            sorted(self._entries.items(), key=lambda item: item[1][1], reverse=True)]
+        return list(self._sorted)
+    
+    def get(self, name: str) -> Optional[dict]:
+        """Information on one file, or None if it is not indexed"""
+        self.refresh()
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        return self._info(name, entry)
+    
+    def most_recent(self) -> Optional[dict]:
+        """Information on the most recently modified file, or None if there are none"""
+        self.refresh()
+        if not self._entries:
+            return None
+        if self._latest is None:
+            if self._sorted is not None:
+                self._latest = self._sorted[0]['name']
+            else:
+                self._latest = max(self._entries, key=lambda name: self._entries[name][1])
+        return self._info(self._latest, self._entries[self._latest])
+    
+    def update(self, name: str):
+        """Record that a file was written by this process"""
+        if not name.endswith(self.suffix):
+            return
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            self.remove(name)
+            return
+        latest = self._latest
+        self._entries[name] = (stat.st_size, stat.st_mtime)
+        self._sorted = None
+        if latest is not None and stat.st_mtime >= self._entries[latest][1]:
+            # Usually the file just written: the newest stays known without a search
+            self._latest = name
+        elif latest == name:
+            self._latest = None
+        self._adopt_dir_mtime()
+    
+    def remove(self, name: str):
+        """Record that a file was deleted by this process"""
+        if self._entries.pop(name, None) is not None:
+            self._changed()
+        self._adopt_dir_mtime()
+    
+    def _adopt_dir_mtime(self):
+        # The directory change just reported is already in the index, so the
+        # next call need not rescan for it
+        try:
+            self._dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+        self.save_snapshot()
+    
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._entries)
+    
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot['version'] != SNAPSHOT_VERSION or snapshot['directory'] != self.directory:
+                return
+            names, sizes, mtimes = snapshot['names'], snapshot['sizes'], snapshot['mtimes']
+            self._entries = {name: (size, mtime) for name, size, mtime in zip(names, sizes, mtimes)}
+            self._dir_mtime_ns = snapshot['dir_mtime_ns']
+            self._trusted = True
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries = {}
+    
+    def save_snapshot(self):
+        """Write the index to the snapshot file, if there is one"""
+        if not self.snapshot_path or not self._trusted:
+            return
+        names = list(self._entries)
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'directory': self.directory,
+            'dir_mtime_ns': self._dir_mtime_ns,
+            # Parallel columns keep the snapshot small and quick to parse
+            'names': names,
+            'sizes': [self._entries[name][0] for name in names],
+            'mtimes': [self._entries[name][1] for name in names],
+        }
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.snapshot_path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            # The snapshot only saves a rescan
+            pass
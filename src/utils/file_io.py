@@ -0,0 +1,152 @@
+"""
+File I/O - Crash-safe writes and background saving and loading
+"""
+
+import os
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+def atomic_write(path: str, text: str):
+    """
+    Write a text file so that a crash leaves either the old or the new contents
+    
+    The text goes to a temporary file in the same directory, which is
+    flushed to disk and then renamed over the target in one step.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except OSError:
+            mode = 0o644
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class FileIOWorker:
+    """
+    Runs FileManager saves and loads on a background thread
+    
+    Requests run one at a time, in order, so a load never sees half of an
+    earlier save. Each call returns a Future; the optional callback gets
+    (result, error) and is handed to dispatch, which a Kivy app sets to
+    something that runs it on the UI thread, e.g. via Clock.
+    """
+    
+    def __init__(self, file_manager, dispatch: Optional[Callable[[Callable[[], None]], None]] = None):
+        """
+        Args:
+            file_manager: The FileManager doing the actual I/O
+            dispatch: Optional function that runs a callable where callbacks
+                belong (defaults to calling it on the worker thread)
+        """
+        self.file_manager = file_manager
+        self.dispatch = dispatch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-io')
+    
+    def _submit(self, function, args, callback) -> Future:
+        future = self._executor.submit(function, *args)
+        if callback is not None:
+            future.add_done_callback(lambda done: self._deliver(done, callback))
+        return future
+    
+    def _deliver(self, future: Future, callback):
+        error = future.exception()
+        result = None if error is not None else future.result()
+        if self.dispatch is None:
+            callback(result, error)
+        else:
+            self.dispatch(lambda: callback(result, error))
+    
+    def save(self, code: str, filename: Optional[str] = None,
+             callback: Optional[Callable[[Optional[str], Optional[BaseException]], None]] = None) -> Future:
+        """Save code in the background; the result is the filename"""
+        return self._submit(self.file_manager.save_code, (code, filename), callback)
+    
+    def load(self, filename: Optional[str] = None,
+             callback: Optional[Callable[[Optional[str], Optional[BaseException]], None]] = None) -> Future:
+        """Load code in the background; the result is the code"""
+        return self._submit(self.file_manager.load_code, (filename,), callback)
+    
+    def call(self, function: Callable, *args,
+             callback: Optional[Callable[[object, Optional[BaseException]], None]] = None) -> Future:
+        """Run any other I/O function in order with the saves and loads"""
+        return self._submit(function, args, callback)
+    
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+class Autosaver:
+    """
+    Saves an editor buffer at most once per interval
+    
+    Every edit calls schedule() with the current text, which only records
+    it. The first edit after a write starts a timer; when it fires, only
+    the latest text is written, however many edits came in between.
+    """
+    
+    def __init__(self, save: Callable[[str], object], interval: float = 2.0):
+        """
+        Args:
+            save: Function that writes the text, e.g. a FileIOWorker call
+            interval: Minimum seconds between two writes
+        """
+        self.save = save
+        self.interval = interval
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._pending: Optional[str] = None
+        self._timer: Optional[threading.Timer] = None
+        self._last_write = float('-inf')
+    
+    def schedule(self, text: str):
+        """Note the latest text; it is written within one interval"""
+        with self._lock:
+            self._pending = text
+            if self._timer is not None:
+                return
+            delay = max(0.0, self._last_write + self.interval - time.monotonic())
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def flush(self):
+        """Write the pending text now, if there is any"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            text = self._pending
+            self._pending = None
+            if text is None:
+                return
+            self._last_write = time.monotonic()
+            self.writes += 1
+        self.save(text)
+    
+    @property
+    def pending(self) -> bool:
+        return self._pending is not None
+    
+    def cancel(self):
+        """Drop the pending text without writing it"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = None
@@ -4,32 +4,113 @@ File Manager - Handles saving and loading Python code files
 
 import os
 import datetime
-from typing import Optional
-from kivy.utils import platform
+from typing import List, Optional
+from .platform_utils import platform
+from .blob_store import BlobStore
+from .file_index import FileIndex
+from .file_io import atomic_write
+from .search_index import SearchIndex
+from .version_history import VersionHistory
+
+def default_base_dir() -> str:
+    """Directory for saved files on this platform (not created)"""
+    if platform == 'android':
+        # On Android, use the app's external storage directory
+        from android.storage import primary_external_storage_path
+        base_path = primary_external_storage_path()
+        return os.path.join(base_path, 'PythonCodeExecutor')
+    else:
+        # On desktop, use a local directory
+        return os.path.join(os.path.expanduser('~'), 'PythonCodeExecutor')
+
+def private_data_dir() -> str:
+    """Directory for data only this app may write, on this platform (not created)"""
+    if platform == 'android':
+        # Internal app storage; other apps can write to external storage
+        from android.storage import app_storage_path
+        return os.path.join(app_storage_path(), 'PythonCodeExecutor')
+    else:
+        return os.path.join(os.path.expanduser('~'), '.PythonCodeExecutor')
 
 class FileManager:
     """Manages file operations for the Python code executor"""
     
-    def __init__(self):
-        self.base_dir = self._get_base_directory()
+    # Unsaved editor contents, kept outside the saved scripts
+    DRAFT_NAME = 'draft.py'
+    
+    # Storage backends for saved scripts
+    STORAGE_FILES = 'files'
+    STORAGE_BLOBS = 'blobs'
+    
+    def __init__(self, base_dir: Optional[str] = None, storage: str = STORAGE_FILES):
+        """
+        Args:
+            base_dir: Optional directory for saved files (defaults to the
+                platform's storage location)
+            storage: 'files' keeps every script as a plain .py file, 'blobs'
+                keeps them compressed and deduplicated in a BlobStore
+                (export_file() writes plain copies)
+        """
+        if storage not in (self.STORAGE_FILES, self.STORAGE_BLOBS):
+            raise ValueError(f"Unknown storage backend: {storage}")
+        self.base_dir = base_dir or self._get_base_directory()
+        # Data that is loaded as code or pickles must not be writable by other apps
+        self.private_dir = os.path.join(base_dir, '.private') if base_dir else private_data_dir()
         self.ensure_directory_exists()
+        self.storage = storage
+        self.blob_store: Optional[BlobStore] = None
+        if storage == self.STORAGE_BLOBS:
+            self.blob_store = BlobStore(os.path.join(self.base_dir, '.store'))
+        # Listing the directory is slow on external storage, so saved
+        # scripts are looked up in an index instead
+        self.file_index = FileIndex(
+            self.base_dir,
+            snapshot_path=os.path.join(self.get_cache_dir('index'), 'files.json')
+        )
+        # Every save of a script is kept as a compact revision
+        self.history = VersionHistory(self.get_cache_dir('history'))
+        # Name of the file the last load_code() call read
+        self.last_loaded: Optional[str] = None
+        # Loaded on the first search, so it does not slow down startup
+        self._search_index: Optional[SearchIndex] = None
     
     def _get_base_directory(self) -> str:
         """Get the base directory for storing files"""
-        if platform == 'android':
-            # On Android, use the app's external storage directory
-            from android.storage import primary_external_storage_path
-            base_path = primary_external_storage_path()
-            return os.path.join(base_path, 'PythonCodeExecutor')
-        else:
-            # On desktop, use a local directory
-            return os.path.join(os.path.expanduser('~'), 'PythonCodeExecutor')
+        return default_base_dir()
     
     def ensure_directory_exists(self):
         """Ensure the base directory exists"""
         if not os.path.exists(self.base_dir):
             os.makedirs(self.base_dir, exist_ok=True)
     
+    def get_cache_dir(self, name: str) -> str:
+        """
+        Get (and create) a cache directory under the base directory
+        
+        Args:
+            name: Name of the cache, e.g. 'bytecode'
+            
+        Returns:
+            Absolute path of the cache directory
+        """
+        cache_dir = os.path.join(self.base_dir, '.cache', name)
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+    
+    def get_private_dir(self, name: str) -> str:
+        """
+        Get (and create) a directory in app-private storage
+        
+        Args:
+            name: Name of the directory, e.g. 'session'
+            
+        Returns:
+            Absolute path of the directory, accessible by its owner only
+        """
+        private_dir = os.path.join(self.private_dir, name)
+        os.makedirs(private_dir, mode=0o700, exist_ok=True)
+        return private_dir
+    
     def save_code(self, code: str, filename: Optional[str] = None) -> str:
         """
         Save Python code to a file
@@ -53,11 +134,23 @@ class FileManager:
         filepath = os.path.join(self.base_dir, filename)
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(code)
-            return filename
+            if self.blob_store is not None:
+                if not self.blob_store.save(filename, code):
+                    # Unchanged: nothing was written and there is no new version
+                    return filename
+            else:
+                # A crash mid-write leaves the previous version intact
+                atomic_write(filepath, code)
+                self.file_index.update(filename)
         except Exception as e:
             raise Exception(f"Failed to save file: {str(e)}")
+        
+        try:
+            self.history.record(filename, code)
+        except OSError:
+            # The file itself is saved; only its history misses this version
+            pass
+        return filename
     
     def load_code(self, filename: Optional[str] = None) -> Optional[str]:
         """
@@ -80,10 +173,64 @@ class FileManager:
         filepath = os.path.join(self.base_dir, filename)
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
+            if self.blob_store is not None:
+                code = self.blob_store.load(filename)
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    code = f.read()
+        except KeyError:
+            raise Exception(f"Failed to load file: no saved file named {filename}")
         except Exception as e:
             raise Exception(f"Failed to load file: {str(e)}")
+        self.last_loaded = filename
+        return code
+    
+    def list_versions(self, filename: str) -> List[dict]:
+        """
+        List the saved versions of a file
+        
+        Args:
+            filename: Name of the file
+            
+        Returns:
+            List of dictionaries with 'number', 'size' and 'time', oldest first
+        """
+        return [{'number': revision['number'], 'size': revision['size'], 'time': revision['time']}
+                for revision in self.history.revisions(filename)]
+    
+    def load_version(self, filename: str, number: int = -1) -> str:
+        """
+        Load an earlier version of a file
+        
+        Args:
+            filename: Name of the file
+            number: Version number from list_versions(), negative counting
+                back from the latest
+            
+        Returns:
+            The code of that version
+        """
+        try:
+            return self.history.get(filename, number)
+        except ValueError:
+            raise Exception(f"No version {number} of {filename}")
+        except Exception as e:
+            raise Exception(f"Failed to load version: {str(e)}")
+    
+    def save_draft(self, code: str):
+        """Save the editor contents for recovery after a crash or kill"""
+        try:
+            atomic_write(os.path.join(self.get_cache_dir('autosave'), self.DRAFT_NAME), code)
+        except Exception as e:
+            raise Exception(f"Failed to save draft: {str(e)}")
+    
+    def load_draft(self) -> Optional[str]:
+        """Load the autosaved editor contents, or None if there are none"""
+        try:
+            with open(os.path.join(self.get_cache_dir('autosave'), self.DRAFT_NAME), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
     
     def _load_with_picker(self) -> Optional[str]:
         """Load file using Android file picker"""
@@ -97,22 +244,105 @@ class FileManager:
             if result:
                 filepath = result[0]
                 with open(filepath, 'r', encoding='utf-8') as f:
-                    return f.read()
+                    code = f.read()
+                # Saving again writes a file of the same name to the base directory
+                self.last_loaded = os.path.basename(filepath)
+                return code
             return None
         except Exception as e:
             raise Exception(f"File picker error: {str(e)}")
     
     def _load_from_list(self) -> Optional[str]:
         """Load file from a list of available files (desktop)"""
-        files = self.list_files()
-        if not files:
+        if self.blob_store is not None:
+            stored = self.blob_store.list()
+            latest_file = stored[0] if stored else None
+        else:
+            latest_file = self.file_index.most_recent()
+        if latest_file is None:
             raise Exception("No saved files found")
         
         # For now, return the most recent file
         # In a full implementation, you'd show a file selection dialog
-        latest_file = max(files, key=lambda x: x['modified'])
         return self.load_code(latest_file['name'])
     
+    def export_file(self, filename: str, directory: Optional[str] = None) -> str:
+        """
+        Write a saved file out as a plain .py file
+        
+        Args:
+            filename: Name of the saved file
+            directory: Optional target directory (defaults to the base
+                directory, next to where the 'files' backend keeps it)
+            
+        Returns:
+            Path of the written file
+        """
+        code = self.load_code(filename)
+        directory = directory or self.base_dir
+        filepath = os.path.join(directory, filename)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            atomic_write(filepath, code)
+        except Exception as e:
+            raise Exception(f"Failed to export file: {str(e)}")
+        if directory == self.base_dir:
+            self.file_index.update(filename)
+        return filepath
+    
+    def export_all(self, directory: Optional[str] = None) -> List[str]:
+        """Write every saved file out as a plain .py file; returns the paths"""
+        return [self.export_file(info['name'], directory) for info in self.list_files()]
+    
+    @property
+    def search_index(self) -> SearchIndex:
+        """Full-text index of the saved files"""
+        if self._search_index is None:
+            if self.blob_store is not None:
+                self._search_index = SearchIndex(
+                    self.blob_store,
+                    index_path=os.path.join(self.get_cache_dir('index'), 'search_blobs.json'),
+                    read=self.blob_store.load
+                )
+            else:
+                self._search_index = SearchIndex(
+                    self.file_index,
+                    index_path=os.path.join(self.get_cache_dir('index'), 'search.json')
+                )
+        return self._search_index
+    
+    def search(self, query: str, regex: bool = False, ignore_case: bool = False,
+               limit: int = 20) -> List[dict]:
+        """
+        Search the saved files for text
+        
+        Args:
+            query: Text to find, or a regular expression if regex is set
+            regex: Treat query as a regular expression
+            ignore_case: Match regardless of case
+            limit: Maximum number of files returned
+            
+        Returns:
+            List of dictionaries with 'name', 'path', 'count' and 'lines'
+            (matching (line number, line) pairs), best matches first
+        """
+        try:
+            results = self.search_index.search(query, regex=regex, ignore_case=ignore_case, limit=limit)
+            if self.blob_store is not None:
+                for result in results:
+                    result['path'] = os.path.join(self.base_dir, result['name'])
+            return results
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Search failed: {str(e)}")
+    
+    def _blob_info(self, info: Optional[dict]) -> Optional[dict]:
+        # 'path' is where export_file() puts the plain copy
+        if info is not None:
+            info['path'] = os.path.join(self.base_dir, info['name'])
+        return info
+    
     def list_files(self) -> list:
         """
         List all saved Python files
@@ -120,23 +350,12 @@ class FileManager:
         Returns:
             List of dictionaries with file information
         """
-        files = []
-        
         try:
-            for filename in os.listdir(self.base_dir):
-                if filename.endswith('.py'):
-                    filepath = os.path.join(self.base_dir, filename)
-                    stat = os.stat(filepath)
-                    files.append({
-                        'name': filename,
-                        'size': stat.st_size,
-                        'modified': stat.st_mtime,
-                        'path': filepath
-                    })
+            if self.blob_store is not None:
+                return [self._blob_info(info) for info in self.blob_store.list()]
+            return self.file_index.list()
         except Exception:
-            pass
-        
-        return sorted(files, key=lambda x: x['modified'], reverse=True)
+            return []
     
     def delete_file(self, filename: str) -> bool:
         """
@@ -151,8 +370,11 @@ class FileManager:
         filepath = os.path.join(self.base_dir, filename)
         
         try:
+            if self.blob_store is not None:
+                return self.blob_store.delete(filename)
             if os.path.exists(filepath):
                 os.remove(filepath)
+                self.file_index.remove(filename)
                 return True
             return False
         except Exception:
@@ -168,6 +390,15 @@ class FileManager:
         Returns:
             Dictionary with file information or None if not found
         """
+        if self.blob_store is not None:
+            return self._blob_info(self.blob_store.get(filename))
+        
+        if filename.endswith(self.file_index.suffix):
+            try:
+                return self.file_index.get(filename)
+            except Exception:
+                return None
+        
         filepath = os.path.join(self.base_dir, filename)
         
         try:
@@ -0,0 +1,189 @@
+"""
+Line Timer - Per-line hit counts and timings for executed user code
+"""
+
+import sys
+import time
+from types import CodeType
+from typing import Dict, Iterable, List, Set, Tuple
+
+class LineTimings:
+    """Hit count and time spent per source line"""
+    
+    def __init__(self):
+        self.hits: Dict[int, int] = {}
+        self.times: Dict[int, float] = {}
+    
+    def record(self, line: int, elapsed: float):
+        """Add one execution of a line"""
+        self.hits[line] = self.hits.get(line, 0) + 1
+        self.times[line] = self.times.get(line, 0.0) + elapsed
+    
+    def hot_lines(self, count: int = 10) -> List[Tuple[int, int, float]]:
+        """
+        Get the lines that took the most time
+        
+        Args:
+            count: Maximum number of lines returned
+        
+        Returns:
+            List of (line number, hits, seconds), slowest first
+        """
+        lines = sorted(self.times, key=self.times.get, reverse=True)[:count]
+        return [(line, self.hits[line], self.times[line]) for line in lines]
+    
+    def heat(self) -> Dict[int, float]:
+        """
+        Get each line's time relative to the slowest line
+        
+        Returns:
+            Dictionary mapping line number to a value between 0 and 1
+        """
+        if not self.times:
+            return {}
+        slowest = max(self.times.values()) or 1.0
+        return {line: elapsed / slowest for line, elapsed in self.times.items()}
+    
+    def format(self, count: int = 10) -> str:
+        """Render the hottest lines as text"""
+        lines = ["⏱️ Line timings", f"{'line':>6} {'hits':>8} {'seconds':>10}"]
+        for line, hits, elapsed in self.hot_lines(count):
+            lines.append(f"{line:>6} {hits:>8} {elapsed:>10.6f}")
+        return '\n'.join(lines)
+    
+    def __str__(self):
+        return self.format()
+
+def collect_code_objects(code_objects: Iterable[CodeType]) -> Set[CodeType]:
+    """Collect code objects and every function/class body nested inside them"""
+    collected = set()
+    pending = list(code_objects)
+    while pending:
+        code = pending.pop()
+        if code in collected:
+            continue
+        collected.add(code)
+        pending.extend(const for const in code.co_consts if isinstance(const, CodeType))
+    return collected
+
+class LineTimer:
+    """
+    Context manager recording line timings for the given code objects only
+    
+    Uses sys.monitoring local events on Python 3.12+, so untraced code runs
+    at full speed. Older versions fall back to a settrace hook that only
+    installs a line tracer in frames running the user's code.
+    """
+    
+    def __init__(self, code_objects: Iterable[CodeType]):
+        """
+        Args:
+            code_objects: Top-level code objects of the user's code
+        """
+        self.codes = collect_code_objects(code_objects)
+        self.timings = LineTimings()
+        # Frame -> (line currently executing, time it started)
+        self._frames = {}
+        self._tool_id = None
+        self._previous_trace = None
+        # 'monitoring' or 'settrace', set when timing starts
+        self.backend = None
+    
+    def __enter__(self):
+        if hasattr(sys, 'monitoring') and self._start_monitoring():
+            self.backend = 'monitoring'
+        else:
+            self.backend = 'settrace'
+            self._previous_trace = sys.gettrace()
+            sys.settrace(self._trace_call)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        if self._tool_id is not None:
+            self._stop_monitoring()
+        else:
+            sys.settrace(self._previous_trace)
+        
+        # Frames left by exceptions still get their last line accounted
+        now = time.perf_counter()
+        for line, started in self._frames.values():
+            self.timings.record(line, now - started)
+        self._frames.clear()
+        return False
+    
+    def _line(self, frame, line: int):
+        """Close the frame's previous line and start timing a new one"""
+        now = time.perf_counter()
+        state = self._frames.get(frame)
+        if state is not None:
+            self.timings.record(state[0], now - state[1])
+        self._frames[frame] = (line, now)
+    
+    def _leave(self, frame):
+        """Close the frame's last line when it returns, yields or raises"""
+        state = self._frames.pop(frame, None)
+        if state is not None:
+            self.timings.record(state[0], time.perf_counter() - state[1])
+    
+    # sys.monitoring backend (Python 3.12+)
+    
+    def _start_monitoring(self) -> bool:
+        monitoring = sys.monitoring
+        for tool_id in (monitoring.PROFILER_ID, monitoring.OPTIMIZER_ID):
+            try:
+                monitoring.use_tool_id(tool_id, 'python-code-executor')
+            except ValueError:
+                continue
+            self._tool_id = tool_id
+            break
+        else:
+            return False
+        
+        events = monitoring.events
+        monitoring.register_callback(self._tool_id, events.LINE, self._on_line)
+        monitoring.register_callback(self._tool_id, events.PY_RETURN, self._on_leave)
+        monitoring.register_callback(self._tool_id, events.PY_YIELD, self._on_leave)
+        monitoring.register_callback(self._tool_id, events.PY_UNWIND, self._on_unwind)
+        for code in self.codes:
+            monitoring.set_local_events(self._tool_id, code,
+                                        events.LINE | events.PY_RETURN | events.PY_YIELD)
+        # PY_UNWIND cannot be enabled per code object, only globally
+        monitoring.set_events(self._tool_id, events.PY_UNWIND)
+        return True
+    
+    def _stop_monitoring(self):
+        monitoring = sys.monitoring
+        events = monitoring.events
+        for code in self.codes:
+            monitoring.set_local_events(self._tool_id, code, 0)
+        monitoring.set_events(self._tool_id, 0)
+        for event in (events.LINE, events.PY_RETURN, events.PY_YIELD, events.PY_UNWIND):
+            monitoring.register_callback(self._tool_id, event, None)
+        monitoring.free_tool_id(self._tool_id)
+        self._tool_id = None
+    
+    def _on_line(self, code, line):
+        # The caller of the callback is the monitored frame
+        self._line(sys._getframe(1), line)
+    
+    def _on_leave(self, code, offset, value):
+        self._leave(sys._getframe(1))
+    
+    def _on_unwind(self, code, offset, exception):
+        # Fires for every frame left by an exception, not only the user's
+        if code in self.codes:
+            self._leave(sys._getframe(1))
+    
+    # settrace backend
+    
+    def _trace_call(self, frame, event, arg):
+        if event == 'call' and frame.f_code in self.codes:
+            return self._trace_lines
+        return None
+    
+    def _trace_lines(self, frame, event, arg):
+        if event == 'line':
+            self._line(frame, frame.f_lineno)
+        elif event == 'return':
+            self._leave(frame)
+        return self._trace_lines
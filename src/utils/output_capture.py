@@ -0,0 +1,237 @@
+"""
+Output Capture - Bounded text buffer that spills large output to disk
+"""
+
+import io
+import mmap
+import os
+import tempfile
+from typing import Callable, Optional
+
+from .resource_limits import OutputBudget
+
+def _byte_length(text: str) -> int:
+    """UTF-8 size of text, without encoding plain ASCII"""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-8', 'replace'))
+
+class BoundedOutputBuffer(io.TextIOBase):
+    """
+    Write-only text stream with a fixed in-memory budget
+    
+    The first max_memory bytes are kept in memory as the head. Everything
+    after that is appended to a temporary file, and only the last tail_size
+    characters are kept in memory as the tail. Memory use therefore stays
+    flat no matter how much is written, while the full text remains
+    readable from the memory-mapped spill file.
+    
+    Every write is checked against the room left in the head. Without a
+    budget, writes that are certain to fit (at most four bytes per
+    character) are only appended; their size is measured in one pass when
+    it is needed. A write that does not fit goes to the spill file. Spilled
+    text is collected and written out in chunks of SPILL_CHUNK characters,
+    and its size is counted once per chunk instead of once per write.
+    """
+    
+    # Characters of spilled text collected before they are written to the file
+    SPILL_CHUNK = 64 * 1024
+    
+    def __init__(self, max_memory: int = 1024 * 1024, tail_size: int = 64 * 1024,
+                 stream_name: str = 'stdout',
+                 on_write: Optional[Callable[[str, str], None]] = None,
+                 budget: Optional[OutputBudget] = None):
+        """
+        Args:
+            max_memory: Bytes kept in memory before spilling to disk
+            tail_size: Characters of the most recent output kept in memory once spilled
+            stream_name: Name passed to on_write ('stdout' or 'stderr')
+            on_write: Optional callback receiving (stream_name, text) for every write
+            budget: Optional OutputBudget charged for every write; a write
+                past its limit raises OutputLimitExceeded and is dropped
+        """
+        super().__init__()
+        self.max_memory = max(0, max_memory)
+        self.tail_size = max(0, tail_size)
+        self.stream_name = stream_name
+        self.on_write = on_write
+        self.budget = budget
+        self._head = io.StringIO()
+        self._head_bytes = 0
+        # Characters of the head counted in _head_bytes
+        self._measured = 0
+        # Characters that can be appended to the head without measuring them
+        self._fast_chars = self.max_memory // 4 if budget is None else 0
+        # Spilled text not written to the file yet
+        self._pending = []
+        self._pending_chars = 0
+        self._spilled_bytes = 0
+        self._tail = ''
+        self._spill_file = None
+        self._spill_path = None
+    
+    @property
+    def total_bytes(self) -> int:
+        """Bytes written so far"""
+        self._measure()
+        self._flush_spill()
+        return self._head_bytes + self._spilled_bytes
+    
+    def _measure(self):
+        """Count the head text appended without measuring it"""
+        if self._measured < self._head.tell():
+            self._head.seek(self._measured)
+            self._head_bytes += _byte_length(self._head.read())
+            self._measured = self._head.tell()
+    
+    @property
+    def spilled(self) -> bool:
+        """Whether output went past the in-memory budget"""
+        return self._spill_file is not None
+    
+    @property
+    def omitted_bytes(self) -> int:
+        """Bytes that are neither in the head nor in the tail"""
+        if not self.spilled:
+            return 0
+        return max(0, self.total_bytes - self._head_bytes - _byte_length(self.tail()))
+    
+    def writable(self):
+        return True
+    
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"string argument expected, got '{type(text).__name__}'")
+        length = len(text)
+        if length <= self._fast_chars:
+            # Common case: no budget, not spilled, and room left for sure
+            self._fast_chars -= length
+            self._head.write(text)
+        elif self._spill_file is not None and self.budget is None:
+            self._spill(text)
+        else:
+            return self._write(text)
+        if self.on_write is not None:
+            self.on_write(self.stream_name, text)
+        return length
+    
+    def _write(self, text):
+        if self.closed:
+            raise ValueError("write to closed output buffer")
+        if not text:
+            return 0
+        
+        size = _byte_length(text)
+        if self.budget is not None:
+            self.budget.charge(size)
+        
+        if self.spilled:
+            self._spill(text)
+        else:
+            self._measure()
+            if self._head_bytes + size <= self.max_memory:
+                self._head.write(text)
+                self._head_bytes += size
+                self._measured = self._head.tell()
+                if self.budget is None:
+                    self._fast_chars = (self.max_memory - self._head_bytes) // 4
+            else:
+                # Everything from the first write that does not fit goes to the file
+                self._fast_chars = 0
+                self._spill(text)
+        
+        if self.on_write is not None:
+            self.on_write(self.stream_name, text)
+        return len(text)
+    
+    def _spill(self, text: str):
+        """Queue text for the spill file"""
+        if self._spill_file is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix='pce_output_', suffix='.txt')
+            self._spill_file = os.fdopen(fd, 'w+b')
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_chars >= self.SPILL_CHUNK:
+            self._flush_spill()
+    
+    def _flush_spill(self):
+        """Write the queued text to the spill file, keeping its end as the tail"""
+        if not self._pending:
+            return
+        chunk = ''.join(self._pending)
+        self._pending = []
+        self._pending_chars = 0
+        data = chunk.encode('utf-8', 'replace')
+        self._spill_file.write(data)
+        self._spilled_bytes += len(data)
+        self._tail = self._keep_tail(self._tail + chunk if len(chunk) < self.tail_size else chunk)
+    
+    def _keep_tail(self, text: str) -> str:
+        return text[-self.tail_size:] if self.tail_size else ''
+    
+    def head(self) -> str:
+        """The beginning of the output kept in memory"""
+        return self._head.getvalue()
+    
+    def tail(self) -> str:
+        """The end of the output kept in memory (empty unless spilled)"""
+        return self._keep_tail(self._tail + ''.join(self._pending))
+    
+    def getvalue(self) -> str:
+        """
+        Get the captured text, abbreviated if it was spilled
+        
+        Returns:
+            The full text, or head and tail around a note about the omitted part
+        """
+        if not self.spilled:
+            return self.head()
+        return (f"{self.head()}\n"
+                f"... [{self.omitted_bytes} bytes omitted, {self.total_bytes} bytes total] ...\n"
+                f"{self.tail()}")
+    
+    def spilled_view(self) -> Optional[mmap.mmap]:
+        """
+        Map the spill file for reading
+        
+        Returns:
+            Read-only memory map of everything past the head, or None if
+            nothing was spilled
+        """
+        if not self.spilled:
+            return None
+        self._flush_spill()
+        self._spill_file.flush()
+        if os.fstat(self._spill_file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(self._spill_file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def read_all(self) -> str:
+        """Read the complete output, including the spilled part"""
+        view = self.spilled_view()
+        if view is None:
+            return self.head()
+        with view:
+            return self.head() + view[:].decode('utf-8', 'replace')
+    
+    def close(self):
+        """Release memory and delete the spill file"""
+        if self.closed:
+            return
+        self._measure()
+        if self._spill_file is not None:
+            # Keeps total_bytes right after closing
+            self._spilled_bytes += _byte_length(''.join(self._pending))
+            self._spill_file.close()
+            try:
+                os.remove(self._spill_path)
+            except OSError:
+                pass
+            self._spill_file = None
+        self._fast_chars = 0
+        self._head = io.StringIO()
+        self._measured = 0
+        self._pending = []
+        self._pending_chars = 0
+        self._tail = ''
+        super().close()
@@ -0,0 +1,31 @@
+"""
+Platform Utils - Platform detection that does not import Kivy
+"""
+
+import os
+import sys
+
+def get_platform() -> str:
+    """
+    Detect the platform the same way kivy.utils.platform does
+    
+    Importing Kivy parses the command line and sets up logging and a
+    window provider, so headless tools use this instead.
+    
+    Returns:
+        One of 'android', 'ios', 'win', 'macosx', 'linux' or 'unknown'
+    """
+    kivy_build = os.environ.get('KIVY_BUILD', '')
+    if kivy_build in ('android', 'ios'):
+        return kivy_build
+    if 'P4A_BOOTSTRAP' in os.environ or 'ANDROID_ARGUMENT' in os.environ:
+        return 'android'
+    if sys.platform in ('win32', 'cygwin'):
+        return 'win'
+    if sys.platform == 'darwin':
+        return 'macosx'
+    if sys.platform.startswith(('linux', 'freebsd')):
+        return 'linux'
+    return 'unknown'
+
+platform = get_platform()
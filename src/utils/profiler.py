@@ -0,0 +1,130 @@
+"""
+Profiler - cProfile and tracemalloc instrumentation for code execution
+"""
+
+import cProfile
+import pstats
+import time
+import tracemalloc
+from typing import List, Optional, Tuple
+
+def _format_bytes(size: float) -> str:
+    """Format a byte count for display"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+class ProfileReport:
+    """Compact summary of a profiled run"""
+    
+    def __init__(self, total_time: float, functions: List[Tuple[str, int, float, float]],
+                 peak_memory: int, allocations: List[Tuple[str, int, int]]):
+        """
+        Args:
+            total_time: Wall time of the profiled code in seconds
+            functions: (function, call count, own time, cumulative time) rows,
+                sorted by cumulative time
+            peak_memory: Peak traced memory in bytes
+            allocations: (source location, size in bytes, block count) rows for
+                the largest allocation sites still alive at the end of the run
+        """
+        self.total_time = total_time
+        self.functions = functions
+        self.peak_memory = peak_memory
+        self.allocations = allocations
+    
+    def format(self) -> str:
+        """Render the report as text"""
+        lines = [f"📊 Profile ({self.total_time:.3f} s)", ""]
+        
+        lines.append("Top functions by cumulative time:")
+        lines.append(f"{'calls':>8} {'own s':>8} {'cum s':>8}  function")
+        for name, calls, own_time, cumulative_time in self.functions:
+            lines.append(f"{calls:>8} {own_time:>8.4f} {cumulative_time:>8.4f}  {name}")
+        
+        lines.append("")
+        lines.append(f"Peak memory: {_format_bytes(self.peak_memory)}")
+        if self.allocations:
+            lines.append("Top allocation sites:")
+            for location, size, count in self.allocations:
+                lines.append(f"  {_format_bytes(size):>10}  {count:>6} blocks  {location}")
+        
+        return '\n'.join(lines)
+    
+    def __str__(self):
+        return self.format()
+
+class ExecutionProfiler:
+    """Context manager that profiles the code run inside it"""
+    
+    def __init__(self, top_functions: int = 15, top_allocations: int = 5):
+        """
+        Args:
+            top_functions: Number of functions listed in the report
+            top_allocations: Number of allocation sites listed in the report
+        """
+        self.top_functions = top_functions
+        self.top_allocations = top_allocations
+        self.report: Optional[ProfileReport] = None
+        self._profiler = None
+        self._started_tracemalloc = False
+        self._start_time = 0.0
+    
+    def __enter__(self):
+        # tracemalloc is process wide; leave it running if someone else started it
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        
+        self._profiler = cProfile.Profile()
+        self._start_time = time.perf_counter()
+        self._profiler.enable()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self._profiler.disable()
+        total_time = time.perf_counter() - self._start_time
+        
+        _, peak_memory = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        
+        self.report = ProfileReport(
+            total_time,
+            self._function_rows(),
+            peak_memory,
+            self._allocation_rows(snapshot)
+        )
+        return False
+    
+    def _function_rows(self) -> List[Tuple[str, int, float, float]]:
+        """Summarize cProfile stats, hottest cumulative time first"""
+        stats = pstats.Stats(self._profiler).stats
+        rows = []
+        for func, (_, call_count, own_time, cumulative_time, _) in stats.items():
+            name = pstats.func_std_string(func)
+            # Hide the profiler's own bookkeeping
+            if '_lsprof' in name or func[0] == __file__:
+                continue
+            rows.append((name, call_count, own_time, cumulative_time))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:self.top_functions]
+    
+    def _allocation_rows(self, snapshot) -> List[Tuple[str, int, int]]:
+        """Summarize the largest allocation sites, excluding profiler internals"""
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        rows = []
+        for stat in snapshot.statistics('lineno')[:self.top_allocations]:
+            frame = stat.traceback[0]
+            rows.append((f"{frame.filename}:{frame.lineno}", stat.size, stat.count))
+        return rows
@@ -0,0 +1,139 @@
+"""
+Remote Client - Runs code on an execution server and streams its output back
+"""
+
+import gzip
+import json
+import time
+from typing import Callable, Optional
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # Remote execution is optional
+    requests = None
+
+from .cancellation import CancelHandle
+from .execution_result import ExecutionResult, ErrorInfo
+
+class RemoteClient:
+    """
+    Client for the execution server in src/server.py
+    
+    A single requests.Session keeps connections to the server alive, so only
+    the first run pays for connecting. Larger code is sent gzip-compressed,
+    and output comes back as a compressed stream of JSON lines while the
+    code runs. A server that cannot be reached is not tried again for
+    RETRY_AFTER seconds, so falling back to local execution stays cheap.
+    """
+    
+    # Request bodies larger than this many bytes are compressed
+    COMPRESS_THRESHOLD = 1024
+    # Seconds before a server that could not be reached is tried again
+    RETRY_AFTER = 30.0
+    # Seconds without any data, heartbeats included, after which the server is presumed gone
+    READ_TIMEOUT = 10.0
+    
+    def __init__(self, url: str, connect_timeout: float = 2.0, pool_size: int = 4):
+        """
+        Args:
+            url: Base URL of the server, e.g. 'http://192.168.1.20:8765'
+            connect_timeout: Seconds to wait for a connection
+            pool_size: Connections kept open for concurrent runs
+        """
+        self.url = url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self._unreachable_until = 0.0
+        self.session = None
+        if requests is not None:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self.session.headers['Accept-Encoding'] = 'gzip'
+    
+    @property
+    def available(self) -> bool:
+        """Whether a run would be sent to the server at all"""
+        return self.session is not None and time.monotonic() >= self._unreachable_until
+    
+    def health(self) -> Optional[dict]:
+        """Server status, or None if it cannot be reached"""
+        if self.session is None:
+            return None
+        try:
+            response = self.session.get(self.url + '/health', timeout=(self.connect_timeout, self.READ_TIMEOUT))
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError):
+            return None
+    
+    def execute(self, code: str, timeout: Optional[float] = None,
+                on_output: Optional[Callable[[str, str], None]] = None,
+                cancel: Optional[CancelHandle] = None) -> Optional[ExecutionResult]:
+        """
+        Run code on the server in a fresh namespace
+        
+        Args:
+            code: Python code to execute
+            timeout: Maximum execution time in seconds (the server caps it)
+            on_output: Optional callback receiving (stream_name, text) chunks
+                as the server sends them
+            cancel: Optional CancelHandle; cancelling it drops the connection,
+                which stops the code on the server
+        
+        Returns:
+            ExecutionResult of the run, or None if the server could not be
+            reached and nothing ran
+        """
+        if not self.available:
+            return None
+        
+        body = json.dumps({'code': code, 'timeout': timeout}).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if len(body) > self.COMPRESS_THRESHOLD:
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        
+        try:
+            response = self.session.post(self.url + '/execute', data=body, headers=headers, stream=True,
+                                         timeout=(self.connect_timeout, self.READ_TIMEOUT))
+        except requests.RequestException:
+            self._unreachable_until = time.monotonic() + self.RETRY_AFTER
+            return None
+        
+        result = None
+        with response:
+            if response.status_code != 200:
+                return self._remote_error(f"Server answered {response.status_code}: {response.text[:200]}")
+            try:
+                # chunk_size=None hands over each HTTP chunk as soon as it arrives.
+                # The stream is read to its end so the connection goes back to the pool.
+                for line in response.iter_lines(chunk_size=None):
+                    if cancel is not None and cancel.cancelled:
+                        # Closing the unfinished response drops the connection
+                        return ExecutionResult.stopped()
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if 'result' in event:
+                        result = ExecutionResult.from_dict(event['result'])
+                    elif on_output:
+                        on_output(event['stream'], event['text'])
+            except (requests.RequestException, ValueError) as e:
+                return self._remote_error(f"Connection to {self.url} lost: {e}")
+        if result is None:
+            return self._remote_error(f"{self.url} ended the run without a result")
+        return result
+    
+    def _remote_error(self, message: str) -> ExecutionResult:
+        # The code may have run, at least partly, so it is not run again locally
+        result = ExecutionResult()
+        result.status = 'error'
+        result.error = ErrorInfo('RemoteError', message)
+        return result
+    
+    def close(self):
+        """Close the pooled connections"""
+        if self.session is not None:
+            self.session.close()
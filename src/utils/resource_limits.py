@@ -0,0 +1,241 @@
+"""
+Resource Limits - Per-run caps on memory, CPU time and output
+"""
+
+import math
+import signal
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .cancellation import CancelHandle, ExecutionCancelled
+
+class ResourceLimitExceeded(ExecutionCancelled):
+    """Raised inside code that went past one of its resource limits"""
+    resource = ''
+
+class MemoryLimitExceeded(ResourceLimitExceeded):
+    resource = 'memory'
+
+class CPULimitExceeded(ResourceLimitExceeded):
+    resource = 'cpu'
+
+class OutputLimitExceeded(ResourceLimitExceeded):
+    resource = 'output'
+
+class ResourceLimits:
+    """Limits for a single run; None means unlimited"""
+    
+    def __init__(self, memory_bytes: Optional[int] = None, cpu_seconds: Optional[float] = None,
+                 output_bytes: Optional[int] = None):
+        """
+        Args:
+            memory_bytes: Memory the code may allocate
+            cpu_seconds: CPU time the code may use
+            output_bytes: Bytes the code may write to stdout and stderr together
+        """
+        self.memory_bytes = memory_bytes
+        self.cpu_seconds = cpu_seconds
+        self.output_bytes = output_bytes
+    
+    def get(self, name: str):
+        """Limit for 'memory', 'cpu' or 'output'"""
+        return {'memory': self.memory_bytes, 'cpu': self.cpu_seconds,
+                'output': self.output_bytes}[name]
+    
+    def describe(self, name: str) -> str:
+        """Message for a run stopped by the named limit"""
+        limit = self.get(name)
+        if name == 'cpu':
+            return f"CPU time limit of {limit} seconds exceeded"
+        label = 'Memory' if name == 'memory' else 'Output'
+        return f"{label} limit of {format_bytes(limit)} exceeded"
+    
+    def __repr__(self):
+        return (f"ResourceLimits(memory_bytes={self.memory_bytes}, cpu_seconds={self.cpu_seconds}, "
+                f"output_bytes={self.output_bytes})")
+
+def format_bytes(size: float) -> str:
+    """Human readable size, e.g. '1.5 MB'"""
+    for unit in ('bytes', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'bytes' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+class OutputBudget:
+    """Byte allowance shared by the stdout and stderr buffers of a run"""
+    
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.used = 0
+    
+    def charge(self, size: int):
+        """Account for written bytes, raising once the limit is passed"""
+        self.used += size
+        if self.limit is not None and self.used > self.limit:
+            raise OutputLimitExceeded()
+
+def _thread_cpu_clock() -> Optional[int]:
+    """Clock measuring the CPU time of the calling thread, readable from other threads"""
+    try:
+        return time.pthread_getcpuclockid(threading.get_ident())
+    except (AttributeError, OSError):
+        return None
+
+class ResourceMonitor:
+    """
+    In-process enforcement of memory and CPU limits
+    
+    Used as a context manager around the user's code. Memory is measured
+    with tracemalloc and CPU time with the running thread's CPU clock; a
+    watchdog thread polls both and stops the code through a CancelHandle
+    when a limit is passed. A single huge allocation can still get through
+    before the next poll, which is why workers also get OS limits.
+    """
+    
+    # Seconds between watchdog checks
+    POLL_INTERVAL = 0.02
+    
+    def __init__(self, limits: ResourceLimits, handle: CancelHandle):
+        self.limits = limits
+        self.handle = handle
+        self.memory_used = None
+        self.cpu_used = 0.0
+        self._started_tracemalloc = False
+        self._memory_base = 0
+        self._clock = None
+        self._cpu_base = 0.0
+        self._stop = threading.Event()
+        self._watchdog = None
+    
+    def _cpu_time(self) -> float:
+        if self._clock is None:
+            return time.process_time()
+        return time.clock_gettime(self._clock)
+    
+    def _watch(self):
+        memory_limit = self.limits.memory_bytes
+        cpu_limit = self.limits.cpu_seconds
+        while not self._stop.wait(self.POLL_INTERVAL):
+            if memory_limit is not None:
+                current, _ = tracemalloc.get_traced_memory()
+                if current - self._memory_base > memory_limit:
+                    self.handle.cancel(exception=MemoryLimitExceeded)
+                    return
+            if cpu_limit is not None and self._cpu_time() - self._cpu_base > cpu_limit:
+                self.handle.cancel(exception=CPULimitExceeded)
+                return
+    
+    def __enter__(self):
+        if self.limits.memory_bytes is not None:
+            # tracemalloc is process wide; leave it running if someone else started it
+            self._started_tracemalloc = not tracemalloc.is_tracing()
+            if self._started_tracemalloc:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self._memory_base, _ = tracemalloc.get_traced_memory()
+        
+        self._clock = _thread_cpu_clock()
+        self._cpu_base = self._cpu_time()
+        if self.limits.memory_bytes is not None or self.limits.cpu_seconds is not None:
+            self._watchdog = threading.Thread(target=self._watch, daemon=True)
+            self._watchdog.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+        self.cpu_used = self._cpu_time() - self._cpu_base
+        if self.limits.memory_bytes is not None:
+            _, peak = tracemalloc.get_traced_memory()
+            self.memory_used = max(0, peak - self._memory_base)
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+    
+    def usage(self, output_used: int) -> Dict[str, Tuple[float, Optional[float]]]:
+        """Usage of each measured resource as (used, limit) pairs"""
+        usage = {
+            'cpu': (self.cpu_used, self.limits.cpu_seconds),
+            'output': (output_used, self.limits.output_bytes),
+        }
+        if self.memory_used is not None:
+            usage['memory'] = (self.memory_used, self.limits.memory_bytes)
+        return usage
+
+# Worker processes: limits enforced by the operating system
+
+def _address_space_in_use() -> int:
+    """Current virtual memory size of this process in bytes (0 if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def limit_process_memory(memory_bytes: int):
+    """
+    Cap this process's address space at its current size plus memory_bytes
+    
+    Allocations past the cap fail with MemoryError instead of waking the
+    OOM killer. Meant for worker processes only: the cap is permanent.
+    """
+    if resource is None or not hasattr(resource, 'RLIMIT_AS'):
+        return
+    in_use = _address_space_in_use()
+    if not in_use:
+        # Without knowing the current size any cap could break the process
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    soft = in_use + memory_bytes
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+def _raise_cpu_limit(signum, frame):
+    raise CPULimitExceeded()
+
+@contextmanager
+def process_cpu_limit(cpu_seconds: Optional[float]):
+    """
+    Limit the CPU time this process may use inside the block
+    
+    A profiling timer (ITIMER_PROF), which counts the process's CPU time,
+    sends SIGPROF once cpu_seconds are used, so fractions of a second are
+    kept. RLIMIT_CPU only takes whole seconds; its soft limit is set one
+    second past the deadline as a backstop for code that takes over the
+    timer or its signal, and the kernel then sends SIGXCPU. Either signal
+    raises CPULimitExceeded in the main thread. Both are lifted again
+    afterwards, and the hard limit is never touched so it can be raised
+    for the next run.
+    """
+    if cpu_seconds is None or resource is None or not hasattr(signal, 'SIGXCPU'):
+        yield
+        return
+    
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    
+    previous_handlers = (signal.signal(signal.SIGXCPU, _raise_cpu_limit),
+                         signal.signal(signal.SIGPROF, _raise_cpu_limit))
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    signal.setitimer(signal.ITIMER_PROF, max(cpu_seconds, 1e-6))
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+        signal.signal(signal.SIGXCPU, previous_handlers[0])
+        signal.signal(signal.SIGPROF, previous_handlers[1])
@@ -0,0 +1,117 @@
+"""
+Result Formatter - Renders execution results as text for display
+"""
+
+from .execution_result import ExecutionResult
+from .resource_limits import format_bytes
+
+def format_result(result: ExecutionResult) -> str:
+    """
+    Render an execution result the way the output screen shows it
+    
+    Args:
+        result: The result to render
+    
+    Returns:
+        Human readable text describing the outcome
+    """
+    if result.status == 'blocked':
+        return format_blocked(result.blocked_functions)
+    
+    text = ""
+    if result.stdout:
+        text += f"✅ Output:\n{result.stdout}\n"
+    if result.stderr:
+        text += f"⚠️  Warnings:\n{result.stderr}\n"
+    
+    if result.status == 'timeout':
+        # Output printed before the time ran out stays visible
+        text += f"⏰ {result.error.message}"
+    elif result.status == 'cancelled':
+        text += "⏹️  Execution stopped"
+    elif result.error is not None:
+        if result.error.traceback:
+            text += f"❌ Execution Error:\n{result.error.traceback}"
+        else:
+            text += f"❌ Execution Error: {result.error.message}"
+    elif not text:
+        text = "✅ Code executed successfully (no output)"
+    
+    if result.skipped_cells:
+        text = f"⏩ Skipped {result.skipped_cells} unchanged cell(s)\n\n" + text
+    return text
+
+def format_blocked(blocked_functions: list) -> str:
+    """
+    Build the message shown when code uses input functions
+    
+    Args:
+        blocked_functions: (function name, reason) pairs
+    """
+    error_msg = "❌ Code execution blocked!\n\n"
+    error_msg += "The following functions require user input and are not allowed:\n"
+    for func, reason in blocked_functions:
+        error_msg += f"• {func}: {reason}\n"
+    error_msg += "\n💡 Suggestions:\n"
+    error_msg += "• Use hardcoded values instead of input()\n"
+    error_msg += "• Define variables with your test data\n"
+    error_msg += "• Use random values for testing\n"
+    error_msg += "• Example: name = 'John' instead of name = input('Enter name: ')\n"
+    return error_msg
+
+def format_timings(result: ExecutionResult) -> str:
+    """
+    Summarise where the time of a run went
+    
+    Returns:
+        One line per phase with wall and CPU time, or "" if nothing was timed
+    """
+    if not result.timings:
+        return ""
+    
+    lines = ["⏱️  Timings" + (" (compile cache hit)" if result.cache_hit else "") + ":"]
+    for phase, (wall, cpu) in result.timings.items():
+        lines.append(f"  {phase:<8} {wall * 1000:9.2f} ms wall {cpu * 1000:9.2f} ms cpu")
+    if result.peak_rss_delta:
+        lines.append(f"  peak RSS grew by {result.peak_rss_delta / 1024:.0f} KB")
+    return "\n".join(lines)
+
+def format_usage(result: ExecutionResult) -> str:
+    """
+    Show how close a run came to its resource limits
+    
+    Returns:
+        One line per limited resource, or "" if the run had no limits
+    """
+    lines = []
+    for name, (used, limit) in result.resource_usage.items():
+        if limit is None:
+            continue
+        if name == 'cpu':
+            amounts = f"{used:.2f} s of {limit} s"
+        else:
+            amounts = f"{format_bytes(used)} of {format_bytes(limit)}"
+        lines.append(f"  {name:<8} {amounts} ({result.limit_fraction(name):.0%})")
+    if not lines:
+        return ""
+    return "\n".join(["📊 Resource limits:"] + lines)
+
+def format_report(result: ExecutionResult) -> str:
+    """
+    Build the report shown below the output: profile, line timings, phase
+    timings and resource usage
+    
+    Returns:
+        The report text, or None when the run produced nothing to report
+    """
+    sections = []
+    if result.profile is not None:
+        sections.append(str(result.profile))
+    if result.line_timings is not None:
+        sections.append(str(result.line_timings))
+    usage = format_usage(result)
+    if sections or usage:
+        sections.append(format_timings(result))
+        sections.append(usage)
+        return "\n\n".join(section for section in sections if section)
+    return None
@@ -0,0 +1,315 @@
+"""
+Run Scheduler - Queues runs for an executor, dropping work that is no longer wanted
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Optional
+
+from .code_executor import EXECUTION_MODES
+from .execution_result import ExecutionResult
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BACKGROUND = 20
+
+class RunRequest:
+    """A run waiting in, or taken from, a RunScheduler"""
+    
+    __slots__ = ('code', 'mode', 'priority', 'source', 'key', 'on_output', 'on_complete',
+                 'submitted', 'ready_at', 'started', 'handle', 'state')
+    
+    def __init__(self, code: str, mode: str, priority: int, source: Optional[str],
+                 on_output=None, on_complete=None, ready_at: float = 0.0):
+        self.code = code
+        self.mode = mode
+        self.priority = priority
+        self.source = source
+        # Identical code from different sources is queued separately
+        self.key = (source, mode, code)
+        self.on_output = on_output
+        self.on_complete = on_complete
+        self.submitted = time.monotonic()
+        # Debounced: not started before this time
+        self.ready_at = ready_at
+        self.started = None
+        # CancelHandle once the run has started
+        self.handle = None
+        # 'pending', 'running', 'stopping' (cancelled while running), 'done',
+        # 'superseded', 'cancelled' (while pending), 'detached' (left running
+        # after a cancellation) or 'failed' (could not be run)
+        self.state = 'pending'
+    
+    @property
+    def wait_time(self) -> Optional[float]:
+        """Seconds between submission and start (None if not started)"""
+        if self.started is None:
+            return None
+        return self.started - self.submitted
+    
+    def __repr__(self):
+        return f"<RunRequest {self.mode} {self.state} priority={self.priority} source={self.source!r}>"
+
+class RunScheduler:
+    """
+    Runs code on a CodeExecutor one request at a time, in priority order
+    
+    Runs share the executor's namespace, so they never overlap. Within a
+    priority the newest request goes first. Submitting code that is
+    identical to a pending or running request from the same source returns
+    that request instead of queueing another. Submitting different code
+    from a source supersedes that source's older requests: pending ones
+    are dropped and a running one is cancelled, and neither reports any
+    more output or a result. Requests only start once they have been
+    pending for the debounce interval, so a burst of presses runs once.
+    
+    A cancelled run that has not stopped after detach_timeout seconds, e.g.
+    because it is stuck in a C call, is detached: it is left to finish on
+    its own, its output and result are dropped, and the next request starts
+    alongside it. A stopped run that is detached reports a stopped result.
+    """
+    
+    def __init__(self, executor, debounce: float = 0.1, detach_timeout: float = 1.0):
+        """
+        Args:
+            executor: The CodeExecutor to run code on
+            debounce: Seconds a request waits for a newer one before starting
+            detach_timeout: Seconds a cancelled run gets to stop before the
+                queue moves on without it
+        """
+        self.executor = executor
+        self.debounce = debounce
+        self.detach_timeout = detach_timeout
+        self._condition = threading.Condition()
+        self._heap = []
+        self._sequence = itertools.count()
+        # (source, mode, code) -> pending request
+        self._pending = {}
+        self._running: Optional[RunRequest] = None
+        self._thread = None
+        self._closed = False
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting to start"""
+        return len(self._pending)
+    
+    @property
+    def running(self) -> Optional[RunRequest]:
+        return self._running
+    
+    def submit(self, code: str, mode: str = 'normal', priority: int = PRIORITY_INTERACTIVE,
+               source: Optional[str] = None,
+               on_output: Optional[Callable[[str, str], None]] = None,
+               on_complete: Optional[Callable[[ExecutionResult], None]] = None) -> RunRequest:
+        """
+        Queue a run
+        
+        Args:
+            code: Python code to execute
+            mode: Execution mode, as for CodeExecutor.execute_async
+            priority: Lower values run first, e.g. PRIORITY_INTERACTIVE
+            source: Optional name of what submitted the run, e.g. 'editor';
+                newer code from the same source supersedes older runs
+            on_output: Optional callback receiving (stream_name, text) chunks
+            on_complete: Optional callback receiving the ExecutionResult
+        
+        Returns:
+            The request that will run this code; for a collapsed submission
+            this is the earlier request, which keeps its own callbacks
+        
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {mode}")
+        now = time.monotonic()
+        key = (source, mode, code)
+        with self._condition:
+            if self._closed:
+                raise Exception("Run scheduler has been shut down")
+            
+            running = self._running
+            if running is not None and running.key == key:
+                self.executor.telemetry.increment('runs_collapsed')
+                return running
+            existing = self._pending.get(key)
+            if existing is not None:
+                existing.ready_at = now + self.debounce
+                self.executor.telemetry.increment('runs_collapsed')
+                return existing
+            
+            if source is not None:
+                self._supersede(source)
+            
+            request = RunRequest(code, mode, priority, source, on_output, on_complete,
+                                 ready_at=now + self.debounce)
+            self._pending[key] = request
+            # Newest first within a priority
+            heapq.heappush(self._heap, (priority, -next(self._sequence), request))
+            self._start_dispatcher()
+            self._condition.notify()
+            return request
+    
+    def _supersede(self, source: str):
+        """Drop the pending requests of a source and cancel its running one"""
+        for key, request in list(self._pending.items()):
+            if request.source == source:
+                del self._pending[key]
+                request.state = 'superseded'
+                self.executor.telemetry.increment('runs_superseded')
+        running = self._running
+        if running is not None and running.source == source and running.state == 'running':
+            running.state = 'superseded'
+            self.executor.telemetry.increment('runs_superseded')
+            if running.handle is not None:
+                running.handle.cancel()
+            # The dispatcher stops waiting for it
+            self._condition.notify_all()
+    
+    def cancel(self, source: Optional[str] = None) -> int:
+        """
+        Cancel pending and running requests
+        
+        Args:
+            source: Only cancel requests from this source (None for all)
+        
+        Returns:
+            Number of requests cancelled
+        """
+        stopped = []
+        with self._condition:
+            for key, request in list(self._pending.items()):
+                if source is None or request.source == source:
+                    del self._pending[key]
+                    request.state = 'cancelled'
+                    stopped.append(request)
+            running = self._running
+            if running is not None and running.state == 'running' and (source is None or running.source == source):
+                # The run reports its own 'cancelled' result when it stops
+                running.state = 'stopping'
+                if running.handle is not None:
+                    running.handle.cancel()
+                stopped.append(running)
+            # Wakes the dispatcher and wait_idle()
+            self._condition.notify_all()
+        for request in stopped:
+            if request.state == 'cancelled' and request.on_complete:
+                request.on_complete(ExecutionResult.stopped())
+        return len(stopped)
+    
+    def _start_dispatcher(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, daemon=True)
+            self._thread.start()
+    
+    def _next_request(self) -> Optional[RunRequest]:
+        """Wait for the next request that is due (None once shut down)"""
+        with self._condition:
+            while not self._closed:
+                # Skip requests that were superseded or cancelled while queued
+                while self._heap and self._heap[0][2].state != 'pending':
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                request = self._heap[0][2]
+                delay = request.ready_at - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                if self._pending.get(request.key) is request:
+                    del self._pending[request.key]
+                request.state = 'running'
+                request.started = time.monotonic()
+                self._running = request
+                return request
+            return None
+    
+    def _dispatch(self):
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            self.executor.telemetry.observe('queue', request.wait_time)
+            self._run(request)
+    
+    def _run(self, request: RunRequest):
+        # Set once the run has reported its result
+        finished = []
+        
+        def on_output(stream_name, text):
+            # A superseded or detached run must not write into the newer run's output
+            if request.state not in ('superseded', 'detached') and request.on_output:
+                request.on_output(stream_name, text)
+        
+        def on_complete(result):
+            with self._condition:
+                report = request.state not in ('superseded', 'detached')
+                if report:
+                    request.state = 'done'
+                finished.append(True)
+                self._condition.notify_all()
+            if report and request.on_complete:
+                request.on_complete(result)
+        
+        try:
+            handle = self.executor.execute_async(request.code, on_output=on_output,
+                                                 on_complete=on_complete, mode=request.mode)
+            with self._condition:
+                request.handle = handle
+                if request.state != 'running':
+                    # Superseded or stopped before the handle existed
+                    handle.cancel()
+                # Woken when the run finishes or is cancelled
+                while not finished and request.state == 'running':
+                    self._condition.wait()
+            handle.join(None if finished else self.detach_timeout)
+            with self._condition:
+                stopping = not finished and request.state == 'stopping'
+                if not finished:
+                    # Stuck where the cancellation cannot reach it, e.g. in a
+                    # C call: whatever it reports from now on is dropped
+                    request.state = 'detached'
+                    self.executor.telemetry.increment('runs_detached')
+            if stopping and request.on_complete:
+                request.on_complete(ExecutionResult.stopped())
+        except Exception as e:
+            # The dispatcher must survive a request it cannot run
+            request.state = 'failed'
+            if request.on_complete:
+                request.on_complete(ExecutionResult.failed(e))
+        finally:
+            with self._condition:
+                self._running = None
+                self._condition.notify_all()
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is pending or running; False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and self._running is None, timeout)
+    
+    def stats(self) -> dict:
+        """Queue depth, the running request and how long requests waited"""
+        telemetry = self.executor.telemetry
+        waits = telemetry.histogram('queue')
+        return {
+            'queue_depth': self.queue_depth,
+            'running': self._running is not None,
+            'collapsed': telemetry.counter('runs_collapsed'),
+            'superseded': telemetry.counter('runs_superseded'),
+            'wait': waits.summary() if waits is not None else None,
+        }
+    
+    def shutdown(self):
+        """Cancel everything and stop the dispatcher thread"""
+        self.cancel()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(1.0)
@@ -0,0 +1,311 @@
+"""
+Search Index - Trigram index for full-text search over saved scripts
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Set
+
+# The regular expression parser is private and may change between Python
+# versions; required_literals() falls back to a full scan when it does
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    try:
+        import sre_parse
+    except ImportError:
+        sre_parse = None
+
+from .file_io import atomic_write
+
+INDEX_VERSION = 1
+
+def trigrams(text: str) -> Set[str]:
+    """Lowercased three-character substrings of text"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _literal_runs(parsed, runs: List[str], current: List[str]) -> List[str]:
+    # Appends the literal strings every match of the pattern must contain
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+        if op is sre_parse.SUBPATTERN:
+            # (group, add_flags, del_flags, pattern)
+            _literal_runs(av[-1], runs, current)
+            if current:
+                runs.append(''.join(current))
+                current.clear()
+        elif op is sre_parse.MAX_REPEAT or op is sre_parse.MIN_REPEAT:
+            low, high, item = av
+            if low >= 1:
+                # The repeated item occurs at least once on its own
+                inner = []
+                _literal_runs(item, runs, inner)
+                if inner:
+                    runs.append(''.join(inner))
+        # Anything else (classes, alternations, anchors...) requires nothing
+    return runs
+
+# A pattern with known literals, to check the parser still gives what
+# _literal_runs() expects
+_KNOWN_PATTERN = r'ab(c)d+e?(x|yz)f'
+_KNOWN_LITERALS = ['ab', 'c', 'd', 'f']
+
+# The parser module that passed the check
+_checked_parser = None
+
+def _parse_literals(pattern: str) -> List[str]:
+    current = []
+    runs = _literal_runs(sre_parse.parse(pattern), [], current)
+    if current:
+        runs.append(''.join(current))
+    return runs
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Literal strings that every match of a regular expression contains
+    
+    Returns:
+        The literals, possibly none. None are returned whenever the pattern
+        cannot be analysed, which makes a search read every file; invalid
+        patterns are left for re.compile() to report.
+    """
+    global _checked_parser
+    try:
+        if _checked_parser is not sre_parse:
+            if _parse_literals(_KNOWN_PATTERN) != _KNOWN_LITERALS:
+                return []
+            _checked_parser = sre_parse
+        runs = _parse_literals(pattern)
+    except Exception:
+        return []
+    if not all(isinstance(run, str) and run for run in runs):
+        return []
+    return runs
+
+class SearchIndex:
+    """
+    Trigram index of the scripts listed by a FileIndex
+    
+    For every lowercased trigram the index keeps the ids of the files that
+    contain it. A query is narrowed to the files that contain all trigrams
+    of its literal text, and only those files are read to confirm and rank
+    the matches. The index is kept on disk; refresh() re-indexes only the
+    files whose size or mtime changed. A changed file gets a new id and
+    its old id is left dead in the postings until there are enough dead
+    ids to make a compaction worthwhile.
+    """
+    
+    # Matching lines returned per file
+    MAX_LINES = 5
+    
+    def __init__(self, file_index, index_path: Optional[str] = None,
+                 read: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            file_index: FileIndex (or anything with directory and list())
+                listing the files to search
+            index_path: Optional file to persist the index in
+            read: Optional function returning the text stored under a name
+                (defaults to reading the file from the directory)
+        """
+        self.file_index = file_index
+        self.index_path = index_path
+        self.read = read
+        # id -> name, None for the ids of deleted or changed files
+        self._names: List[Optional[str]] = []
+        # name -> [id, size, mtime]
+        self._files: Dict[str, list] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self.indexed = 0
+        if index_path:
+            self._load()
+    
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index['version'] != INDEX_VERSION or index['directory'] != self.file_index.directory:
+                return
+            self._names = index['names']
+            self._files = index['files']
+            self._postings = {trigram: set(ids) for trigram, ids in index['postings'].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._names, self._files, self._postings = [], {}, {}
+    
+    def save(self):
+        """Write the index to its file, if there is one"""
+        if not self.index_path:
+            return
+        index = {
+            'version': INDEX_VERSION,
+            'directory': self.file_index.directory,
+            'names': self._names,
+            'files': self._files,
+            'postings': {trigram: sorted(ids) for trigram, ids in self._postings.items()},
+        }
+        try:
+            atomic_write(self.index_path, json.dumps(index, separators=(',', ':')))
+        except OSError:
+            # The index is rebuilt from the files if it is lost
+            pass
+    
+    def _read(self, name: str) -> str:
+        if self.read is not None:
+            return self.read(name)
+        with open(os.path.join(self.file_index.directory, name), 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    
+    def _forget(self, name: str):
+        file_id = self._files.pop(name)[0]
+        self._names[file_id] = None
+    
+    def _add(self, name: str, size: int, mtime: float, text: str):
+        file_id = len(self._names)
+        self._names.append(name)
+        self._files[name] = [file_id, size, mtime]
+        for trigram in trigrams(text):
+            postings = self._postings.get(trigram)
+            if postings is None:
+                self._postings[trigram] = {file_id}
+            else:
+                postings.add(file_id)
+        self.indexed += 1
+    
+    def refresh(self) -> bool:
+        """
+        Index new and changed files and drop deleted ones
+        
+        Returns:
+            True if the index changed
+        """
+        listed = {info['name']: info for info in self.file_index.list()}
+        changed = False
+        for name in [name for name in self._files if name not in listed]:
+            self._forget(name)
+            changed = True
+        for name, info in listed.items():
+            known = self._files.get(name)
+            if known is not None and known[1] == info['size'] and known[2] == info['modified']:
+                continue
+            try:
+                text = self._read(name)
+            except (OSError, KeyError):
+                continue
+            if known is not None:
+                self._forget(name)
+            self._add(name, info['size'], info['modified'], text)
+            changed = True
+        if changed:
+            if len(self._names) > 2 * len(self._files) + 64:
+                self._compact()
+            self.save()
+        return changed
+    
+    def _compact(self):
+        """Renumber the live files and drop dead ids from the postings"""
+        renumbered = {}
+        names = []
+        for old_id, name in enumerate(self._names):
+            if name is not None:
+                renumbered[old_id] = len(names)
+                self._files[name][0] = len(names)
+                names.append(name)
+        postings = {}
+        for trigram, ids in self._postings.items():
+            live = {renumbered[file_id] for file_id in ids if file_id in renumbered}
+            if live:
+                postings[trigram] = live
+        self._names = names
+        self._postings = postings
+    
+    def candidates(self, literals: List[str]) -> List[str]:
+        """Names of the files that contain every trigram of the literals"""
+        needed = set()
+        for literal in literals:
+            needed |= trigrams(literal)
+        if not needed:
+            # Nothing to narrow by: every file is a candidate
+            return list(self._files)
+        ids = None
+        # Intersect the rarest trigrams first
+        for trigram in sorted(needed, key=lambda t: len(self._postings.get(t, ()))):
+            postings = self._postings.get(trigram)
+            if not postings:
+                return []
+            ids = set(postings) if ids is None else ids & postings
+            if not ids:
+                return []
+        return [self._names[file_id] for file_id in ids if self._names[file_id] is not None]
+    
+    def search(self, query: str, regex: bool = False, ignore_case: bool = False,
+               limit: int = 20) -> List[dict]:
+        """
+        Find the files containing a substring or regular expression
+        
+        Args:
+            query: Text or pattern to search for
+            regex: Treat query as a regular expression
+            ignore_case: Match regardless of case
+            limit: Maximum number of files returned
+        
+        Returns:
+            List of dictionaries with 'name', 'path', 'count' (number of
+            matches) and 'lines' ((line number, line) pairs), best first:
+            files whose name matches, then by number of matches, then the
+            most recently modified
+        
+        Raises:
+            ValueError: If query is not a valid regular expression
+        """
+        if not query:
+            return []
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        try:
+            if regex:
+                pattern = re.compile(query, flags)
+                literals = required_literals(query)
+            else:
+                literals = [query]
+                pattern = re.compile(re.escape(query), flags)
+        except re.error as e:
+            raise ValueError(f"Invalid search pattern: {e}")
+        
+        self.refresh()
+        results = []
+        for name in self.candidates(literals):
+            try:
+                text = self._read(name)
+            except (OSError, KeyError):
+                continue
+            count = 0
+            lines = []
+            last_line = 0
+            for match in pattern.finditer(text):
+                count += 1
+                if len(lines) < self.MAX_LINES:
+                    line_start = text.rfind('\n', 0, match.start()) + 1
+                    line_end = text.find('\n', match.start())
+                    line_number = text.count('\n', 0, line_start) + 1
+                    if line_number != last_line:
+                        lines.append((line_number, text[line_start:line_end if line_end != -1 else None]))
+                        last_line = line_number
+            if not count:
+                continue
+            name_match = pattern.search(name) is not None
+            results.append({
+                'name': name,
+                'path': os.path.join(self.file_index.directory, name),
+                'count': count,
+                'lines': lines,
+                'modified': self._files[name][2],
+                'name_match': name_match,
+            })
+        results.sort(key=lambda r: (r['name_match'], r['count'], r['modified']), reverse=True)
+        return results[:limit]
@@ -0,0 +1,257 @@
+"""
+Session Store - Persists executor namespaces and restores them lazily
+"""
+
+import builtins
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import tempfile
+import types
+from typing import Callable, Dict, Optional
+
+# Values of these types cannot change without being reassigned, so an entry
+# still holding the same object as at the last save is skipped without pickling
+_IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, tuple, frozenset, range)
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+class LazyBuiltins(dict):
+    """
+    Builtins mapping that loads saved namespace entries on first use
+    
+    A restored session keeps its namespaces plain dicts, so name lookups
+    hit the interpreter's fast paths, and installs this mapping as their
+    __builtins__ instead. A name found in neither namespace reaches
+    __missing__ here, which unpickles its saved value and stores it as an
+    ordinary entry of the namespace it was saved from. Builtin names are
+    copied in, so they are found without calling __missing__. Once nothing
+    is pending the real builtins module is put back, and code executed from
+    then on runs exactly as in a fresh executor.
+    """
+    
+    def __init__(self, global_vars: dict, local_vars: dict,
+                 pending_globals: Dict[str, dict], pending_locals: Dict[str, dict],
+                 loader: Callable[[str, dict], object]):
+        """
+        Args:
+            global_vars: Global namespace the entries are loaded into
+            local_vars: Local namespace the entries are loaded into
+            pending_globals: Manifest records of the globals not loaded yet, by name
+            pending_locals: Manifest records of the locals not loaded yet, by name
+            loader: Function turning (name, record) into the value
+        """
+        super().__init__(vars(builtins))
+        self.global_vars = global_vars
+        self.local_vars = local_vars
+        # Locals come first, as in a lookup by executed code
+        self.pending = {'locals': pending_locals, 'globals': pending_globals}
+        self._loader = loader
+        # Saved values shadow builtins of the same name until they are loaded
+        for pending in self.pending.values():
+            for name in pending:
+                dict.pop(self, name, None)
+        global_vars['__builtins__'] = self
+    
+    def _namespace(self, scope: str) -> dict:
+        return self.local_vars if scope == 'locals' else self.global_vars
+    
+    def __missing__(self, name):
+        for scope, pending in self.pending.items():
+            record = pending.pop(name, None)
+            if record is None:
+                continue
+            namespace = self._namespace(scope)
+            if not self.pending_count:
+                self.release()
+            if dict.__contains__(namespace, name):
+                # Assigned since the restore, which shadows the saved value
+                return namespace[name]
+            try:
+                value = self._loader(name, record)
+            except Exception:
+                # A value that can no longer be loaded behaves as if it was never saved
+                break
+            namespace[name] = value
+            return value
+        # Builtins added after the restore
+        return vars(builtins)[name]
+    
+    @property
+    def pending_count(self) -> int:
+        """Number of entries not loaded yet"""
+        return sum(len(pending) for pending in self.pending.values())
+    
+    def load_all(self):
+        """Load every pending entry"""
+        for pending in self.pending.values():
+            for name in list(pending):
+                try:
+                    self.__missing__(name)
+                except KeyError:
+                    pass
+        self.release()
+    
+    def discard(self):
+        """Forget the pending entries without loading them"""
+        for pending in self.pending.values():
+            pending.clear()
+        self.release()
+    
+    def release(self):
+        """Give the global namespace back the real builtins module"""
+        if self.global_vars.get('__builtins__') is self:
+            self.global_vars['__builtins__'] = builtins
+
+class SessionStore:
+    """
+    Saves the namespaces of a CodeExecutor to a directory
+    
+    Every namespace entry is pickled to its own file named after the hash
+    of its contents, and a JSON manifest maps names to files. Saving is
+    incremental: entries still pending from a lazy restore, immutable
+    values that are the same object as last time and values whose pickle
+    did not change are not written again. Modules are saved by name and
+    imported again on first use; values that cannot be pickled are skipped.
+    """
+    
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory for the manifest and entry files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # (scope, name) -> (value, manifest record) as of the last save. The value
+        # itself is kept, so its id cannot be reused by a different object
+        self._saved = {}
+    
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+    
+    def _record_for(self, key, value) -> Optional[dict]:
+        """Manifest record for a value, writing its file if it changed"""
+        previous = self._saved.get(key)
+        if previous is not None and previous[0] is value and isinstance(value, _IMMUTABLE_TYPES):
+            return previous[1]
+        
+        if isinstance(value, types.ModuleType):
+            return {'module': value.__name__}
+        
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+        
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        filename = f"{digest}.pkl"
+        if previous is None or previous[1].get('file') != filename:
+            path = os.path.join(self.directory, filename)
+            if not os.path.exists(path):
+                self._write_atomic(path, data)
+        return {'file': filename, 'size': len(data)}
+    
+    def _write_atomic(self, path: str, data: bytes):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    def save(self, executor) -> dict:
+        """
+        Save the executor's namespaces
+        
+        Args:
+            executor: The CodeExecutor to save
+        
+        Returns:
+            Statistics: entries saved, written, skipped as unpicklable
+        """
+        manifest = {'version': MANIFEST_VERSION, 'cell_keys': list(executor._cell_keys), 'scopes': {}}
+        saved = {}
+        stats = {'entries': 0, 'written': 0, 'unpicklable': []}
+        existing = set(os.listdir(self.directory))
+        lazy = executor.global_vars.get('__builtins__')
+        pending = lazy.pending if isinstance(lazy, LazyBuiltins) else {}
+        
+        for scope, namespace in (('globals', executor.global_vars), ('locals', executor.local_vars)):
+            records = {}
+            # Entries never loaded since the last restore are unchanged by definition
+            for name, record in pending.get(scope, {}).items():
+                if not dict.__contains__(namespace, name):
+                    records[name] = record
+            for name, value in list(namespace.items()):
+                if name.startswith('__') and name.endswith('__'):
+                    continue
+                record = self._record_for((scope, name), value)
+                if record is None:
+                    stats['unpicklable'].append(name)
+                    continue
+                records[name] = record
+                saved[(scope, name)] = (value, record)
+            manifest['scopes'][scope] = records
+            stats['entries'] += len(records)
+        
+        self._write_atomic(self.manifest_path, json.dumps(manifest).encode('utf-8'))
+        self._saved = saved
+        
+        # Remove files no longer referenced by the manifest
+        referenced = {record['file'] for records in manifest['scopes'].values()
+                      for record in records.values() if 'file' in record}
+        stats['written'] = len(referenced - existing)
+        for filename in existing:
+            if filename.endswith('.pkl') and filename not in referenced:
+                os.remove(os.path.join(self.directory, filename))
+        return stats
+    
+    def _load_entry(self, name: str, record: dict):
+        if 'module' in record:
+            return importlib.import_module(record['module'])
+        with open(os.path.join(self.directory, record['file']), 'rb') as f:
+            return pickle.load(f)
+    
+    def restore(self, executor) -> bool:
+        """
+        Give the executor the saved session, loading each entry lazily
+        
+        Only the manifest is read here; each entry is unpickled the first
+        time code uses it.
+        
+        Args:
+            executor: The CodeExecutor to restore into
+        
+        Returns:
+            True if a saved session was found
+        """
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if manifest.get('version') != MANIFEST_VERSION:
+            return False
+        
+        # Installed in the existing namespaces, which a run may already be
+        # using; names it has assigned shadow the saved values
+        scopes = manifest.get('scopes', {})
+        LazyBuiltins(executor.global_vars, executor.local_vars,
+                     dict(scopes.get('globals', {})), dict(scopes.get('locals', {})), self._load_entry)
+        executor._cell_keys = list(manifest.get('cell_keys', []))
+        self._saved = {}
+        return True
+    
+    def clear(self):
+        """Delete the saved session"""
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.pkl') or filename == MANIFEST_NAME:
+                os.remove(os.path.join(self.directory, filename))
+        self._saved = {}
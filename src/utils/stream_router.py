@@ -0,0 +1,116 @@
+"""
+Stream Router - Per-thread redirection of sys.stdout and sys.stderr
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+
+class StreamRouter(threading.local):
+    """
+    File-like object that forwards writes to the stream bound to the current thread
+    
+    Every attribute lives per thread, and bind() stores the target's own
+    write method on the router. print() in a capturing thread therefore
+    calls the target's write directly, without a forwarding call; other
+    threads use the write() method below.
+    """
+    
+    def __init__(self, name: str, fallback):
+        """
+        Args:
+            name: Name of the sys attribute being routed ('stdout' or 'stderr')
+            fallback: Stream used by threads that have no capture active
+        """
+        # threading.local runs this again, with the same arguments, in every thread
+        self.name = name
+        self.fallback = fallback
+        self._stream = None
+    
+    def current(self):
+        """Get the stream writes from this thread currently go to"""
+        stream = self._stream
+        return stream if stream is not None else self.fallback
+    
+    def bind(self, stream):
+        """
+        Route this thread's writes to a stream
+        
+        Args:
+            stream: Target stream, or None to restore the fallback
+        
+        Returns:
+            The previously bound stream (None if there was none)
+        """
+        previous = self._stream
+        self._stream = stream
+        if stream is not None:
+            # Shadows the write() method for this thread only
+            self.write = stream.write
+        else:
+            self.__dict__.pop('write', None)
+        return previous
+    
+    def write(self, text):
+        return self.current().write(text)
+    
+    def writelines(self, lines):
+        return self.current().writelines(lines)
+    
+    def flush(self):
+        stream = self.current()
+        if hasattr(stream, 'flush'):
+            stream.flush()
+
+def _delegate(name: str) -> property:
+    """Property reading an attribute of the stream the current thread writes to"""
+    return property(lambda self: getattr(self.current(), name))
+
+# Everything else comes from the target. These are explicit properties rather
+# than a __getattr__, which would send every lookup of write, twice per
+# print(), through a Python-level hook.
+for _name in ('encoding', 'errors', 'newlines', 'line_buffering', 'buffer', 'mode',
+              'closed', 'isatty', 'fileno', 'readable', 'writable', 'seekable', 'tell',
+              'reconfigure', 'detach'):
+    setattr(StreamRouter, _name, _delegate(_name))
+del _name
+
+_install_lock = threading.Lock()
+
+def install():
+    """
+    Replace sys.stdout and sys.stderr with routers (idempotent)
+    
+    Returns:
+        Tuple of the (stdout, stderr) routers
+    """
+    with _install_lock:
+        routers = []
+        for name in ('stdout', 'stderr'):
+            stream = getattr(sys, name)
+            if not isinstance(stream, StreamRouter):
+                stream = StreamRouter(name, stream)
+                setattr(sys, name, stream)
+            routers.append(stream)
+        return tuple(routers)
+
+@contextmanager
+def capture(stdout, stderr):
+    """
+    Send stdout and stderr written by the current thread to the given streams
+    
+    Other threads, including the UI thread, keep writing to their own
+    targets. Threads started by the captured code are not captured.
+    
+    Args:
+        stdout: Stream receiving this thread's standard output
+        stderr: Stream receiving this thread's standard error
+    """
+    stdout_router, stderr_router = install()
+    previous_stdout = stdout_router.bind(stdout)
+    previous_stderr = stderr_router.bind(stderr)
+    try:
+        yield
+    finally:
+        stdout_router.bind(previous_stdout)
+        stderr_router.bind(previous_stderr)
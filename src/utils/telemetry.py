@@ -0,0 +1,271 @@
+"""
+Telemetry - In-process counters and latency histograms for the executor
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+class LatencyHistogram:
+    """
+    Histogram of durations with power-of-two microsecond buckets
+    
+    Bucket i counts durations below 2**i microseconds (and at least
+    2**(i-1)), so recording is an int conversion and a list increment.
+    The count is derived from the buckets when queried.
+    """
+    
+    __slots__ = ('counts', 'total', 'max')
+    
+    # Enough buckets for any duration, so recording needs no bounds check
+    BUCKETS = 64
+    
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float):
+        """Add one duration in seconds"""
+        self.counts[int(seconds * 1000000).bit_length()] += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def record_many(self, durations: List[float]):
+        """Add a batch of durations in seconds"""
+        if not durations:
+            return
+        counts = self.counts
+        for seconds in durations:
+            counts[int(seconds * 1000000).bit_length()] += 1
+        self.total += sum(durations)
+        self.max = max(self.max, max(durations))
+    
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+    
+    @property
+    def mean(self) -> float:
+        count = self.count
+        return self.total / count if count else 0.0
+    
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimate a percentile from the buckets
+        
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.95
+        
+        Returns:
+            Upper bound in seconds of the bucket holding the percentile,
+            capped at the largest recorded value
+        """
+        count = self.count
+        if not count:
+            return 0.0
+        rank = fraction * count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if bucket_count and seen >= rank:
+                return min((1 << bucket) / 1000000, self.max)
+        return self.max
+    
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+# Durations of one name a thread collects before it sorts them into the
+# histogram itself
+FOLD_SAMPLES = 4096
+
+class Telemetry:
+    """
+    Counters and latency histograms describing executor activity
+    
+    Recording takes no lock, which keeps it well under a microsecond; an
+    increment racing with one from another thread may occasionally be lost.
+    Durations are only appended to a list owned by the recording thread;
+    they are sorted into the histograms when those are read, or once a
+    list holds FOLD_SAMPLES of them.
+    """
+    
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._local = threading.local()
+        # (thread, {name: durations}) for every thread that recorded one
+        self._buffers = []
+        self._fold_lock = threading.Lock()
+        self.started = time.time()
+    
+    def increment(self, name: str, amount: int = 1):
+        """Add to a counter, creating it on first use"""
+        counters = self.counters
+        counters[name] = counters.get(name, 0) + amount
+    
+    def observe(self, name: str, seconds: float):
+        """Record a duration in the named histogram"""
+        try:
+            durations = self._local.samples[name]
+        except (AttributeError, KeyError):
+            durations = self._new_samples(name)
+        durations.append(seconds)
+        if len(durations) >= FOLD_SAMPLES:
+            self._fold()
+    
+    def _new_samples(self, name: str) -> List[float]:
+        """Create the calling thread's list of durations for a name"""
+        try:
+            samples = self._local.samples
+        except AttributeError:
+            samples = self._local.samples = {}
+            with self._fold_lock:
+                self._buffers.append((threading.current_thread(), samples))
+        durations = samples[name] = []
+        return durations
+    
+    def _fold(self):
+        """Sort the durations recorded by every thread into the histograms"""
+        with self._fold_lock:
+            histograms = self._histograms
+            buffers = []
+            for thread, samples in self._buffers:
+                # Checked first: a thread that has finished records nothing more
+                alive = thread.is_alive()
+                # The owning thread may add names meanwhile
+                for name, durations in list(samples.items()):
+                    # ... and append durations; only what was taken is removed
+                    taken = len(durations)
+                    if not taken:
+                        continue
+                    histogram = histograms.get(name)
+                    if histogram is None:
+                        histogram = histograms[name] = LatencyHistogram()
+                    histogram.record_many(durations[:taken])
+                    del durations[:taken]
+                if alive:
+                    buffers.append((thread, samples))
+            self._buffers = buffers
+    
+    @property
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        """Histograms by name, including every duration recorded so far"""
+        self._fold()
+        return self._histograms
+    
+    def record_result(self, result):
+        """
+        Count an ExecutionResult and record its phase timings
+        
+        Args:
+            result: The ExecutionResult of a finished run
+        """
+        counters = self.counters
+        counters['runs'] = counters.get('runs', 0) + 1
+        counters[result.status] = counters.get(result.status, 0) + 1
+        if result.cache_hit:
+            counters['cache_hits'] = counters.get('cache_hits', 0) + 1
+        counters['output_bytes'] = counters.get('output_bytes', 0) + result.stdout_bytes + result.stderr_bytes
+        for phase, (wall, _) in result.timings.items():
+            self.observe(phase, wall)
+    
+    def counter(self, name: str) -> int:
+        """Current value of a counter (0 if it was never incremented)"""
+        return self.counters.get(name, 0)
+    
+    def histogram(self, name: str) -> Optional[LatencyHistogram]:
+        """The named histogram, or None if nothing was recorded in it"""
+        return self.histograms.get(name)
+    
+    def snapshot(self) -> dict:
+        """
+        Get a plain-data copy of all metrics
+        
+        Returns:
+            Dictionary with the time, uptime, counters and a summary of
+            every histogram (count, mean, p50, p95, p99 and max in seconds)
+        """
+        now = time.time()
+        return {
+            'time': now,
+            'uptime': now - self.started,
+            'counters': dict(self.counters),
+            'histograms': {name: histogram.summary()
+                           for name, histogram in list(self.histograms.items())},
+        }
+    
+    def reset(self):
+        """Forget all recorded metrics"""
+        with self._fold_lock:
+            for _, samples in self._buffers:
+                for durations in list(samples.values()):
+                    del durations[:]
+            self._histograms = {}
+        self.counters = {}
+        self.started = time.time()
+    
+    def dump(self, directory: str, filename: str = 'telemetry.jsonl',
+             max_bytes: int = 256 * 1024, backups: int = 3) -> str:
+        """
+        Append a snapshot to a rotating JSON lines file
+        
+        When the file grows past max_bytes it is renamed to filename.1,
+        older copies move up one number and the oldest is dropped.
+        
+        Args:
+            directory: Directory holding the file
+            filename: Name of the current file
+            max_bytes: Size at which the file is rotated
+            backups: Number of rotated files to keep
+        
+        Returns:
+            Path of the file the snapshot was written to
+        """
+        path = os.path.join(directory, filename)
+        try:
+            if os.path.getsize(path) >= max_bytes:
+                for index in range(backups - 1, 0, -1):
+                    older = f"{path}.{index}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{path}.{index + 1}")
+                if backups > 0:
+                    os.replace(path, f"{path}.1")
+                else:
+                    os.remove(path)
+        except FileNotFoundError:
+            pass
+        
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+        return path
+    
+    def format_summary(self) -> str:
+        """Render the metrics as a few short lines for an on-screen overlay"""
+        counters = self.counters
+        lines = [
+            f"runs {counters.get('runs', 0)}  errors {counters.get('error', 0)}  "
+            f"blocked {counters.get('blocked', 0)}  timeouts {counters.get('timeout', 0)}  "
+            f"cache hits {counters.get('cache_hits', 0)}"
+        ]
+        histograms = self.histograms
+        for name in ('queue', 'scan', 'compile', 'exec'):
+            histogram = histograms.get(name)
+            if histogram is not None and histogram.count:
+                lines.append(
+                    f"{name:<8} p50 {histogram.percentile(0.5) * 1000:.2f} ms  "
+                    f"p95 {histogram.percentile(0.95) * 1000:.2f} ms  "
+                    f"max {histogram.max * 1000:.2f} ms"
+                )
+        lines.append(f"output {counters.get('output_bytes', 0) / 1024:.1f} KB")
+        return "\n".join(lines)
@@ -0,0 +1,198 @@
+"""
+Version History - Compact per-script revision history
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from .file_io import atomic_write
+
+INDEX_VERSION = 1
+
+def make_delta(base_lines: List[str], lines: List[str]) -> list:
+    """
+    Describe lines as edits of base_lines
+    
+    Returns:
+        Operations: [start, end] copies base_lines[start:end], a list of
+        strings inserts those lines
+    """
+    operations = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            operations.append({'+': lines[j1:j2]})
+    return operations
+
+def apply_delta(base_lines: List[str], operations: list) -> str:
+    """Rebuild the text described by make_delta()"""
+    parts = []
+    for operation in operations:
+        if isinstance(operation, dict):
+            parts.extend(operation['+'])
+        else:
+            parts.extend(base_lines[operation[0]:operation[1]])
+    return ''.join(parts)
+
+class ScriptHistory:
+    """
+    Revisions of one script
+    
+    Revisions are appended to a pack file as zlib-compressed records: every
+    SNAPSHOT_INTERVAL revisions (or when a delta would be large) a full
+    snapshot, otherwise a line delta against the latest snapshot. Any
+    revision is therefore at most two records away. A JSON index holds the
+    offset of every record, so no record is read to find another.
+    """
+    
+    SNAPSHOT_INTERVAL = 25
+    # A delta larger than this fraction of the compressed full text starts a new snapshot
+    MAX_DELTA_RATIO = 0.5
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.json')
+        self.pack_path = os.path.join(directory, 'revisions.pack')
+        self.revisions: List[dict] = []
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                self.revisions = index['revisions']
+        except (OSError, ValueError, KeyError):
+            self.revisions = []
+        # Lines of the latest snapshot, kept for the next delta
+        self._snapshot_cache = None
+    
+    def __len__(self) -> int:
+        return len(self.revisions)
+    
+    def _read_record(self, revision: dict):
+        with open(self.pack_path, 'rb') as f:
+            f.seek(revision['offset'])
+            data = f.read(revision['length'])
+        return json.loads(zlib.decompress(data))
+    
+    def _snapshot_lines(self, number: int) -> List[str]:
+        """Lines of the full snapshot stored as revision number"""
+        if self._snapshot_cache is not None and self._snapshot_cache[0] == number:
+            return self._snapshot_cache[1]
+        lines = self._read_record(self.revisions[number])
+        self._snapshot_cache = (number, lines)
+        return lines
+    
+    def get(self, number: int = -1) -> str:
+        """
+        Text of a revision
+        
+        Args:
+            number: Revision number, negative counting from the latest
+        
+        Raises:
+            ValueError: If there is no such revision
+        """
+        try:
+            revision = self.revisions[number]
+        except IndexError:
+            raise ValueError(f"Unknown revision: {number}")
+        if revision['kind'] == 'full':
+            return ''.join(self._snapshot_lines(revision['number']))
+        base_lines = self._snapshot_lines(revision['base'])
+        return apply_delta(base_lines, self._read_record(revision))
+    
+    def record(self, text: str) -> Optional[dict]:
+        """
+        Add a revision
+        
+        Returns:
+            The new revision's index entry, or None if text equals the latest
+        """
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+        if self.revisions and self.revisions[-1]['hash'] == digest:
+            return None
+        
+        lines = text.splitlines(keepends=True)
+        number = len(self.revisions)
+        full = zlib.compress(json.dumps(lines).encode('utf-8'))
+        record, kind, base = full, 'full', number
+        
+        snapshot = self._latest_snapshot()
+        if snapshot is not None and number - snapshot < self.SNAPSHOT_INTERVAL:
+            delta = zlib.compress(json.dumps(make_delta(self._snapshot_lines(snapshot), lines)).encode('utf-8'))
+            if len(delta) <= len(full) * self.MAX_DELTA_RATIO:
+                record, kind, base = delta, 'delta', snapshot
+        
+        with open(self.pack_path, 'ab') as f:
+            offset = f.tell()
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        revision = {
+            'number': number,
+            'kind': kind,
+            'base': base,
+            'offset': offset,
+            'length': len(record),
+            'size': len(text),
+            'hash': digest,
+            'time': time.time(),
+        }
+        self.revisions.append(revision)
+        if kind == 'full':
+            self._snapshot_cache = (number, lines)
+        # Written after the record, so the index never points past the pack
+        atomic_write(self.index_path, json.dumps({'version': INDEX_VERSION, 'revisions': self.revisions}))
+        return revision
+    
+    def _latest_snapshot(self) -> Optional[int]:
+        if not self.revisions:
+            return None
+        latest = self.revisions[-1]
+        return latest['number'] if latest['kind'] == 'full' else latest['base']
+    
+    def stored_bytes(self) -> int:
+        """Bytes taken by the pack file"""
+        try:
+            return os.path.getsize(self.pack_path)
+        except OSError:
+            return 0
+
+class VersionHistory:
+    """Version histories of the saved scripts, one directory per script"""
+    
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory holding the histories
+        """
+        self.directory = directory
+        self._scripts: Dict[str, ScriptHistory] = {}
+    
+    def script(self, filename: str) -> ScriptHistory:
+        """History of one script (created on first use)"""
+        history = self._scripts.get(filename)
+        if history is None:
+            history = ScriptHistory(os.path.join(self.directory, filename))
+            self._scripts[filename] = history
+        return history
+    
+    def record(self, filename: str, text: str) -> Optional[dict]:
+        """Add a revision of a script; None if it did not change"""
+        return self.script(filename).record(text)
+    
+    def revisions(self, filename: str) -> List[dict]:
+        """Index entries of a script's revisions, oldest first"""
+        return list(self.script(filename).revisions)
+    
+    def get(self, filename: str, number: int = -1) -> str:
+        """Text of a revision of a script (raises ValueError if unknown)"""
+        return self.script(filename).get(number)
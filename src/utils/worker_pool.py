@@ -0,0 +1,298 @@
+"""
+Worker Pool - Pre-forked interpreter processes for isolated code execution
+"""
+
+import importlib
+import multiprocessing
+import queue
+import threading
+import time
+from typing import List, Optional, Sequence
+
+from .platform_utils import platform
+from .code_executor import CodeExecutor
+from .execution_result import ExecutionResult, ErrorInfo
+from .cancellation import CancelHandle
+from .resource_limits import ResourceLimits, limit_process_memory, process_cpu_limit
+
+# Modules imported once by the zygote process, so workers forked from it
+# start with them loaded; ones that are not installed are skipped
+DEFAULT_PRELOAD = (
+    'json', 're', 'datetime', 'collections', 'itertools', 'functools',
+    'math', 'random', 'statistics', 'decimal', 'fractions', 'csv', 'numpy',
+)
+
+# The forkserver is shared by the whole process and its preload list is
+# fixed once it starts: the modules the first pool gave it (None before)
+_forkserver_preload: Optional[frozenset] = None
+_forkserver_lock = threading.Lock()
+
+def preload_modules(names: Sequence[str]) -> List[str]:
+    """
+    Import modules ahead of the code that needs them
+
+    Args:
+        names: Module names; ones that fail to import are skipped
+
+    Returns:
+        Names of the modules that were imported
+    """
+    loaded = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            continue
+        loaded.append(name)
+    return loaded
+
+def _worker_main(conn, limits: Optional[ResourceLimits] = None, preload: Sequence[str] = ()):
+    """
+    Worker process loop: execute source received over the pipe
+
+    Args:
+        conn: Child end of the pipe shared with the pool
+        limits: Optional ResourceLimits; memory and CPU time are enforced
+            by the operating system, output by the executor
+        preload: Modules the process it was forked from did not load, to
+            import before the first run
+    """
+    preload_modules(preload)
+    executor = CodeExecutor()
+    if limits is not None:
+        if limits.memory_bytes is not None:
+            limit_process_memory(limits.memory_bytes)
+        executor.limits = ResourceLimits(output_bytes=limits.output_bytes)
+
+    while True:
+        try:
+            code = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            break
+
+        # None is the shutdown sentinel
+        if code is None:
+            break
+
+        # Every run starts from a clean namespace so workers are interchangeable
+        executor.reset_environment()
+        if limits is None:
+            conn.send(executor.execute(code))
+            continue
+
+        with process_cpu_limit(limits.cpu_seconds):
+            result = executor.execute(code)
+        if result.error is not None and result.error.type == 'CPULimitExceeded':
+            result.error.message = limits.describe('cpu')
+        elif result.error is not None and result.error.type == 'MemoryError' and limits.memory_bytes is not None:
+            # Failed allocations past the address space cap carry no message
+            result.error.message = result.error.message or limits.describe('memory')
+        result.resource_usage['cpu'] = (result.timings.get('exec', (0.0, 0.0))[1], limits.cpu_seconds)
+        result.resource_usage['memory'] = (result.peak_rss_delta, limits.memory_bytes)
+        conn.send(result)
+
+    conn.close()
+
+def _default_start_method() -> str:
+    """
+    Prefer a forkserver, then fork, so workers start warm
+
+    The forkserver is a zygote: a single-threaded process that imports the
+    preloaded modules once and forks every worker, which then shares them
+    copy-on-write. Unlike plain fork it is safe from a threaded parent.
+
+    On Android only fork works: the forkserver and spawn start a new
+    interpreter from sys.executable, which python-for-android does not have.
+    """
+    if platform == 'android':
+        return 'fork'
+    methods = multiprocessing.get_all_start_methods()
+    for method in ('forkserver', 'fork'):
+        if method in methods:
+            return method
+    return multiprocessing.get_start_method()
+
+class _Worker:
+    """A single interpreter process and the parent end of its pipe"""
+
+    def __init__(self, context, limits: Optional[ResourceLimits] = None, preload: Sequence[str] = ()):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, limits, tuple(preload)))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self):
+        """Ask the worker to exit, killing it if it does not comply"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(0.5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        """Kill the worker process immediately"""
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class WorkerPool:
+    """
+    Pool of pre-forked worker processes that execute Python code
+
+    With the forkserver start method, the preload list of the first pool
+    is what the process-wide forkserver imports; a forkserver that is
+    already running cannot take more. A later pool asking for other
+    modules therefore has its workers import those themselves
+    (worker_preload), and a forkserver started by other code before any
+    pool preloads nothing at all.
+    """
+
+    def __init__(self, size: int = 2, start_method: Optional[str] = None,
+                 limits: Optional[ResourceLimits] = None, preload: Sequence[str] = DEFAULT_PRELOAD):
+        """
+        Start the worker processes
+
+        Args:
+            size: Number of worker processes to keep warm
+            start_method: multiprocessing start method (defaults to a
+                forkserver, then fork, where available)
+            limits: Optional ResourceLimits applied to every run
+            preload: Modules every worker starts with already imported
+        """
+        self.size = max(1, size)
+        self.limits = limits
+        # This module comes first so workers don't import the executor either.
+        # The app's main module is never preloaded: it sets up the UI
+        self.preload = [__name__] + [name for name in preload
+                                     if name not in (__name__, '__main__', '__mp_main__')]
+        self.context = multiprocessing.get_context(start_method or _default_start_method())
+        # Modules each worker still imports itself after it was forked
+        self.worker_preload = self._warm_up()
+        self._idle = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def _warm_up(self) -> List[str]:
+        """
+        Load the preloaded modules into the process workers are forked from
+
+        Returns:
+            The modules that process does not load, which workers import
+        """
+        global _forkserver_preload
+        method = self.context.get_start_method()
+        if method == 'forkserver':
+            with _forkserver_lock:
+                if _forkserver_preload is None:
+                    # Takes effect when the first worker starts the forkserver
+                    self.context.set_forkserver_preload(self.preload)
+                    _forkserver_preload = frozenset(self.preload)
+                return [name for name in self.preload if name not in _forkserver_preload]
+        if method == 'fork':
+            preload_modules(self.preload)
+            return []
+        return list(self.preload)
+
+    def _spawn(self) -> _Worker:
+        """Start a new worker and track it"""
+        worker = _Worker(self.context, self.limits, self.worker_preload)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker):
+        """Kill a worker and put a fresh one in its place"""
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def execute(self, code: str, timeout: Optional[float] = None,
+                cancel: Optional[CancelHandle] = None) -> ExecutionResult:
+        """
+        Execute code in an idle worker process
+
+        Args:
+            code: Python code to execute
+            timeout: Maximum execution time in seconds (None waits forever)
+            cancel: Optional CancelHandle; cancelling it kills the worker
+
+        Returns:
+            ExecutionResult of the run, with status 'timeout' if the worker was killed
+        """
+        if self._closed:
+            raise Exception("Worker pool has been shut down")
+
+        worker = self._idle.get()
+        if self._closed:
+            # Woken by shutdown(), which spawns no more workers; wake the next waiter too
+            self._idle.put(worker)
+            raise Exception("Worker pool has been shut down")
+
+        try:
+            worker.conn.send(code)
+            if not self._wait_for_result(worker, timeout, cancel):
+                # The worker is still running the code: kill it so the work really stops
+                self._replace(worker)
+                worker = None
+                if cancel is not None and cancel.cancelled:
+                    return ExecutionResult.stopped()
+                return ExecutionResult.timed_out(timeout)
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            self._replace(worker)
+            worker = None
+            result = ExecutionResult()
+            result.status = 'error'
+            result.error = ErrorInfo('WorkerError', "worker process exited unexpectedly")
+            return result
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+    def _wait_for_result(self, worker: _Worker, timeout: Optional[float],
+                         cancel: Optional[CancelHandle]) -> bool:
+        """Wait until the worker has a result; False on timeout or cancellation"""
+        if cancel is None:
+            return worker.conn.poll(timeout)
+
+        # Poll in short slices so a cancellation is noticed quickly
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not cancel.cancelled:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            slice_length = CancelHandle.RETRY_INTERVAL if remaining is None else min(remaining, CancelHandle.RETRY_INTERVAL)
+            if worker.conn.poll(slice_length):
+                return True
+        return False
+
+    def shutdown(self):
+        """Stop all worker processes"""
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers = []
+        for worker in workers:
+            worker.stop()
+        # Wakes callers waiting for an idle worker that will never come back
+        self._idle.put(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.shutdown()
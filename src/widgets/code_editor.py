@@ -80,12 +80,21 @@ class CodeEditorWidget(BoxLayout):
         """Update line numbers when text changes"""
         lines = value.split('\n')
         self.line_numbers.update_lines(len(lines))
+    
+    def show_line_timings(self, timings):
+        """Mark hot lines in the gutter using LineTimings from a line-timed run"""
+        self.line_numbers.set_line_heat(timings.heat() if timings else {})
 
 class LineNumbersWidget(TextInput):
     """Widget to display line numbers"""
     
+    # Gutter markers from coolest to hottest, picked by a line's share of the slowest line
+    HEAT_MARKERS = ('', '·', '•', '●')
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.line_count = 0
+        self.line_heat = {}
         self.setup_line_numbers()
     
     def setup_line_numbers(self):
@@ -101,5 +110,28 @@ class LineNumbersWidget(TextInput):
     
     def update_lines(self, line_count):
         """Update the line numbers display"""
-        numbers = '\n'.join(str(i + 1) for i in range(line_count))
-        self.text = numbers 
\ No newline at end of file
+        self.line_count = line_count
+        if self.line_heat:
+            numbers = '\n'.join(f"{i + 1}{self._heat_marker(i + 1)}" for i in range(line_count))
+        else:
+            numbers = '\n'.join(str(i + 1) for i in range(line_count))
+        self.text = numbers
+    
+    def set_line_heat(self, line_heat):
+        """
+        Mark hot lines next to their numbers
+        
+        Args:
+            line_heat: Dictionary mapping line number to relative time (0 to 1),
+                as returned by LineTimings.heat(); empty to clear the markers
+        """
+        self.line_heat = dict(line_heat)
+        self.update_lines(self.line_count)
+    
+    def _heat_marker(self, line):
+        heat = self.line_heat.get(line, 0.0)
+        if heat <= 0.0:
+            return ''
+        level = min(int(heat * len(self.HEAT_MARKERS)), len(self.HEAT_MARKERS) - 1)
+        return ' ' + self.HEAT_MARKERS[level] if level else ''
+ 
\ No newline at end of file
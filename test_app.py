@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 def test_code_executor():
     """Test the code executor functionality"""
     from src.utils.code_executor import CodeExecutor
+    from src.utils.result_formatter import format_result
     
     executor = CodeExecutor()
     
@@ -19,7 +20,7 @@ def test_code_executor():
     code = 'print("Hello, World!")'
     result = executor.execute(code)
     print("Test 1 - Simple print:")
-    print(result)
+    print(format_result(result))
     print("-" * 50)
     
     # Test calculation
@@ -31,7 +32,7 @@ print(f"{x} + {y} = {result}")
 '''
     result = executor.execute(code)
     print("Test 2 - Calculation:")
-    print(result)
+    print(format_result(result))
     print("-" * 50)
     
     # Test function
@@ -46,7 +47,7 @@ for i in range(10):
 '''
     result = executor.execute(code)
     print("Test 3 - Function:")
-    print(result)
+    print(format_result(result))
     print("-" * 50)
     
     # Test input detection - should be blocked
@@ -56,7 +57,7 @@ print(f"Hello, {name}!")
 '''
     result = executor.execute(code)
     print("Test 4 - Input detection (should be blocked):")
-    print(result)
+    print(format_result(result))
     print("-" * 50)
     
     # Test import detection - should be blocked
@@ -67,7 +68,7 @@ root.title("Test")
 '''
     result = executor.execute(code)
     print("Test 5 - Import detection (should be blocked):")
-    print(result)
+    print(format_result(result))
     print("-" * 50)
     
     # Test safe alternative to input
@@ -79,7 +80,1040 @@ print(f"Hello, {name}! You are {age} years old.")
 '''
     result = executor.execute(code)
     print("Test 6 - Safe alternative to input:")
-    print(result)
+    print(format_result(result))
+    print("-" * 50)
+
+def test_streaming_execution():
+    """Test background execution with streamed output"""
+    from src.utils.code_executor import CodeExecutor
+    
+    executor = CodeExecutor()
+    chunks = []
+    results = []
+    
+    code = '''
+for i in range(3):
+    print(f"line {i}")
+'''
+    handle = executor.execute_async(
+        code,
+        on_output=lambda stream, text: chunks.append((stream, text)),
+        on_complete=results.append
+    )
+    handle.join(5.0)
+    
+    streamed = ''.join(text for stream, text in chunks if stream == 'stdout')
+    print("Streaming - Chunks received:")
+    print(streamed)
+    assert streamed == "line 0\nline 1\nline 2\n"
+    assert results and "line 2" in results[0].stdout
+
+    # A script that exits still completes, with its output and an error
+    handle = executor.execute_async('print("bye")\nimport sys\nsys.exit(3)', on_complete=results.append)
+    handle.join(5.0)
+    assert len(results) == 2 and results[1].stdout == "bye\n"
+    assert results[1].error.type == 'SystemExit' and results[1].error.message == '3'
+    print("-" * 50)
+
+def test_concurrent_executors():
+    """Test that concurrent runs each capture only their own output"""
+    import threading
+    from src.utils.code_executor import CodeExecutor
+
+    results = {}
+
+    def run(tag):
+        executor = CodeExecutor()
+        code = f'for i in range(200):\n    print("{tag}", i)'
+        results[tag] = executor.execute(code)
+
+    threads = [threading.Thread(target=run, args=(tag,)) for tag in ('alpha', 'beta', 'gamma')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print("Concurrent runs - Output isolation:")
+    for tag, result in results.items():
+        others = [other for other in results if other != tag]
+        assert result.stdout.count(f"{tag} ") == 200
+        assert not any(other in result.stdout for other in others)
+        print(f"  - {tag}: {result.stdout.count(tag)} lines, no foreign output")
+    print("-" * 50)
+
+def test_compile_cache():
+    """Test the parse-once pipeline and the bytecode cache"""
+    import tempfile
+    from src.utils.code_executor import CodeExecutor
+
+    code = 'total = sum(range(10))\nprint(total)'
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        executor = CodeExecutor(cache_dir=cache_dir)
+        first, detected = executor.compile_code(code)
+        second, _ = executor.compile_code(code)
+        print("Compile cache - Warm lookup reuses the code object:")
+        print(first is second, detected)
+        assert first is second and detected == []
+
+        # A new executor picks the compiled code up from disk
+        fresh = CodeExecutor(cache_dir=cache_dir)
+        code_obj, _ = fresh.compile_code(code)
+        print("Compile cache - Loaded from disk:")
+        print(fresh.compile_cache.hits == 1)
+        assert fresh.compile_cache.hits == 1
+        assert "45" in fresh.execute(code).stdout
+
+    # The on-disk cache drops its least recently used files past its limit
+    import os
+    import time
+    from src.utils.compile_cache import CompileCache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CompileCache(cache_dir=cache_dir, max_disk_entries=3)
+        keys = [cache.make_key(f'x = {i}') for i in range(5)]
+        for i, key in enumerate(keys):
+            cache.put(key, compile(f'x = {i}', '<test>', 'exec'), [])
+            if i == 2:
+                # Loading the first entry again keeps it on disk
+                time.sleep(0.01)
+                assert CompileCache(cache_dir=cache_dir).get(keys[0]) is not None
+            time.sleep(0.01)
+        kept = sorted(name[:-4] for name in os.listdir(cache_dir))
+        print("Compile cache - Files kept on disk:")
+        print(len(kept))
+        assert kept == sorted([keys[0], keys[3], keys[4]])
+
+    # Blocked code is detected without being compiled
+    executor = CodeExecutor()
+    code_obj, detected = executor.compile_code('name = input()')
+    assert code_obj is None and detected == ['input']
+    print("-" * 50)
+
+def test_cell_mode():
+    """Test incremental re-execution of '# %%' cells"""
+    from src.utils.code_executor import CodeExecutor
+
+    executor = CodeExecutor()
+    code = '''# %% setup
+runs = globals().setdefault('runs', [])
+runs.append('setup')
+data = list(range(5))
+# %% report
+print(sum(data))
+'''
+    result = executor.execute_cells(code)
+    print("Cell mode - First run:")
+    print(result.stdout)
+    assert "10" in result.stdout
+
+    # Only the edited last cell runs again
+    result = executor.execute_cells(code.replace('sum(data)', 'max(data)'))
+    print("Cell mode - After editing the last cell:")
+    print(result.stdout)
+    assert result.skipped_cells == 1 and "4" in result.stdout
+    assert executor.global_vars['runs'] == ['setup']
+
+    # Editing the first cell re-runs everything after it
+    result = executor.execute_cells(code.replace('range(5)', 'range(6)'))
+    assert "15" in result.stdout and executor.global_vars['runs'] == ['setup', 'setup']
+
+    # Errors keep line numbers from the editor buffer
+    result = executor.execute_cells(code + '# %%\nundefined_name\n')
+    assert result.status == 'error' and 'line 8' in result.error.traceback
+    print("-" * 50)
+
+def test_profiled_execution():
+    """Test the cProfile/tracemalloc run mode"""
+    from src.utils.code_executor import CodeExecutor
+
+    executor = CodeExecutor()
+    code = '''
+def build(n):
+    return [str(i) * 10 for i in range(n)]
+
+kept = build(20000)
+print(len(kept))
+'''
+    result = executor.execute_profiled(code)
+    report = result.profile
+    print("Profile - Output and report:")
+    print(result.stdout)
+    print(report)
+    assert "20000" in result.stdout
+    assert any('build' in row[0] for row in report.functions)
+    assert report.peak_memory > 0 and report.allocations
+    print("-" * 50)
+
+def test_line_timing():
+    """Test per-line hit counts and timings"""
+    from src.utils.code_executor import CodeExecutor
+
+    executor = CodeExecutor()
+    code = '''total = 0
+for i in range(1000):
+    total += i
+print(total)
+'''
+    result = executor.execute_line_timed(code)
+    timings = result.line_timings
+    print("Line timing - Hot lines:")
+    print(timings)
+    assert "499500" in result.stdout
+    assert timings.hits[3] == 1000 and timings.hits[4] == 1
+    assert max(timings.heat().values()) == 1.0
+
+    # Frames left by a caught exception stop being charged at once
+    code = '''import time
+def fail(i):
+    raise ValueError(i)
+for i in range(200):
+    try:
+        fail(i)
+    except ValueError:
+        pass
+time.sleep(0.2)
+'''
+    timings = executor.execute_line_timed(code).line_timings
+    assert timings.hits[3] == 200 and timings.times[3] < 0.1
+    assert sum(timings.times.values()) < 1.0
+    print("-" * 50)
+
+def test_execution_result():
+    """Test the structured result: status, errors and phase timings"""
+    import json
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.result_formatter import format_result
+
+    executor = CodeExecutor()
+    code = 'print("before")\nraise ValueError("bad value")'
+    result = executor.execute(code)
+    print("Execution result - Error with partial output:")
+    print(repr(result))
+    assert result.status == 'error' and result.stdout == "before\n"
+    assert result.error.type == 'ValueError' and result.error.message == "bad value"
+    assert set(result.timings) == {'parse', 'scan', 'compile', 'exec'}
+    assert not result.cache_hit
+
+    # The second run is served from the compile cache
+    result = executor.execute(code)
+    assert result.cache_hit and 'parse' not in result.timings
+
+    result = executor.execute('value = input()')
+    assert result.status == 'blocked' and result.blocked_functions[0][0] == 'input'
+    assert format_result(result).startswith("❌ Code execution blocked!")
+
+    # Results convert to plain data for JSON reports
+    data = json.loads(json.dumps(executor.execute('print(1)').to_dict()))
+    assert data['status'] == 'ok' and data['stdout'] == "1\n" and 'exec' in data['timings']
+    print("-" * 50)
+
+def test_telemetry():
+    """Test run counters, latency histograms and the rotating dump"""
+    import json
+    import tempfile
+    from src.utils.code_executor import CodeExecutor
+
+    executor = CodeExecutor()
+    executor.execute('print("hi")')
+    executor.execute('print("hi")')
+    executor.execute('1 / 0')
+    executor.execute('value = input()')
+
+    telemetry = executor.telemetry
+    print("Telemetry - Summary:")
+    print(telemetry.format_summary())
+    assert telemetry.counter('runs') == 4 and telemetry.counter('ok') == 2
+    assert telemetry.counter('error') == 1 and telemetry.counter('blocked') == 1
+    assert telemetry.counter('cache_hits') == 1 and telemetry.counter('output_bytes') == 6
+    exec_histogram = telemetry.histogram('exec')
+    assert exec_histogram.count == 3
+    assert 0 < exec_histogram.percentile(0.5) <= exec_histogram.max
+
+    with tempfile.TemporaryDirectory() as dump_dir:
+        for _ in range(3):
+            path = telemetry.dump(dump_dir, max_bytes=1, backups=1)
+        # Each dump rotated the previous file, keeping a single backup
+        assert sorted(os.listdir(dump_dir)) == ['telemetry.jsonl', 'telemetry.jsonl.1']
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.loads(f.read())
+        assert snapshot['counters']['runs'] == 4 and 'exec' in snapshot['histograms']
+
+    # Durations recorded by other threads show up once the histograms are read
+    import threading
+    from src.utils.telemetry import Telemetry, FOLD_SAMPLES
+    shared = Telemetry()
+    def record():
+        for _ in range(FOLD_SAMPLES + 10):
+            shared.observe('step', 0.002)
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    step = shared.histogram('step')
+    assert step.count == 4 * (FOLD_SAMPLES + 10) and step.max == 0.002
+    assert not shared._buffers and shared.histogram('missing') is None
+    print("-" * 50)
+
+def test_execution_budget():
+    """Test stopping runaway code with an instrumented step budget"""
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.result_formatter import format_result
+
+    executor = CodeExecutor()
+    code = '''
+def label(n):
+    """Describe n"""
+    return f"n={n}"
+print(label(1), label.__doc__)
+try:
+    while True:
+        pass
+except TimeoutError:
+    # Swallowing the error does not buy more time
+    while True:
+        pass
+'''
+    result = executor.execute_budgeted(code, max_steps=10000)
+    print("Execution budget - Infinite loop:")
+    print(repr(result), result.error.message)
+    assert result.status == 'timeout' and result.stdout == "n=1 Describe n\n"
+    assert result.error.type == 'TimeoutError'
+    assert format_result(result).startswith("✅ Output:\nn=1 Describe n\n") and "⏰" in format_result(result)
+
+    # Comprehensions and generator expressions spend the budget too
+    result = executor.execute_budgeted('print(sum(x for x in range(10 ** 9)))', max_steps=1000)
+    assert result.status == 'timeout'
+
+    # Functions defined under a budget still work in normal runs
+    result = executor.execute('print(label(2))')
+    assert result.ok and result.stdout == "n=2\n"
+
+    result = executor.execute_budgeted('print(sum([i for i in range(100)]))', max_steps=1000)
+    assert result.ok and result.stdout == "4950\n"
+    print("-" * 50)
+
+def test_cancellation():
+    """Test stopping a running script from another thread"""
+    import threading
+    import time
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.cancellation import CancelHandle, ExecutionCancelled
+    from src.utils.worker_pool import WorkerPool
+
+    executor = CodeExecutor()
+    results = []
+    code = '''print("started")
+try:
+    while True:
+        pass
+except:
+    while True:
+        pass
+'''
+    handle = executor.execute_async(code, on_complete=results.append)
+    time.sleep(0.2)
+    stopped = handle.cancel(wait=2.0)
+    handle.join(2.0)
+    print("Cancellation - In-process run:")
+    print(repr(results[0]))
+    assert stopped and not handle.is_alive()
+    assert results[0].status == 'cancelled' and results[0].stdout == "started\n"
+
+    # The executor is usable again afterwards
+    assert executor.execute('print("again")').stdout == "again\n"
+
+    # Thread timeouts now stop the code instead of abandoning it
+    result = executor.execute_with_timeout('while True:\n    pass', timeout=0.2)
+    assert result.status == 'timeout'
+
+    # Pool runs are stopped by killing the worker
+    with WorkerPool(size=1) as pool:
+        handle = CancelHandle()
+        threading.Timer(0.2, handle.cancel).start()
+        result = pool.execute('while True:\n    pass', timeout=10.0, cancel=handle)
+        assert result.status == 'cancelled'
+        assert pool.execute('print(1)', timeout=5.0).stdout == "1\n"
+
+    # A cancellation delivered while the handle is being left still leaves
+    # it finished, so nothing is injected into the thread's later work
+    class InterruptedLock:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.interrupted = False
+
+        def __enter__(self):
+            if not self.interrupted:
+                self.interrupted = True
+                raise ExecutionCancelled()
+            return self.lock.__enter__()
+
+        def __exit__(self, *exc_info):
+            return self.lock.__exit__(*exc_info)
+
+    handle = CancelHandle()
+    with handle:
+        handle._lock = InterruptedLock()
+    assert handle._lock.interrupted and handle._finished.is_set() and handle._target is None
+    assert handle.cancel() and not handle._inject()
+    print("-" * 50)
+
+def test_resource_limits():
+    """Test per-run memory, CPU and output limits and usage reporting"""
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.resource_limits import ResourceLimits
+    from src.utils.result_formatter import format_result
+    from src.utils.worker_pool import WorkerPool
+
+    limits = ResourceLimits(memory_bytes=32 * 1024 * 1024, cpu_seconds=0.3, output_bytes=10000)
+    executor = CodeExecutor(limits=limits)
+
+    result = executor.execute('chunks = []\nwhile True:\n    chunks.append("x" * 10000)')
+    print("Resource limits - Memory hog:")
+    print(repr(result), result.error.message)
+    assert result.error.type == 'MemoryLimitExceeded' and result.limit_fraction('memory') >= 1.0
+    del executor.local_vars['chunks']
+
+    result = executor.execute('while True:\n    pass')
+    assert result.error.type == 'CPULimitExceeded'
+    assert format_result(result) == "❌ Execution Error: CPU time limit of 0.3 seconds exceeded"
+
+    result = executor.execute('while True:\n    print("spam")')
+    assert result.error.type == 'OutputLimitExceeded' and result.stdout_bytes <= 10000
+    assert format_result(result).endswith("❌ Execution Error: Output limit of 9.8 KB exceeded")
+
+    # Well-behaved code reports how much of each limit it used
+    result = executor.execute('print(sum(range(1000)))')
+    assert result.ok and 0 < result.limit_fraction('output') < 0.01
+    assert set(result.to_dict()['resource_usage']) == {'memory', 'cpu', 'output'}
+
+    # Workers get operating system limits instead
+    with WorkerPool(size=1, limits=ResourceLimits(memory_bytes=64 * 1024 * 1024, cpu_seconds=0.3)) as pool:
+        result = pool.execute('data = bytearray(512 * 1024 * 1024)', timeout=10.0)
+        assert result.error.type == 'MemoryError'
+        assert result.error.message == "Memory limit of 64.0 MB exceeded"
+        assert pool.execute('print("still alive")', timeout=5.0).stdout == "still alive\n"
+
+        # Fractions of a second are kept, not rounded up to the next second
+        result = pool.execute('while True:\n    pass', timeout=10.0)
+        assert result.error.type == 'CPULimitExceeded' and result.resource_usage['cpu'][0] < 0.8
+
+        # Isolated runs use the worker, so memory needs no in-process tracking
+        isolated = CodeExecutor(worker_pool=pool, limits=ResourceLimits(cpu_seconds=5))
+        chunks = []
+        result = isolated.execute_isolated('data = bytearray(512 * 1024 * 1024)',
+                                           on_output=lambda stream, text: chunks.append(text))
+        assert result.error.type == 'MemoryError' and 'data' not in isolated.local_vars
+        result = isolated.execute_isolated('print("isolated")', on_output=lambda stream, text: chunks.append(text))
+        assert result.ok and chunks == ["isolated\n"]
+    print("-" * 50)
+
+def test_checkpoints():
+    """Test saving and restoring named namespace checkpoints"""
+    import threading
+    from src.utils.code_executor import CodeExecutor
+
+    executor = CodeExecutor()
+    executor.execute('rows = [[i] * 3 for i in range(100)]\nfirst = rows[0]\nlock = __import__("threading").Lock()')
+    checkpoint = executor.checkpoint('after data load')
+    print("Checkpoints - Saved:")
+    print(checkpoint)
+
+    executor.execute('rows.clear()\nfirst.append("changed")')
+    assert executor.local_vars['rows'] == []
+
+    # Restoring brings back the data, including objects shared between names
+    executor.restore_checkpoint('after data load')
+    result = executor.execute('print(len(rows), first is rows[0], first)')
+    assert result.stdout == "100 True [0, 0, 0]\n"
+    assert isinstance(executor.local_vars['lock'], type(threading.Lock()))
+
+    # A checkpoint can be restored any number of times, even after a reset
+    executor.execute('rows.pop()')
+    executor.reset_environment()
+    executor.restore_checkpoint('after data load')
+    assert len(executor.local_vars['rows']) == 100
+    assert executor.list_checkpoints() == ['after data load']
+
+    try:
+        executor.restore_checkpoint('missing')
+        assert False, "restoring an unknown checkpoint should fail"
+    except ValueError:
+        pass
+    print("-" * 50)
+
+def test_session_store():
+    """Test saving a session and restoring it lazily in a new executor"""
+    import os
+    import tempfile
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.session_store import SessionStore, LazyBuiltins
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = SessionStore(temp_dir)
+        executor = CodeExecutor()
+        executor.execute('import math\ntotal = 42\nrows = list(range(1000))\nlock = __import__("threading").Lock()')
+        stats = store.save(executor)
+        print("Session store - First save:", stats)
+        assert stats['unpicklable'] == ['lock'] and stats['written'] == 2
+
+        # Unchanged values are not written again
+        executor.execute('total = 42')
+        assert store.save(executor)['written'] == 0
+
+        # A new executor gets the names without unpickling them yet
+        restored = CodeExecutor()
+        assert store.restore(restored)
+        lazy = restored.global_vars['__builtins__']
+        assert type(restored.local_vars) is dict and isinstance(lazy, LazyBuiltins)
+        assert 'rows' in lazy.pending['locals'] and 'rows' not in restored.local_vars
+        result = restored.execute('print(total + len(rows), math.floor(2.5))')
+        assert result.stdout == "1042 2\n" and lazy.pending_count == 0
+
+        # Once everything is loaded the namespace uses the real builtins again
+        import builtins
+        assert restored.global_vars['__builtins__'] is builtins
+
+        # Entries never touched since the restore are carried over as they were
+        untouched = CodeExecutor()
+        store.restore(untouched)
+        untouched.execute('rows.append(1000)')
+        stats = store.save(untouched)
+        assert stats['written'] == 1 and stats['entries'] == 3
+        assert len([name for name in os.listdir(temp_dir) if name.endswith('.pkl')]) == 2
+
+        # A new value is saved even if it took over the id of the old one
+        reused = CodeExecutor()
+        # Built at run time: constants would stay alive in the cached code object
+        reused.execute('t = tuple([1, 2, "object"])')
+        store.save(reused)
+        reused.execute('t = None\nt = tuple([3, 4, "x"])')
+        store.save(reused)
+        check = CodeExecutor()
+        store.restore(check)
+        assert check.execute('print(t)').stdout == "(3, 4, 'x')\n"
+
+        # Restoring while code already ran keeps what that code defined
+        busy = CodeExecutor()
+        busy.execute('total = 1\nextra = 2')
+        store.restore(busy)
+        assert busy.execute('print(total, extra, t)').stdout == "1 2 (3, 4, 'x')\n"
+
+        store.save(untouched)
+        final = CodeExecutor()
+        store.restore(final)
+        assert final.get_variables()['rows'][-1] == 1000
+        assert not CodeExecutor().execute('print(total)').ok
+
+    # Pickles are loaded as code, so they stay out of the shared base directory
+    from src.utils.file_manager import FileManager
+    with tempfile.TemporaryDirectory() as temp_dir:
+        session_dir = FileManager(temp_dir).get_private_dir('session')
+        assert not session_dir.startswith(os.path.join(temp_dir, '.cache'))
+        assert os.stat(session_dir).st_mode & 0o077 == 0
+    print("-" * 50)
+
+def test_remote_execution():
+    """Test running code on a localhost execution server"""
+    import threading
+    from src.server import ExecutionServer
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.remote_client import RemoteClient
+
+    server = ExecutionServer(('127.0.0.1', 0), max_timeout=5.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = RemoteClient(server.url)
+        executor = CodeExecutor(remote=client)
+        if not client.available:
+            # requests is optional; without it runs fall back to local execution
+            result = executor.execute_remote('print("local")')
+            assert result.stdout == "local\n" and executor.telemetry.counter('remote_fallback') == 1
+        else:
+            chunks = []
+            code = 'import time\nfor i in range(3):\n    print("remote", i)\n    time.sleep(0.1)\n' + '# padding\n' * 200
+            result = executor.execute_remote(code, on_output=lambda stream, text: chunks.append(text))
+            print("Remote execution - Streamed chunks:")
+            print(chunks)
+            assert result.ok and result.stdout == "remote 0\nremote 1\nremote 2\n"
+            assert len(chunks) >= 3 and executor.telemetry.counter('remote') == 1
+
+            # Blocked code keeps its reasons, runaway code hits the time limit
+            result = executor.execute_remote('name = input()')
+            assert result.status == 'blocked' and 'user interaction' in result.blocked_functions[0][1]
+            result = executor.execute_remote('while True:\n    pass', timeout=0.5)
+            assert result.status == 'timeout'
+            assert client.health()['runs'] >= 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Without a server the code runs locally
+    offline = CodeExecutor(remote=RemoteClient('http://127.0.0.1:9', connect_timeout=0.5))
+    result = offline.execute_remote('local = 6 * 7\nprint(local)')
+    assert result.stdout == "42\n" and offline.local_vars['local'] == 42
+    assert not offline.remote.available and offline.telemetry.counter('remote_fallback') == 1
+    print("-" * 50)
+
+def test_run_scheduler():
+    """Test collapsing, superseding and prioritising queued runs"""
+    import time
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.run_scheduler import RunScheduler, PRIORITY_BACKGROUND
+
+    executor = CodeExecutor()
+    scheduler = RunScheduler(executor, debounce=0.05)
+    finished = []
+
+    # Repeated presses for the same code run it once
+    requests = [scheduler.submit('hits = globals().get("hits", 0) + 1', source='editor',
+                                 on_complete=finished.append) for _ in range(3)]
+    assert requests[0] is requests[1] is requests[2] and scheduler.queue_depth == 1
+    assert scheduler.wait_idle(5.0)
+    assert len(finished) == 1 and executor.local_vars['hits'] == 1
+
+    # Newer code cancels the older run, which reports nothing
+    outputs = []
+    old = scheduler.submit('import time\nfor i in range(500):\n    time.sleep(0.01)\nprint("old")',
+                           source='editor', on_output=lambda stream, text: outputs.append(text),
+                           on_complete=finished.append)
+    while old.state == 'pending':
+        time.sleep(0.01)
+    new = scheduler.submit('print("new")', source='editor',
+                           on_output=lambda stream, text: outputs.append(text), on_complete=finished.append)
+    assert scheduler.wait_idle(5.0)
+    assert old.state == 'superseded' and new.state == 'done'
+    assert [result.stdout for result in finished[1:]] == ["new\n"] and "old" not in ''.join(outputs)
+
+    # Interactive runs overtake queued background work
+    order = []
+    blocker = scheduler.submit('import time\ntime.sleep(0.2)', source='blocker')
+    while blocker.state == 'pending':
+        time.sleep(0.01)
+    scheduler.submit('x = 1', priority=PRIORITY_BACKGROUND, on_complete=lambda result: order.append('background'))
+    scheduler.submit('x = 2', on_complete=lambda result: order.append('interactive'))
+    assert scheduler.queue_depth == 2
+    assert scheduler.wait_idle(5.0)
+    stats = scheduler.stats()
+    print("Run scheduler - Stats:")
+    print(stats)
+    assert order == ['interactive', 'background']
+    assert stats['collapsed'] == 2 and stats['superseded'] == 1 and stats['wait']['count'] == 6
+
+    # The same code from two sources runs once for each
+    shared = [scheduler.submit('globals().setdefault("shared", []).append(1)', source=source,
+                               on_complete=finished.append) for source in ('editor', 'batch')]
+    assert shared[0] is not shared[1] and scheduler.queue_depth == 2
+    assert scheduler.wait_idle(5.0)
+    assert [request.state for request in shared] == ['done', 'done'] and executor.global_vars['shared'] == [1, 1]
+    assert scheduler.submit('print("after")', source='editor').state == 'pending' and scheduler.wait_idle(5.0)
+
+    # An unknown mode is refused up front instead of stopping the dispatcher
+    try:
+        scheduler.submit('print("never")', mode='bogus')
+        assert False, "an unknown mode should be refused"
+    except ValueError:
+        pass
+    assert scheduler.submit('print("still running")').state == 'pending' and scheduler.wait_idle(5.0)
+    scheduler.shutdown()
+
+    # A superseded run stuck in a C call is left behind instead of blocking the next one
+    scheduler = RunScheduler(CodeExecutor(), debounce=0.0, detach_timeout=0.2)
+    results = []
+    stuck = scheduler.submit('import time\ntime.sleep(2)\nprint("stuck")', source='editor',
+                             on_complete=results.append)
+    while stuck.state == 'pending':
+        time.sleep(0.01)
+    started = time.monotonic()
+    scheduler.submit('print("next")', source='editor', on_complete=results.append)
+    assert scheduler.wait_idle(5.0) and time.monotonic() - started < 1.5
+    assert stuck.state == 'detached' and [result.stdout for result in results] == ["next\n"]
+
+    # Stopping a stuck run reports it as stopped without waiting for it
+    stuck = scheduler.submit('import time\ntime.sleep(2)', source='editor', on_complete=results.append)
+    while stuck.state == 'pending':
+        time.sleep(0.01)
+    scheduler.cancel(source='editor')
+    assert scheduler.wait_idle(1.5) and results[-1].status == 'cancelled'
+    stuck.handle.join(5.0)
+    assert len(results) == 2
+    scheduler.shutdown()
+    print("-" * 50)
+
+def test_file_index():
+    """Test the cached file listing behind FileManager"""
+    import os
+    import tempfile
+    import time
+    from src.utils.file_manager import FileManager
+
+    def age_directory(path):
+        # Scans of a just-modified directory are not trusted, see FileIndex
+        past = time.time() - 60
+        os.utime(path, (past, past))
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        now = time.time()
+        for i in range(50):
+            path = os.path.join(base_dir, f"script_{i:02d}.py")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"print({i})\n")
+            os.utime(path, (now - 1000 + i, now - 1000 + i))
+        manager = FileManager(base_dir=base_dir)
+        age_directory(base_dir)
+        index = manager.file_index
+
+        files = manager.list_files()
+        assert len(files) == 50 and files[0]['name'] == 'script_49.py'
+        assert manager.list_files() == files and index.scans == 1
+        assert manager.get_file_info('script_07.py')['size'] == len("print(7)\n")
+        assert manager.get_file_info('missing.py') is None
+
+        # Own writes update the index without a rescan
+        manager.save_code('print("new")', 'newest.py')
+        assert index.most_recent()['name'] == 'newest.py'
+        assert manager.load_code() == 'print("new")'
+        assert manager.delete_file('script_00.py') and len(manager.list_files()) == 50
+        assert index.scans == 1
+
+        # A restarted manager starts from the snapshot
+        restarted = FileManager(base_dir=base_dir)
+        assert len(restarted.list_files()) == 50 and restarted.file_index.scans == 0
+
+        # Files added by others show up through the directory mtime
+        with open(os.path.join(base_dir, 'external.py'), 'w', encoding='utf-8') as f:
+            f.write('pass\n')
+        age_directory(base_dir)
+        assert restarted.get_file_info('external.py') is not None and restarted.file_index.scans == 1
+        print("File index - Listed", len(restarted.list_files()), "files with",
+              restarted.file_index.scans, "scan")
+    print("-" * 50)
+
+def test_file_io():
+    """Test atomic writes, background saves and coalesced autosave"""
+    import os
+    import tempfile
+    import time
+    from src.utils.file_io import atomic_write, FileIOWorker, Autosaver
+    from src.utils.file_manager import FileManager
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        # A failed write leaves the old contents and no temporary file
+        path = os.path.join(base_dir, 'kept.py')
+        atomic_write(path, 'print("old")')
+        try:
+            atomic_write(path, None)
+            assert False, "writing None should fail"
+        except TypeError:
+            pass
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == 'print("old")'
+        assert os.listdir(base_dir) == ['kept.py']
+
+        manager = FileManager(base_dir=base_dir)
+        worker = FileIOWorker(manager)
+        results = []
+        worker.save('print(1)', 'one.py', callback=lambda name, error: results.append((name, error)))
+        loaded = worker.load('one.py').result(5.0)
+        assert loaded == 'print(1)' and results == [('one.py', None)]
+        failed = []
+        worker.load('missing.py', callback=lambda code, error: failed.append(error)).exception(5.0)
+        assert "Failed to load file" in str(failed[0])
+
+        # A burst of edits becomes at most one write per interval
+        autosaver = Autosaver(lambda text: worker.call(manager.save_draft, text), interval=0.3)
+        for i in range(200):
+            autosaver.schedule(f"print({i})")
+        time.sleep(0.6)
+        worker.shutdown()
+        print("File I/O - Autosave writes for 200 edits:", autosaver.writes)
+        assert autosaver.writes <= 2 and manager.load_draft() == "print(199)"
+    print("-" * 50)
+
+def test_version_history():
+    """Test that every save is kept as a small, restorable revision"""
+    import tempfile
+    from src.utils.file_manager import FileManager
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        manager = FileManager(base_dir=base_dir)
+        lines = [f"value_{i} = {i} * {i}  # line {i}\n" for i in range(300)]
+        versions = []
+        for i in range(60):
+            lines[(i * 37) % len(lines)] = f"value_{i} = 'edited in save {i}'\n"
+            versions.append(''.join(lines))
+            manager.save_code(versions[-1], 'script.py')
+        # Saving unchanged code adds no revision
+        manager.save_code(versions[-1], 'script.py')
+        assert len(manager.list_versions('script.py')) == 60
+
+        # A fresh manager reads the history back from disk
+        reopened = FileManager(base_dir=base_dir)
+        for number in (0, 1, 24, 25, 26, 59):
+            assert reopened.load_version('script.py', number) == versions[number]
+        assert reopened.load_version('script.py', -2) == versions[-2]
+        try:
+            reopened.load_version('script.py', 60)
+            assert False, "unknown version should fail"
+        except Exception as e:
+            assert "No version" in str(e)
+
+        stored = reopened.history.script('script.py').stored_bytes()
+        full_copies = sum(len(version) for version in versions)
+        print(f"Version history - {stored} bytes for {full_copies} bytes of full copies")
+        assert stored < full_copies / 20
+    print("-" * 50)
+
+def test_search_index():
+    """Test full-text search over saved scripts"""
+    import os
+    import tempfile
+    import time
+    from src.utils.file_manager import FileManager
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        manager = FileManager(base_dir=base_dir)
+        for i in range(200):
+            manager.save_code(f"total_{i} = sum(range({i}))\nprint(total_{i})\n", f"script_{i:03d}.py")
+        manager.save_code("from itertools import groupby\nfor key, items in groupby(rows):\n    print(key)\n"
+                          "groups = groupby(sorted(rows))\n", 'grouping.py')
+        manager.save_code("import itertools\nitertools.groupby([])\n", 'other.py')
+
+        results = manager.search('groupby')
+        print("Search - 'groupby':", [(r['name'], r['count']) for r in results])
+        assert [r['name'] for r in results] == ['grouping.py', 'other.py']
+        assert results[0]['count'] == 3 and results[0]['lines'][0] == (1, "from itertools import groupby")
+        assert manager.search('GROUPBY') == [] and len(manager.search('GROUPBY', ignore_case=True)) == 2
+        assert [r['name'] for r in manager.search(r'itertools\.groupby\(', regex=True)] == ['other.py']
+        assert len(manager.search(r'total_1\d\b', regex=True, limit=100)) == 10
+        try:
+            manager.search('(unclosed', regex=True)
+            assert False, "invalid pattern should fail"
+        except ValueError:
+            pass
+
+        # The regex parser is private; if it breaks or changes, searches
+        # scan every file instead of failing or missing matches
+        from src.utils import search_index
+        assert search_index.required_literals(r'itertools\.groupby\(') == ['itertools.groupby(']
+        parser = search_index.sre_parse
+        class BrokenParser:
+            def parse(pattern):
+                raise AttributeError("no such parser API")
+        class ChangedParser:
+            LITERAL = SUBPATTERN = MAX_REPEAT = MIN_REPEAT = object()
+            def parse(pattern):
+                return [(ChangedParser.LITERAL, 0)]
+        try:
+            for replacement in (BrokenParser, ChangedParser, None):
+                search_index.sre_parse = replacement
+                assert search_index.required_literals(r'itertools\.groupby\(') == []
+                assert [r['name'] for r in manager.search(r'itertools\.groupby\(', regex=True)] == ['other.py']
+        finally:
+            search_index.sre_parse = parser
+
+        # Only changed files are indexed again, also by a fresh manager
+        indexed = manager.search_index.indexed
+        path = os.path.join(base_dir, 'other.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("print('no longer grouped')\n")
+        later = time.time() + 5
+        os.utime(path, (later, later))
+        manager.file_index.update('other.py')
+        assert [r['name'] for r in manager.search('groupby')] == ['grouping.py']
+        assert manager.search_index.indexed == indexed + 1
+        manager.delete_file('grouping.py')
+        assert manager.search('groupby') == []
+
+        reopened = FileManager(base_dir=base_dir)
+        assert len(reopened.search('print(total_', limit=500)) == 200
+        assert reopened.search_index.indexed == 0
+    print("-" * 50)
+
+def test_blob_store():
+    """Test the content-addressed storage backend"""
+    import os
+    import tempfile
+    from src.utils.file_manager import FileManager
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        manager = FileManager(base_dir=base_dir, storage='blobs')
+        store = manager.blob_store
+        code = "import math\n" + "".join(f"print(math.sqrt({i}))\n" for i in range(500))
+        for i in range(20):
+            manager.save_code(code, f"copy_{i}.py")
+        # Saving what a name already holds writes nothing
+        manager.save_code(code, 'copy_0.py')
+        print(f"Blob store - {store.writes} writes, {store.skipped} skipped, "
+              f"{store.stored_bytes()} bytes for {20 * len(code)} bytes of copies")
+        assert store.writes == 20 and store.skipped == 1
+        assert store.stored_bytes() < len(code) / 2
+        assert [name for name in os.listdir(base_dir) if name.endswith('.py')] == []
+
+        # A fresh manager reads everything back through the manifest
+        reopened = FileManager(base_dir=base_dir, storage='blobs')
+        assert reopened.load_code('copy_7.py') == code and len(reopened.list_files()) == 20
+        assert reopened.get_file_info('copy_7.py')['size'] == len(code)
+        assert reopened.search('sqrt(499)', limit=100)[0]['count'] == 1
+
+        # The shared blob stays until its last name is deleted
+        reopened.save_code("print('changed')\n", 'copy_0.py')
+        for i in range(1, 20):
+            assert reopened.delete_file(f"copy_{i}.py")
+        assert reopened.load_code('copy_0.py') == "print('changed')\n"
+        assert reopened.blob_store.stored_bytes() < 100
+
+        # Plain .py copies for other tools
+        export_dir = os.path.join(base_dir, 'export')
+        paths = reopened.export_all(export_dir)
+        with open(paths[0], encoding='utf-8') as f:
+            assert f.read() == "print('changed')\n"
+
+        try:
+            FileManager(base_dir=base_dir, storage='cloud')
+            assert False, "unknown storage should fail"
+        except ValueError:
+            pass
+    print("-" * 50)
+
+def test_bounded_output():
+    """Test that huge output is spilled to disk instead of kept in memory"""
+    from src.utils.code_executor import CodeExecutor
+
+    executor = CodeExecutor(max_output_memory=4096)
+    result = executor.execute('for i in range(20000):\n    print("row", i)')
+    buffer = executor.output_buffer
+    print("Bounded output - Abbreviated result:")
+    print(result.stdout[:200])
+    assert buffer.spilled and "bytes omitted" in result.stdout
+    assert buffer.head().startswith("row 0\n") and buffer.tail().endswith("row 19999\n")
+    assert result.stdout_bytes == buffer.total_bytes
+    assert len(result.stdout) < 4096 + 64 * 1024 + 200
+
+    # The full text is still available from the spill file
+    full_text = buffer.read_all()
+    assert len(full_text.encode('utf-8')) == buffer.total_bytes
+    assert full_text.count("\n") == 20000
+
+    # A single write larger than the room left goes straight to the spill file
+    result = executor.execute('print("é" * 100000)')
+    assert executor.output_buffer.head() == "" and executor.output_buffer.spilled
+    assert result.stdout_bytes == 200001 and result.stdout.endswith("é\n")
+
+    # Writing bytes is the user's error, as with a plain text stream
+    result = executor.execute('import sys\nsys.stdout.write(b"abc")')
+    assert result.status == 'error' and result.error.type == 'TypeError'
+    print("-" * 50)
+
+def test_worker_pool():
+    """Test execution in pre-forked worker processes"""
+    import threading
+    import time
+    from src.utils.code_executor import CodeExecutor
+    from src.utils.worker_pool import WorkerPool
+    
+    # The app's main module sets up the UI, so it is never preloaded
+    with WorkerPool(size=1, preload=('json', 'wave', '__main__')) as pool:
+        assert '__main__' not in pool.preload
+        executor = CodeExecutor(worker_pool=pool)
+        
+        result = executor.execute_with_timeout('print("from worker")', timeout=5.0)
+        print("Worker pool - Simple print:")
+        print(result)
+        assert "from worker" in result.stdout
+        
+        # A runaway script must be killed, and the worker replaced
+        result = executor.execute_with_timeout('while True:\n    pass', timeout=0.5)
+        print("Worker pool - Infinite loop (should time out):")
+        print(result)
+        assert result.status == 'timeout' and "timed out" in result.error.message
+        
+        result = executor.execute_with_timeout('print(6 * 7)', timeout=5.0)
+        print("Worker pool - Respawned worker:")
+        print(result)
+        assert "42" in result.stdout
+        
+        # The respawned worker also starts with the preloaded modules imported
+        result = executor.execute_with_timeout('import sys\nprint("wave" in sys.modules)', timeout=5.0)
+        assert result.stdout == "True\n"
+    
+    # Callers waiting for a worker give up when the pool shuts down
+    pool = WorkerPool(size=1)
+    busy = threading.Thread(target=pool.execute, args=('import time\ntime.sleep(0.3)',))
+    busy.start()
+    errors = []
+    def wait_for_worker():
+        try:
+            pool.execute('print("never")')
+        except Exception as e:
+            errors.append(e)
+    waiter = threading.Thread(target=wait_for_worker)
+    waiter.start()
+    time.sleep(0.1)
+    pool.shutdown()
+    waiter.join(5.0)
+    busy.join(5.0)
+    assert not waiter.is_alive() and errors and "shut down" in str(errors[0])
+    
+    # The zygote imports the preload list before forking, so workers import
+    # none of it themselves. A fresh interpreter has no forkserver running;
+    # a second pool cannot add to it, and its workers import the rest
+    import subprocess
+    script = """
+from src.utils.worker_pool import WorkerPool
+check = 'import sys\\nprint("wave" in sys.modules, "csv" in sys.modules)'
+with WorkerPool(size=1, preload=('wave',)) as first, WorkerPool(size=1, preload=('wave', 'csv')) as second:
+    print(first.context.get_start_method())
+    print(first.worker_preload, first.execute(check, timeout=10.0).stdout.strip())
+    print(second.worker_preload, second.execute(check, timeout=10.0).stdout.strip())
+"""
+    lines = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                           capture_output=True, text=True, timeout=60).stdout.splitlines()
+    print("Worker pool - Fresh forkserver:", lines)
+    if lines[0] == 'forkserver':
+        assert lines[1:] == ["[] True False", "['csv'] True True"]
+    
+    # Workers started by a forkserver import main.py as __mp_main__; that
+    # must not import Kivy and open a second window
+    script = "import runpy, sys\nrunpy.run_path('main.py', run_name='__mp_main__')\nprint('kivy' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, timeout=60).stdout
+    assert output == "False\n"
+    print("-" * 50)
+
+def test_batch_execution():
+    """Test running a directory of scripts in parallel"""
+    import tempfile
+    from src.utils.batch_executor import execute_many
+
+    with tempfile.TemporaryDirectory() as script_dir:
+        scripts = {
+            'ok.py': 'print("fine")',
+            'error.py': '1 / 0',
+            'blocked.py': 'value = input()',
+        }
+        paths = []
+        for name, code in scripts.items():
+            path = os.path.join(script_dir, name)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(code)
+            paths.append(path)
+
+        statuses = {os.path.basename(record['path']): record['status']
+                    for record in execute_many(paths, workers=2, timeout=5.0)}
+
+        # The command line runs the same scripts without touching the directory
+        import contextlib
+        import io
+        from src.cli import main
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            exit_code = main(['--base-dir', script_dir, '--workers', '2', '--no-output'])
+        assert exit_code == 1 and len(output.getvalue().splitlines()) == 3
+        assert sorted(os.listdir(script_dir)) == sorted(scripts)
+
+    print("Batch execution - Statuses:")
+    print(statuses)
+    assert statuses == {'ok.py': 'ok', 'error.py': 'error', 'blocked.py': 'blocked'}
     print("-" * 50)
 
 def test_file_manager():
@@ -110,6 +1144,29 @@ if __name__ == '__main__':
     print("=" * 50)
     
     test_code_executor()
+    test_streaming_execution()
+    test_concurrent_executors()
+    test_compile_cache()
+    test_cell_mode()
+    test_profiled_execution()
+    test_line_timing()
+    test_execution_result()
+    test_telemetry()
+    test_execution_budget()
+    test_cancellation()
+    test_resource_limits()
+    test_checkpoints()
+    test_session_store()
+    test_remote_execution()
+    test_run_scheduler()
+    test_file_index()
+    test_file_io()
+    test_version_history()
+    test_search_index()
+    test_blob_store()
+    test_bounded_output()
+    test_worker_pool()
+    test_batch_execution()
     test_file_manager()
     
     print("\nAll tests completed!") 
\ No newline at end of file